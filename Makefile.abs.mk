@@ -8,7 +8,7 @@ export DATE ?= $(shell date '+%FT%T%:z')
 
 IMG_VER ?= ${VER}-${COMMIT}
 
-.PHONY: all release release_ver_to_code docker-build docker-push docker-build-test test docker-test docker-test-ci
+.PHONY: all release release_ver_to_code docker-build docker-push docker-build-test test docker-test docker-test-ci benchmark
 
 check_defined = \
     $(strip $(foreach 1,$1, \
@@ -62,6 +62,9 @@ test:
 test-ci:
 	uv run python -m pytest $(test-command-ci)
 
+benchmark:
+	uv run python -m benchmarks $(BENCHMARK_ARGS)
+
 docker-test: docker-build-test
 	$(test-docker-run) $(test-command)
 
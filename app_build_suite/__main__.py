@@ -1,10 +1,14 @@
 """Main module. Loads configuration and executes main control loops."""
 
 import argparse
+import contextvars
 import logging
 import os
 import sys
-from typing import List, NewType
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, List, NewType, Optional
 
 import configargparse
 
@@ -19,6 +23,10 @@ from step_exec_lib.errors import ConfigError
 from step_exec_lib.steps import Runner
 
 from app_build_suite.build_steps.steps import ALL_STEPS
+from app_build_suite.utils.cache import get_default_cache_dir
+from app_build_suite.utils.charts import discover_charts
+from app_build_suite.utils.profiling import get_profiler
+from app_build_suite.utils.reproducible import SOURCE_DATE_EPOCH, is_reproducible, parse_source_date_epoch
 
 ver = "v0.0.0-dev"
 app_name = "app_build_suite"
@@ -28,6 +36,11 @@ BuildEngineType = NewType("BuildEngineType", str)
 BUILD_ENGINE_HELM3 = BuildEngineType("helm3")
 ALL_BUILD_ENGINES = [BUILD_ENGINE_HELM3]
 
+SERVE_COMMAND = "serve"
+"""Starts the build server ('abs serve --help') instead of running a build."""
+
+_current_chart: contextvars.ContextVar[str] = contextvars.ContextVar("current_chart", default="")
+
 
 def get_version() -> str:
     try:
@@ -70,6 +83,59 @@ def configure_global_options(config_parser: configargparse.ArgParser) -> None:
         action=argparse.BooleanOptionalAction,
         help="Collect all errors before failing instead of stopping on the first failure. Full pipeline support requires step-exec-lib >= 0.5.0; individual steps (e.g. GiantSwarmHelmValidator) respect this flag regardless. Use --no-keep-going for fail-fast behaviour.",
     )
+    config_parser.add_argument(
+        "--cache-dir",
+        required=False,
+        default=get_default_cache_dir(),
+        help="Directory for caches persisted between runs (like detected versions of external tools)."
+        " Set to an empty string to disable persistent caching.",
+    )
+    config_parser.add_argument(
+        "--build-cache",
+        required=False,
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Reuse results of 'ct', 'kube-linter', 'helm template' and 'helm package' (with the chart's metadata)"
+        " from previous runs with exactly the same chart files, options and tool versions. The results are stored"
+        " in '--cache-dir'.",
+    )
+    config_parser.add_argument(
+        "--build-cache-max-size",
+        required=False,
+        default=1024,
+        type=int,
+        help="Maximum size of the build cache in MiB. Least recently used results are removed first.",
+    )
+    config_parser.add_argument(
+        "--reproducible",
+        required=False,
+        default=None,
+        action=argparse.BooleanOptionalAction,
+        help="Build byte-identical chart archives and metadata from identical inputs: the time stored in them is"
+        " 'SOURCE_DATE_EPOCH' or, if it's not set, the time of the last commit of the chart's git repository"
+        " instead of the current time. If neither '--reproducible' nor '--no-reproducible' is given, setting"
+        " 'SOURCE_DATE_EPOCH' enables this mode.",
+    )
+    config_parser.add_argument(
+        "--profile-output",
+        required=False,
+        help="Write a profile of the build to this JSON file: wall and CPU time, peak memory growth, external"
+        " processes and I/O of each stage of each build step. The same data is also written in the Chrome"
+        " trace event format to a '.trace.json' file next to it.",
+    )
+    config_parser.add_argument(
+        "--charts-root",
+        required=False,
+        help="Build every chart found under this directory (any directory containing 'Chart.yaml') instead of"
+        " the single chart set with '--chart-dir'. Each chart uses its own '.abs/main.yaml' config file.",
+    )
+    config_parser.add_argument(
+        "--max-parallel-charts",
+        required=False,
+        default=1,
+        type=int,
+        help="Maximum number of charts built at the same time when '--charts-root' is used.",
+    )
     steps_group = config_parser.add_mutually_exclusive_group()
     steps_group.add_argument(
         "--steps",
@@ -87,18 +153,26 @@ def configure_global_options(config_parser: configargparse.ArgParser) -> None:
     )
 
 
-def get_default_config_file_path() -> str:
+def get_default_config_file_path(args: Optional[List[str]] = None) -> str:
     # this is the only place where we check for command line option directly,
     # as that's the only way to change where we load the file from
     # FIXME: it's also hacky, as it relies on helm pipeline to provide the "-c" option
+    if args is None:
+        args = sys.argv
     short_opt = "-c"
     long_opt = "--chart-dir"
+    chart_dir: Optional[str] = None
+    if short_opt in args or long_opt in args:
+        opt = short_opt if short_opt in args else long_opt
+        c_ind = args.index(opt)
+        chart_dir = args[c_ind + 1]
+    return get_config_file_path(chart_dir)
+
+
+def get_config_file_path(chart_dir: Optional[str]) -> str:
     base_dir = os.getcwd()
     charts_config_path = ""
-    if short_opt in sys.argv or long_opt in sys.argv:
-        opt = short_opt if short_opt in sys.argv else long_opt
-        c_ind = sys.argv.index(opt)
-        chart_dir = sys.argv[c_ind + 1]
+    if chart_dir is not None:
         charts_config_path = os.path.join(base_dir, chart_dir, ".abs", "main.")
     if os.path.isfile(charts_config_path + "yaml"):
         config_path = charts_config_path + "yaml"
@@ -117,8 +191,9 @@ def get_default_config_file_path() -> str:
     return config_path
 
 
-def get_global_config_parser(add_help: bool = True) -> configargparse.ArgParser:
-    config_file_path = get_default_config_file_path()
+def get_global_config_parser(add_help: bool = True, config_file_path: Optional[str] = None) -> configargparse.ArgParser:
+    if config_file_path is None:
+        config_file_path = get_default_config_file_path()
     config_parser = configargparse.ArgParser(
         prog=app_name,
         add_config_file_help=True,
@@ -147,15 +222,26 @@ def validate_global_config(config: configargparse.Namespace) -> None:
     for step in config.steps + config.skip_steps:
         if step not in ALL_STEPS:
             raise ConfigError("steps", f"Unknown step '{step}'. Valid steps are: {ALL_STEPS}.")
+    if config.max_parallel_charts < 1:
+        raise ConfigError("max-parallel-charts", "The number of parallel chart builds must be at least 1.")
+    if config.build_cache_max_size < 0:
+        raise ConfigError("build-cache-max-size", "The size of the build cache can't be negative.")
+    if is_reproducible(config) and os.environ.get(SOURCE_DATE_EPOCH):
+        try:
+            parse_source_date_epoch(os.environ[SOURCE_DATE_EPOCH])
+        except ValueError as e:
+            raise ConfigError(SOURCE_DATE_EPOCH, str(e))
 
 
-def get_config(steps: List[BuildStep]) -> configargparse.Namespace:
+def get_config(
+    steps: List[BuildStep], args: Optional[List[str]] = None, config_file_path: Optional[str] = None
+) -> configargparse.Namespace:
     # initialize config, setup arg parsers
     try:
-        config_parser = get_global_config_parser()
+        config_parser = get_global_config_parser(config_file_path=config_file_path)
         for step in steps:
             step.initialize_config(config_parser)
-        config = config_parser.parse_args()
+        config = config_parser.parse_args(args)
         validate_global_config(config)
     except ConfigError as e:
         logger.error(f"Error when checking config option '{e.config_option}': {e.msg}")
@@ -166,21 +252,145 @@ def get_config(steps: List[BuildStep]) -> configargparse.Namespace:
     return config
 
 
-def main() -> None:
-    log_format = "%(message)s"
-    logging.basicConfig(format=log_format)
-    logging.getLogger().setLevel(logging.INFO)
-    logger.info(f"app_build_suite {get_version()}\n")
+def _chart_log_record_factory(
+    base_factory: Callable[..., logging.LogRecord],
+) -> Callable[..., logging.LogRecord]:
+    """Wraps a log record factory to set the 'chart' attribute to the chart being built in the current context."""
+
+    def factory(*args: Any, **kwargs: Any) -> logging.LogRecord:
+        record = base_factory(*args, **kwargs)
+        record.chart = _current_chart.get()
+        return record
+
+    return factory
+
+
+class ChartLogFormatter(logging.Formatter):
+    """Prefixes log messages with the chart they were logged for (the record's 'chart' attribute), if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        chart = getattr(record, "chart", "")
+        return f"[{chart}] {message}" if chart else message
+
+
+@dataclass(frozen=True)
+class ChartBuildResult:
+    chart_dir: str
+    success: bool
+    duration: float
+
+
+def build_chart(chart_dir: str, args: List[str]) -> ChartBuildResult:
+    """
+    Builds a single chart with a new pipeline. The command line arguments are shared by all the
+    charts, but each chart loads its own config file.
+    """
+    token = _current_chart.set(chart_dir)
+    start = time.monotonic()
+    success = True
+    try:
+        steps = get_pipeline()
+        config = get_config(steps, args + ["--chart-dir", chart_dir], get_config_file_path(chart_dir))
+        Runner(config, steps).run()
+    except SystemExit as e:
+        # both config errors and failed builds end with sys.exit(1)
+        success = e.code in (0, None)
+    except Exception as e:
+        logger.exception(f"Unexpected error when building chart: {e}")
+        success = False
+    finally:
+        _current_chart.reset(token)
+    return ChartBuildResult(chart_dir, success, time.monotonic() - start)
+
+
+def build_charts(charts_root: str, max_parallel_charts: int, args: List[str]) -> bool:
+    """
+    Builds all the charts found in 'charts_root' and logs a summary. All the builds run in the same
+    process, so they share the caches of tool versions and parsed files.
+    :return: True if all the charts were built successfully.
+    """
+    charts = discover_charts(charts_root)
+    if not charts:
+        logger.error(f"No charts found in '{charts_root}'.")
+        return False
+    logger.info(f"Found {len(charts)} chart(s) in '{charts_root}': {', '.join(charts)}.")
+    base_factory = logging.getLogRecordFactory()
+    logging.setLogRecordFactory(_chart_log_record_factory(base_factory))
+    try:
+        with ThreadPoolExecutor(max_workers=max_parallel_charts, thread_name_prefix="chart-build") as executor:
+            results = list(executor.map(lambda chart_dir: build_chart(chart_dir, args), charts))
+    finally:
+        logging.setLogRecordFactory(base_factory)
+
+    failed = [r for r in results if not r.success]
+    logger.info(f"Build summary: {len(results) - len(failed)} succeeded, {len(failed)} failed.")
+    for result in results:
+        status = "OK" if result.success else "FAILED"
+        logger.info(f"  {status:<6} {result.chart_dir} ({result.duration:.1f}s)")
+    return not failed
 
-    global_only_config_parser = get_global_config_parser(add_help=False)
-    global_only_config = global_only_config_parser.parse_known_args()[0]
+
+def run_build(args: List[str], steps: Optional[List[BuildStepsFilteringPipeline]] = None) -> bool:
+    """
+    Runs the build configured with the command line arguments 'args' (without the program name).
+    :param steps: The pipeline to run, like the one the build server creates once for all the builds; a new one
+        by default. '--charts-root' builds always create one per chart, as the charts are built concurrently.
+    :return: True if the build succeeded.
+    """
+    config_file_path = get_default_config_file_path(args)
+    global_only_config_parser = get_global_config_parser(add_help=False, config_file_path=config_file_path)
+    try:
+        global_only_config = global_only_config_parser.parse_known_args(args)[0]
+    except SystemExit as e:
+        # '--version' ends the build right after parsing
+        return e.code in (0, None)
     if global_only_config.debug:
         logging.getLogger().setLevel(logging.DEBUG)
 
-    steps = get_pipeline()
-    config = get_config(steps)
-    runner = Runner(config, steps)
-    runner.run()
+    profiler = get_profiler(global_only_config)
+    try:
+        if global_only_config.charts_root:
+            try:
+                validate_global_config(global_only_config)
+            except ConfigError as e:
+                logger.error(f"Error when checking config option '{e.config_option}': {e.msg}")
+                return False
+            if not build_charts(global_only_config.charts_root, global_only_config.max_parallel_charts, args):
+                logger.error("Exit 1 due to failed chart build(s).")
+                return False
+            return True
+
+        if steps is None:
+            steps = get_pipeline()
+        config = get_config(steps, args, config_file_path)
+        runner = Runner(config, steps)
+        runner.run()
+    except SystemExit as e:
+        # both config errors and failed builds end with sys.exit(1)
+        return e.code in (0, None)
+    finally:
+        # failed builds end with sys.exit(1), and their profile is just as interesting
+        if profiler is not None:
+            profiler.write(global_only_config.profile_output)
+            profiler.clear()
+    return True
+
+
+def main() -> None:
+    handler = logging.StreamHandler()
+    handler.setFormatter(ChartLogFormatter("%(message)s"))
+    logging.basicConfig(handlers=[handler])
+    logging.getLogger().setLevel(logging.INFO)
+    if sys.argv[1:2] == [SERVE_COMMAND]:
+        from app_build_suite.server import serve_main
+
+        serve_main(sys.argv[2:])
+        return
+    logger.info(f"app_build_suite {get_version()}\n")
+
+    if not run_build(sys.argv[1:]):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
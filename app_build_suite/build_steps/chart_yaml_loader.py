@@ -1,6 +1,7 @@
 """Build step: loads Chart.yaml into context."""
 
 import argparse
+import copy
 import logging
 import os
 from typing import Set
@@ -15,7 +16,9 @@ from app_build_suite.build_steps.helm_consts import (
     context_key_changes_made,
     context_key_chart_yaml,
 )
+from app_build_suite.build_steps.scheduler import StepResources, chart_resource, context_resource
 from app_build_suite.build_steps.steps import STEP_BUILD, STEP_METADATA
+from app_build_suite.utils.document_store import document_store
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +26,11 @@ logger = logging.getLogger(__name__)
 class ChartYamlLoader(BuildStep):
     """Loads Chart.yaml into context as a parsed dict."""
 
+    resources = StepResources(
+        reads=frozenset({chart_resource(CHART_YAML)}),
+        writes=frozenset({context_resource(context_key_chart_yaml), context_resource(context_key_changes_made)}),
+    )
+
     @property
     def steps_provided(self) -> Set[StepType]:
         # Tag with both BUILD and METADATA so it runs when either is requested
@@ -32,16 +40,15 @@ class ChartYamlLoader(BuildStep):
         """Validates that the Chart.yaml file is readable and parseable."""
         chart_yaml_path = os.path.join(config.chart_dir, CHART_YAML)
         try:
-            with open(chart_yaml_path, "r") as f:
-                yaml.safe_load(f)
+            document_store.get(chart_yaml_path)
         except (OSError, yaml.YAMLError) as e:
             raise ValidationError(self.name, f"Cannot read/parse {CHART_YAML}: {e}")
 
     def run(self, config: argparse.Namespace, context: Context) -> None:
         """Loads Chart.yaml from disk and stores it in context."""
         chart_yaml_path = os.path.join(config.chart_dir, CHART_YAML)
-        with open(chart_yaml_path, "r") as f:
-            context[context_key_chart_yaml] = yaml.safe_load(f)
+        # steps modify the in-context dict, so it can't be the instance shared through the store
+        context[context_key_chart_yaml] = copy.deepcopy(document_store.get(chart_yaml_path))
         # Initialize changes_made flag (moved from HelmGitVersionSetter)
         context[context_key_changes_made] = False
         logger.debug(f"Loaded {CHART_YAML} into context.")
@@ -16,7 +16,9 @@ from app_build_suite.build_steps.helm_consts import (
     context_key_changes_made,
     context_key_chart_yaml,
 )
+from app_build_suite.build_steps.scheduler import StepResources, chart_resource, context_resource
 from app_build_suite.build_steps.steps import STEP_BUILD, STEP_METADATA
+from app_build_suite.utils.document_store import document_store
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +41,11 @@ ChartYamlDumper.add_representer(BlockLiteralStr, _represent_block_literal)
 class ChartYamlWriter(BuildStep):
     """Writes the in-context Chart.yaml dict to disk, creating a backup."""
 
+    resources = StepResources(
+        reads=frozenset({context_resource(context_key_chart_yaml), context_resource(context_key_changes_made)}),
+        writes=frozenset({chart_resource(CHART_YAML), chart_resource(CHART_YAML + ".back")}),
+    )
+
     @property
     def steps_provided(self) -> Set[StepType]:
         # Tag with both BUILD and METADATA so it runs when either is requested
@@ -60,4 +67,5 @@ class ChartYamlWriter(BuildStep):
         # Write context dict to disk
         with open(chart_yaml_path, "w") as f:
             yaml.dump(context[context_key_chart_yaml], f, Dumper=ChartYamlDumper, default_flow_style=False)
+        document_store.invalidate(chart_yaml_path)
         logger.info(f"Saved modified {CHART_YAML} to disk.")
@@ -8,21 +8,21 @@ General idea for naming validation checks:
 
 import argparse
 import logging
-import os
 import re
+from typing import Sequence, cast
+
 from app_build_suite.build_steps.giant_swarm_validators.errors import (
     GiantSwarmValidatorError,
 )
 
-from app_build_suite.build_steps.giant_swarm_validators.mixins import UseChartYaml
+from app_build_suite.build_steps.giant_swarm_validators.mixins import UseChartYaml, find_helpers_file
+from app_build_suite.build_steps.giant_swarm_validators.registry import register_validator
 
 from app_build_suite.build_steps.helm_consts import (
     VALUES_SCHEMA_JSON,
     CHART_YAML,
-    TEMPLATES_DIR,
-    HELPERS_YAML,
-    HELPERS_TPL,
 )
+from app_build_suite.utils.chart_inventory import chart_inventory_store
 
 logger = logging.getLogger(__name__)
 
@@ -32,14 +32,16 @@ GS_TEAM_LABEL_KEY = "application.giantswarm.io/team"
 GS_TEAM_LABEL_KEY_OCI = "io.giantswarm.application.team"
 
 
+@register_validator
 class HasValuesSchema:
     def get_check_code(self) -> str:
         return "F0001"
 
     def validate(self, config: argparse.Namespace) -> bool:
-        return os.path.exists(os.path.join(config.chart_dir, VALUES_SCHEMA_JSON))
+        return chart_inventory_store.get(config.chart_dir).get(VALUES_SCHEMA_JSON) is not None
 
 
+@register_validator
 class HasTeamLabel(UseChartYaml):
     escaped_label = re.escape(GS_TEAM_LABEL_KEY)
     escaped_label_oci = re.escape(GS_TEAM_LABEL_KEY_OCI)
@@ -86,12 +88,11 @@ class HasTeamLabel(UseChartYaml):
 
         # Check if _helpers.yaml or _helpers.tpl exists and uses team label
         helpers_file_path = self.get_helpers_file_path(config)
-        with open(helpers_file_path, "r") as stream:
-            try:
-                helpers_yaml_lines = stream.readlines()
-            except OSError as exc:
-                logger.warning(f"Error reading file '{helpers_file_path}'. Error: {exc}.")
-                return False
+        try:
+            helpers_yaml_lines = self.read_helpers_file(helpers_file_path)
+        except OSError as exc:
+            logger.warning(f"Error reading file '{helpers_file_path}'. Error: {exc}.")
+            return False
         label_regexp = re.compile(self._label_regexp)
         if any(label_regexp.match(line) for line in helpers_yaml_lines):
             return True
@@ -100,11 +101,16 @@ class HasTeamLabel(UseChartYaml):
         return False
 
     def get_helpers_file_path(self, config: argparse.Namespace) -> str:
-        helpers_file_path = os.path.join(config.chart_dir, TEMPLATES_DIR, HELPERS_YAML)
-        if not os.path.exists(helpers_file_path):
-            helpers_file_path = os.path.join(config.chart_dir, TEMPLATES_DIR, HELPERS_TPL)
-            if not os.path.exists(helpers_file_path):
-                raise GiantSwarmValidatorError(
-                    f"Template file '{HELPERS_YAML}' or '{HELPERS_TPL}' not found in '{TEMPLATES_DIR}' directory."
-                )
-        return helpers_file_path
+        if self.chart_snapshot is None:
+            return find_helpers_file(config.chart_dir)
+        if isinstance(self.chart_snapshot.helpers_error, GiantSwarmValidatorError):
+            raise self.chart_snapshot.helpers_error
+        return cast(str, self.chart_snapshot.helpers_file_path)
+
+    def read_helpers_file(self, helpers_file_path: str) -> Sequence[str]:
+        if self.chart_snapshot is None:
+            with open(helpers_file_path, "r") as stream:
+                return stream.readlines()
+        if self.chart_snapshot.helpers_error is not None:
+            raise self.chart_snapshot.helpers_error
+        return self.chart_snapshot.helpers_lines
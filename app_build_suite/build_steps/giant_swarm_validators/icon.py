@@ -1,26 +1,36 @@
 import argparse
-import os
-import urllib.request
-import urllib.error
-import tempfile
+import dataclasses
+import io
+import time
 import logging
-from typing import Final, Tuple
+from http import HTTPStatus
+from typing import Dict, Final, Mapping, Optional, Tuple, cast
 from urllib.parse import urlparse
 
-from PIL import Image
-from cairosvg import svg2png
 from app_build_suite.build_steps.giant_swarm_validators.errors import (
     GiantSwarmValidatorError,
 )
+from app_build_suite.build_steps.giant_swarm_validators.image_size import PROBE_SIZE, probe_image_size
+from app_build_suite.build_steps.giant_swarm_validators.icon_cache import DEFAULT_TTL, CachedIconSize, IconSizeCache
 from app_build_suite.build_steps.giant_swarm_validators.mixins import UseChartYaml
+from app_build_suite.build_steps.giant_swarm_validators.registry import register_validator
 
 from app_build_suite.build_steps.helm_consts import (
     CHART_YAML,
 )
+from app_build_suite.utils.cache import get_cache_dir
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_ICON_SIZE = 1024 * 1024
+"""Icons bigger than this many bytes aren't downloaded."""
+DEFAULT_FETCH_TIMEOUT = 10.0
+"""Seconds to wait for the icon's server to accept the connection and to send each chunk."""
 
+_READ_CHUNK_SIZE = 64 * 1024
+
+
+@register_validator
 class IconExists(UseChartYaml):
     def get_check_code(self) -> str:
         return "C0002"
@@ -39,6 +49,7 @@ class IconExists(UseChartYaml):
         return True
 
 
+@register_validator
 class IconDomainIsValid(UseChartYaml):
     ALLOWED_DOMAIN: Final[str] = "s.giantswarm.io"
 
@@ -63,8 +74,11 @@ class IconDomainIsValid(UseChartYaml):
         return True
 
 
+@register_validator
 class IconIsAlmostSquare(UseChartYaml):
     MAX_ALLOWED_DEVIATION: Final[float] = 0.33
+    # most of the time is spent downloading the icon
+    io_bound = True
 
     def get_check_code(self) -> str:
         return "C0003"
@@ -77,24 +91,39 @@ class IconIsAlmostSquare(UseChartYaml):
             logger.info(f"Icon not found in '{CHART_YAML}'. Skipping icon validation.")
             return True
 
-        img_path = self.fetch_icon_to_tmp(icon_path)
-
-        if not self.is_image(img_path):
-            try:
-                png_path = self.convert_svg_to_png(img_path)
-                os.remove(img_path)
-                img_path = png_path
-            except Exception:
-                logger.warning("Icon is not a valid image or SVG.")
-                return False
-
-        try:
-            width, height = self.get_width_height_from_image(img_path)
-        except GiantSwarmValidatorError as e:
-            logger.warn(f"Icon validation failed: {e.msg}")
-            return False
-        finally:
-            os.remove(img_path)
+        cache = self.get_icon_cache(config, icon_path)
+        cached = cache.get(icon_path) if cache is not None else None
+        offline = getattr(config, "giantswarm_icon_offline", False)
+        now = time.time()
+        if cached is not None and (offline or cached.is_fresh(self.get_cache_ttl(config), now)):
+            logger.debug(f"Using the cached size of icon '{icon_path}'.")
+            width, height = cached.width, cached.height
+        elif offline and urlparse(icon_path).scheme in ("http", "https"):
+            reason = "was never checked before" if cache is not None else "can't be cached without a cache directory"
+            logger.warning(f"Icon '{icon_path}' {reason}; not downloading it in offline mode.")
+            return True
+        else:
+            downloaded = self.fetch_icon(
+                icon_path,
+                cached.get_revalidation_headers() if cached else None,
+                max_size=getattr(config, "giantswarm_icon_max_size", DEFAULT_MAX_ICON_SIZE),
+                timeout=getattr(config, "giantswarm_icon_fetch_timeout", DEFAULT_FETCH_TIMEOUT),
+            )
+            if downloaded is None:
+                # returned only for the conditional request of a cached icon
+                cached = cast(CachedIconSize, cached)
+                logger.debug(f"Icon '{icon_path}' didn't change since it was last checked.")
+                width, height = cached.width, cached.height
+                cache_entry = dataclasses.replace(cached, checked_at=now)
+            else:
+                data, headers = downloaded
+                size = self.get_icon_size(data)
+                if size is None:
+                    return False
+                width, height = size
+                cache_entry = CachedIconSize.from_response(width, height, now, headers)
+            if cache is not None:
+                cache.put(icon_path, cache_entry)
 
         deviation = self.get_deviation(width, height)
         valid = self.is_almost_square(deviation)
@@ -107,34 +136,103 @@ class IconIsAlmostSquare(UseChartYaml):
 
         return valid
 
-    def is_image(self, path: str) -> bool:
+    @staticmethod
+    def get_icon_cache(config: argparse.Namespace, icon_path: str) -> Optional[IconSizeCache]:
+        """Returns the cache of icon sizes; only icons downloaded over HTTP(S) are cached."""
+        cache_dir = get_cache_dir(config)
+        if not cache_dir or urlparse(icon_path).scheme not in ("http", "https"):
+            return None
+        return IconSizeCache(cache_dir)
+
+    @staticmethod
+    def get_cache_ttl(config: argparse.Namespace) -> int:
+        return getattr(config, "giantswarm_icon_cache_ttl", DEFAULT_TTL)
+
+    def get_icon_size(self, data: memoryview) -> Optional[Tuple[int, int]]:
+        """Returns the size of the downloaded icon, or None if it's not an image."""
+        size = probe_image_size(data[:PROBE_SIZE])
+        if size is not None:
+            return size
+        # the probes read only the headers; images they don't recognize are decoded, and SVGs rasterized
+        logger.debug("Can't read the size of the icon from its header, decoding the whole image.")
+        image = bytes(data)
+        if not self.is_image(image):
+            try:
+                image = self.convert_svg_to_png(image)
+            except Exception:
+                logger.warning("Icon is not a valid image or SVG.")
+                return None
+
+        try:
+            return self.get_width_height_from_image(image)
+        except GiantSwarmValidatorError as e:
+            logger.warning(f"Icon validation failed: {e.msg}")
+            return None
+
+    # Pillow and cairosvg (with the native cairo library) are slow to load, so they're imported only
+    # when an icon is actually checked
+
+    def is_image(self, image: bytes) -> bool:
+        from PIL import Image
+
         try:
-            with Image.open(path) as img:
+            with Image.open(io.BytesIO(image)) as img:
                 img.verify()
                 return True
         except (IOError, SyntaxError):
             return False
 
-    def convert_svg_to_png(self, svg_path: str) -> str:
-        _, tmp_file_path = tempfile.mkstemp()
-        svg2png(url=svg_path, write_to=tmp_file_path)
-        return tmp_file_path
-
-    def fetch_icon_to_tmp(self, icon_path: str) -> str:
-        _, tmp_file_path = tempfile.mkstemp()
+    def convert_svg_to_png(self, svg: bytes) -> bytes:
+        from cairosvg import svg2png
+
+        return svg2png(bytestring=svg)
+
+    def fetch_icon(
+        self,
+        icon_path: str,
+        headers: Optional[Dict[str, str]] = None,
+        max_size: int = DEFAULT_MAX_ICON_SIZE,
+        timeout: float = DEFAULT_FETCH_TIMEOUT,
+    ) -> Optional[Tuple[memoryview, Mapping[str, str]]]:
+        """
+        Downloads the icon into memory; returns its content and the response headers. With the
+        conditional request headers of a cached icon, returns None if the icon wasn't modified.
+        :param max_size: Icons bigger than this many bytes fail the download.
+        :param timeout: Seconds to wait for connecting to the server and for each read.
+        """
+        # urllib.request loads http.client and ssl, which are needed only when an icon is downloaded
+        import urllib.error
+        import urllib.request
+
+        request = urllib.request.Request(icon_path, headers=headers or {})
         try:
-            return urllib.request.urlretrieve(icon_path, tmp_file_path)[0]  # nosec
-        except urllib.error.URLError as exc:
+            with urllib.request.urlopen(request, timeout=timeout) as response:  # nosec
+                content_length = response.headers.get("Content-Length", "")
+                if content_length.isdigit() and int(content_length) > max_size:
+                    raise GiantSwarmValidatorError(self._too_big_message(icon_path, max_size))
+                buffer = bytearray()
+                while chunk := response.read(min(_READ_CHUNK_SIZE, max_size + 1 - len(buffer))):
+                    buffer += chunk
+                    if len(buffer) > max_size:
+                        raise GiantSwarmValidatorError(self._too_big_message(icon_path, max_size))
+                return memoryview(buffer), response.headers
+        except urllib.error.HTTPError as exc:
+            if exc.code == HTTPStatus.NOT_MODIFIED and headers:
+                return None
+            raise GiantSwarmValidatorError(f"Error fetching icon from '{icon_path}'. Error: {exc}.")
+        except (urllib.error.URLError, OSError) as exc:
+            # socket timeouts are raised as they are, not as URLError
             raise GiantSwarmValidatorError(f"Error fetching icon from '{icon_path}'. Error: {exc}.")
 
-    def get_width_height_from_image(self, path: str) -> Tuple[int, int]:
-        img = Image.open(path)
-        return img.width, img.height
+    @staticmethod
+    def _too_big_message(icon_path: str, max_size: int) -> str:
+        return f"Icon '{icon_path}' is bigger than the maximum allowed size of {max_size} bytes."
+
+    def get_width_height_from_image(self, image: bytes) -> Tuple[int, int]:
+        from PIL import Image
 
-    def parse_svg_size(self, size: str) -> int:
-        if size.endswith("px"):
-            size = size[:-2]
-        return int(float(size))
+        with Image.open(io.BytesIO(image)) as img:
+            return img.width, img.height
 
     def get_deviation(self, width: int, height: int) -> float:
         return abs(width - height) / max(width, height)
@@ -0,0 +1,97 @@
+"""Persistent cache of the sizes of chart icons, shared between runs.
+
+Most charts point to one of a handful of icons, so downloading and decoding the icon on every build
+is wasted time. The cache keeps the size of each icon by its URL, together with the 'ETag' and
+'Last-Modified' headers the server sent. Within the TTL the cached size is used as is; afterwards the
+icon is revalidated with a conditional request and downloaded again only if it changed.
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 3600
+"""Seconds for which a cached icon size is used without asking the server."""
+
+_CACHE_FILE_NAME = "icon-sizes.json"
+# entries of icons nobody checked for this long are dropped, so the file doesn't grow forever
+_MAX_ENTRY_AGE = 30 * 24 * 3600
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CachedIconSize:
+    width: int
+    height: int
+    checked_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def is_fresh(self, ttl: float, now: float) -> bool:
+        return now - self.checked_at < ttl
+
+    def get_revalidation_headers(self) -> Dict[str, str]:
+        """Headers of a conditional request returning '304 Not Modified' if the icon didn't change."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    @classmethod
+    def from_response(cls, width: int, height: int, checked_at: float, headers: Mapping[str, str]) -> "CachedIconSize":
+        return cls(width, height, checked_at, headers.get("ETag"), headers.get("Last-Modified"))
+
+    @classmethod
+    def from_json(cls, data: Any) -> Optional["CachedIconSize"]:
+        try:
+            return cls(
+                int(data["width"]),
+                int(data["height"]),
+                float(data["checked_at"]),
+                data.get("etag"),
+                data.get("last_modified"),
+            )
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
+
+
+class IconSizeCache:
+    """Icon sizes stored in 'icon-sizes.json' in the cache directory; errors only disable caching."""
+
+    def __init__(self, cache_dir: str) -> None:
+        self._cache_file = os.path.join(cache_dir, _CACHE_FILE_NAME)
+
+    def get(self, url: str) -> Optional[CachedIconSize]:
+        return CachedIconSize.from_json(self._load().get(url))
+
+    def put(self, url: str, entry: CachedIconSize) -> None:
+        with _lock:
+            data = {}
+            for cached_url, value in self._load().items():
+                cached = CachedIconSize.from_json(value)
+                if cached is not None and entry.checked_at - cached.checked_at < _MAX_ENTRY_AGE:
+                    data[cached_url] = value
+            data[url] = asdict(entry)
+            tmp_file = f"{self._cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self._cache_file), exist_ok=True)
+                with open(tmp_file, "w") as f:
+                    json.dump(data, f, indent=2, sort_keys=True)
+                os.replace(tmp_file, self._cache_file)
+            except OSError as e:
+                logger.debug(f"Can't save icon size cache to '{self._cache_file}': {e}.")
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self._cache_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
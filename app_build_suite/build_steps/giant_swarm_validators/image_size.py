@@ -0,0 +1,136 @@
+"""Reads the size of an image from its header, without decoding or rasterizing it.
+
+PNG, GIF, JPEG and WebP images store their size in the first bytes of the file; an SVG image in
+the 'width' and 'height' or 'viewBox' attributes of its root element. The probes only need a prefix
+of the file and return None when the size can't be found in it, so the caller can fall back to
+decoding the whole image.
+"""
+
+import re
+import struct
+import xml.etree.ElementTree as ET  # nosec - only the root element is parsed
+from typing import Optional, Tuple, Union
+
+PROBE_SIZE = 64 * 1024
+"""Bytes of the file needed by the probes; JPEGs with bigger metadata segments aren't recognized."""
+
+ImageSize = Tuple[int, int]
+ImageData = Union[bytes, bytearray, memoryview]
+"""The probes work on any buffer, so the downloaded icon is probed without copying it."""
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# start of frame markers; 0xC4, 0xC8 and 0xCC are other segments using the same range
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+_SVG_CHUNK_SIZE = 4096
+_SVG_LENGTH = re.compile(r"^\s*([0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)\s*(px|pt|pc|mm|cm|in|em|ex)?\s*$")
+
+
+def probe_image_size(data: ImageData) -> Optional[ImageSize]:
+    """Returns the (width, height) of a PNG, GIF, JPEG, WebP or SVG image, or None if it's not recognized."""
+    for probe in (_probe_png, _probe_gif, _probe_jpeg, _probe_webp, probe_svg_size):
+        try:
+            size = probe(data)
+        except (struct.error, IndexError, ValueError):
+            size = None
+        if size is not None:
+            return size
+    return None
+
+
+def _probe_png(data: ImageData) -> Optional[ImageSize]:
+    if data[:8] != _PNG_SIGNATURE or data[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", data[16:24])
+    return width, height
+
+
+def _probe_gif(data: ImageData) -> Optional[ImageSize]:
+    if data[:6] not in (b"GIF87a", b"GIF89a"):
+        return None
+    width, height = struct.unpack("<HH", data[6:10])
+    return width, height
+
+
+def _probe_jpeg(data: ImageData) -> Optional[ImageSize]:
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # fill byte before a marker
+            i += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            i += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[i + 5 : i + 9])
+            return width, height
+        (length,) = struct.unpack(">H", data[i + 2 : i + 4])
+        i += 2 + length
+    return None
+
+
+def _probe_webp(data: ImageData) -> Optional[ImageSize]:
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 " and data[23:26] == b"\x9d\x01\x2a":
+        # lossy: the key frame header follows the start code
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and data[20] == 0x2F:
+        # lossless: 14 bits each of width - 1 and height - 1
+        (bits,) = struct.unpack("<I", data[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        # extended: 24 bits each of canvas width - 1 and height - 1
+        return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    return None
+
+
+def parse_svg_length(value: Optional[str]) -> Optional[Tuple[float, str]]:
+    """Parses an SVG length like '24', '24px' or '2.5cm'; returns None for percentages and invalid values."""
+    match = _SVG_LENGTH.match(value) if value is not None else None
+    if match is None:
+        return None
+    return float(match.group(1)), match.group(2) or "px"
+
+
+def probe_svg_size(data: ImageData) -> Optional[ImageSize]:
+    """
+    Returns the size of an SVG image set by the root element's 'width' and 'height' (if both use the
+    same unit) or its 'viewBox', rounded to whole numbers. Only the XML up to the root element is parsed.
+    """
+    root: Optional[ET.Element] = None
+    parser: ET.XMLPullParser = ET.XMLPullParser(events=("start",))  # nosec
+    view = memoryview(data)
+    try:
+        # fed in chunks, so that only the beginning of the document is parsed
+        for start in range(0, len(view), _SVG_CHUNK_SIZE):
+            parser.feed(view[start : start + _SVG_CHUNK_SIZE])
+            root = next((e[-1] for e in parser.read_events() if isinstance(e[-1], ET.Element)), None)
+            if root is not None:
+                break
+    except ET.ParseError:
+        return None
+    if root is None or root.tag not in ("svg", "{http://www.w3.org/2000/svg}svg"):
+        return None
+
+    width, height = parse_svg_length(root.get("width")), parse_svg_length(root.get("height"))
+    if width is not None and height is not None and width[1] == height[1]:
+        return _round_size(width[0], height[0])
+    view_box = (root.get("viewBox") or "").replace(",", " ").split()
+    if len(view_box) == 4:
+        return _round_size(float(view_box[2]), float(view_box[3]))
+    return None
+
+
+def _round_size(width: float, height: float) -> Optional[ImageSize]:
+    if width <= 0 or height <= 0:
+        return None
+    return max(round(width), 1), max(round(height), 1)
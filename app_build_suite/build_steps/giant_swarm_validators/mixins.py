@@ -1,23 +1,93 @@
 import argparse
 import os
+import types
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Tuple
 
 import yaml
 from app_build_suite.build_steps.giant_swarm_validators.errors import (
     GiantSwarmValidatorError,
 )
 
-from app_build_suite.build_steps.helm_consts import CHART_YAML
+from app_build_suite.build_steps.helm_consts import CHART_YAML, HELPERS_TPL, HELPERS_YAML, TEMPLATES_DIR
+from app_build_suite.utils.chart_inventory import chart_inventory_store
+from app_build_suite.utils.document_store import document_store
+
+
+def _freeze(value: Any) -> Any:
+    """Returns a read-only copy of a parsed YAML document: mappings become proxies and lists tuples."""
+    if isinstance(value, dict):
+        return types.MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _load_chart_yaml(chart_dir: str) -> Any:
+    chart_yaml_path = os.path.join(chart_dir, CHART_YAML)
+
+    if chart_inventory_store.get(chart_dir).get(CHART_YAML) is None:
+        raise GiantSwarmValidatorError(f"Can't find file '{chart_yaml_path}'.")
+    try:
+        return document_store.get(chart_yaml_path)
+    except yaml.YAMLError as exc:
+        raise GiantSwarmValidatorError(f"Error parsing YAML file '{chart_yaml_path}'. Error: {exc}.")
+
+
+def find_helpers_file(chart_dir: str) -> str:
+    """Returns the path of the chart's '_helpers.yaml' or '_helpers.tpl' template."""
+    inventory = chart_inventory_store.get(chart_dir)
+    for helpers_file in (HELPERS_YAML, HELPERS_TPL):
+        if inventory.get(f"{TEMPLATES_DIR}/{helpers_file}") is not None:
+            return os.path.join(chart_dir, TEMPLATES_DIR, helpers_file)
+    raise GiantSwarmValidatorError(
+        f"Template file '{HELPERS_YAML}' or '{HELPERS_TPL}' not found in '{TEMPLATES_DIR}' directory."
+    )
+
+
+@dataclass(frozen=True)
+class ChartSnapshot:
+    """
+    Chart.yaml and the helpers template of a chart, read once for all the validators of a build.
+
+    Validators can run in parallel threads, so the content is read-only. A file that can't be read
+    doesn't fail taking the snapshot: the error is raised to the validators that need the file.
+    """
+
+    chart_yaml: Any = None
+    chart_yaml_error: Optional[GiantSwarmValidatorError] = None
+    helpers_file_path: Optional[str] = None
+    helpers_lines: Tuple[str, ...] = ()
+    helpers_error: Optional[Exception] = None
+
+    @classmethod
+    def take(cls, chart_dir: str) -> "ChartSnapshot":
+        chart_yaml: Any = None
+        chart_yaml_error: Optional[GiantSwarmValidatorError] = None
+        try:
+            chart_yaml = _freeze(_load_chart_yaml(chart_dir))
+        except GiantSwarmValidatorError as e:
+            chart_yaml_error = e
+
+        helpers_file_path: Optional[str] = None
+        helpers_lines: Tuple[str, ...] = ()
+        helpers_error: Optional[Exception] = None
+        try:
+            helpers_file_path = find_helpers_file(chart_dir)
+            with open(helpers_file_path, "r") as stream:
+                helpers_lines = tuple(stream.readlines())
+        except (GiantSwarmValidatorError, OSError) as e:
+            helpers_error = e
+        return cls(chart_yaml, chart_yaml_error, helpers_file_path, helpers_lines, helpers_error)
 
 
 class UseChartYaml:
-    def get_chart_yaml(self, config: argparse.Namespace) -> dict:
-        chart_yaml_path = os.path.join(config.chart_dir, CHART_YAML)
-
-        if not os.path.exists(chart_yaml_path):
-            raise GiantSwarmValidatorError(f"Can't find file '{chart_yaml_path}'.")
-        with open(chart_yaml_path, "r") as stream:
-            try:
-                chart_yaml = yaml.safe_load(stream)
-            except yaml.YAMLError as exc:
-                raise GiantSwarmValidatorError(f"Error parsing YAML file '{chart_yaml_path}'. Error: {exc}.")
-        return chart_yaml
+    chart_snapshot: Optional[ChartSnapshot] = None
+    """Set by GiantSwarmHelmValidator; validators used on their own read the files themselves."""
+
+    def get_chart_yaml(self, config: argparse.Namespace) -> Mapping[str, Any]:
+        if self.chart_snapshot is None:
+            return _load_chart_yaml(config.chart_dir)
+        if self.chart_snapshot.chart_yaml_error is not None:
+            raise self.chart_snapshot.chart_yaml_error
+        return self.chart_snapshot.chart_yaml
@@ -0,0 +1,100 @@
+"""Registry of Giant Swarm validators, keyed by their check codes.
+
+Built-in validators register themselves with the 'register_validator' decorator when their module is
+imported. Third-party packages can add validators through the 'app_build_suite.giant_swarm_validators'
+entry point group; an entry point can point to a validator class or to a module registering its
+validators with the decorator:
+
+    [project.entry-points."app_build_suite.giant_swarm_validators"]
+    my_checks = "my_package.checks"
+"""
+
+import argparse
+import importlib
+import logging
+import threading
+from importlib.metadata import entry_points
+from typing import Any, Dict, List, Protocol, Type, TypeVar
+
+from app_build_suite.build_steps.giant_swarm_validators.errors import GiantSwarmValidatorError
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "app_build_suite.giant_swarm_validators"
+_BUILTIN_MODULES = (
+    "app_build_suite.build_steps.giant_swarm_validators.helm",
+    "app_build_suite.build_steps.giant_swarm_validators.icon",
+)
+
+
+class GiantSwarmValidator(Protocol):
+    """
+    Interface of the validators: a check code (like 'C0001') and the check itself.
+
+    Validators blocking on I/O (like downloading the icon) can set the class attribute 'io_bound = True';
+    they run in a thread pool while the other validators run.
+    """
+
+    def validate(self, config: argparse.Namespace) -> bool: ...  # noqa: E704
+
+    def get_check_code(self) -> str: ...  # noqa: E704
+
+
+ValidatorClass = TypeVar("ValidatorClass", bound=Type[Any])
+
+
+class ValidatorRegistry:
+    """Maps check codes to validator classes. Loading the built-in and plugin validators happens once."""
+
+    def __init__(self) -> None:
+        self._classes: Dict[str, Type[Any]] = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def register(self, cls: ValidatorClass) -> ValidatorClass:
+        """Registers the validator class; raises GiantSwarmValidatorError if its check code is already taken."""
+        check_code = cls().get_check_code()
+        with self._lock:
+            registered = self._classes.get(check_code)
+            if registered is not None and registered is not cls:
+                raise GiantSwarmValidatorError(
+                    f"Found more than 1 Giant Swarm validator with check code '{check_code}' "
+                    f"({registered.__qualname__} and {cls.__qualname__}). Check codes have to be unique."
+                )
+            self._classes[check_code] = cls
+        return cls
+
+    def get(self, check_code: str) -> Type[Any]:
+        """Returns the class of the validator with the check code; raises KeyError if there is none."""
+        self.load()
+        return self._classes[check_code]
+
+    def create_validators(self) -> List[GiantSwarmValidator]:
+        """Returns new instances of all the validators, in the order they were registered."""
+        self.load()
+        with self._lock:
+            return [cls() for cls in self._classes.values()]
+
+    def load(self) -> None:
+        """Imports the built-in validators and the ones provided by plugins, once per process."""
+        with self._lock:
+            if self._loaded:
+                return
+            for module in _BUILTIN_MODULES:
+                importlib.import_module(module)
+            for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+                logger.debug(f"Loading Giant Swarm validators from plugin '{entry_point.name}' ({entry_point.value}).")
+                loaded = entry_point.load()
+                # a module registers its validators with the decorator when it's imported
+                if isinstance(loaded, type):
+                    self.register(loaded)
+            self._loaded = True
+
+
+validator_registry = ValidatorRegistry()
+"""The registry used by GiantSwarmHelmValidator."""
+
+
+def register_validator(cls: ValidatorClass) -> ValidatorClass:
+    """Class decorator adding the validator to the shared registry."""
+    return validator_registry.register(cls)
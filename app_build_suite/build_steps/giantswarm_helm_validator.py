@@ -1,37 +1,35 @@
 """Build step: runs Giant Swarm-specific Helm chart validators."""
 
 import argparse
-import inspect
+import contextvars
 import logging
-import os
-from importlib import import_module
-from os import listdir
-from typing import List, Protocol, Set, Tuple, Type, runtime_checkable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
 
 import configargparse
 from step_exec_lib.errors import ValidationError
 from step_exec_lib.steps import BuildStep
 from step_exec_lib.types import Context, StepType
 
+from app_build_suite.build_steps.giant_swarm_validators.errors import GiantSwarmValidatorError
+from app_build_suite.build_steps.giant_swarm_validators.icon import DEFAULT_FETCH_TIMEOUT, DEFAULT_MAX_ICON_SIZE
+from app_build_suite.build_steps.giant_swarm_validators.icon_cache import DEFAULT_TTL
+from app_build_suite.build_steps.giant_swarm_validators.mixins import ChartSnapshot, UseChartYaml
+from app_build_suite.build_steps.giant_swarm_validators.registry import GiantSwarmValidator, validator_registry
+from app_build_suite.build_steps.scheduler import StepResources
 from app_build_suite.build_steps.steps import STEP_VALIDATE
 
 logger = logging.getLogger(__name__)
 
 
-@runtime_checkable
-class GiantSwarmValidator(Protocol):
-    """This class is only used for type hinting of simple giant_swarm_validators below"""
-
-    def validate(self, config: argparse.Namespace) -> bool: ...  # noqa: E704
-
-    def get_check_code(self) -> str: ...  # noqa: E704
-
-
 class GiantSwarmHelmValidator(BuildStep):
     """
     Validator that checks Helm Chart compliance according to Giant Swarm internal rules.
     """
 
+    # the build stage does nothing, all the work is done in pre_run or cleanup
+    resources = StepResources()
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_VALIDATE}
@@ -60,6 +58,36 @@ class GiantSwarmHelmValidator(BuildStep):
             default="",
             help="Comma-separated list of Giant Swarm validation checks to ignore even if they fail",
         )
+        config_parser.add_argument(
+            "--giantswarm-icon-cache-ttl",
+            required=False,
+            default=DEFAULT_TTL,
+            type=int,
+            help="Seconds for which the size of an icon checked before (cached in '--cache-dir') is used without"
+            " asking the server whether the icon changed",
+        )
+        config_parser.add_argument(
+            "--giantswarm-icon-offline",
+            required=False,
+            default=False,
+            action="store_true",
+            help="Don't download icons: use the cached sizes however old they are and skip checking icons that"
+            " were never checked before or if caching is disabled",
+        )
+        config_parser.add_argument(
+            "--giantswarm-icon-max-size",
+            required=False,
+            default=DEFAULT_MAX_ICON_SIZE,
+            type=int,
+            help="Maximum size of the chart's icon in bytes; bigger icons fail the download",
+        )
+        config_parser.add_argument(
+            "--giantswarm-icon-fetch-timeout",
+            required=False,
+            default=DEFAULT_FETCH_TIMEOUT,
+            type=float,
+            help="Seconds to wait for the icon's server to accept the connection and to send each chunk of the icon",
+        )
 
     def pre_run(self, config: argparse.Namespace) -> None:
         """Runs a set of Giant Swarm specific validations."""
@@ -69,65 +97,90 @@ class GiantSwarmHelmValidator(BuildStep):
 
         gs_validators = self._load_giant_swarm_validators()
 
-        ignore_list: List[str] = []
+        ignore_list: Set[str] = set()
         ignore_str_list: List[str] = config.giantswarm_validator_ignored_checks.split(",")
         for name in ignore_str_list:
             n = name.strip()
             if n:
-                ignore_list.append(n)
+                ignore_list.add(n)
 
         keep_going = getattr(config, "keep_going", True)
-        failures: List[str] = []
+        # results are reported in check-code order, whatever order the validators finish in
+        gs_validators = sorted(gs_validators, key=lambda v: v.get_check_code())
+        snapshot = ChartSnapshot.take(config.chart_dir)
         for validator in gs_validators:
-            validator_name = type(validator).__name__
-            logger.info(f"Running Giant Swarm validator '{validator.get_check_code()}: {validator_name}'.")
-            if validator.validate(config):
-                logger.debug(f"Giant Swarm validator '{validator.get_check_code()}: {validator_name}' is OK.")
-            else:
+            if isinstance(validator, UseChartYaml):
+                validator.chart_snapshot = snapshot
+        executor, futures = self._start_io_bound_validators(config, gs_validators)
+        failures: List[str] = []
+        try:
+            # the other validators run while the I/O-bound ones wait
+            results: Dict[int, bool] = {}
+            for i, validator in enumerate(gs_validators):
+                if i in futures:
+                    continue
+                results[i] = self._run_validator(config, validator)
+                if not results[i] and not keep_going and self._is_enforced(config, validator, ignore_list):
+                    break
+            for i, validator in enumerate(gs_validators):
+                if i in futures:
+                    results[i] = futures[i].result()
+                elif i not in results:
+                    # skipped after a failure, which is raised below
+                    break
+                validator_name = type(validator).__name__
+                if results[i]:
+                    logger.debug(f"Giant Swarm validator '{validator.get_check_code()}: {validator_name}' is OK.")
+                    continue
                 msg = f"Giant Swarm validator '{validator.get_check_code()}: {validator_name}' failed its checks."
-                if not config.disable_strict_giantswarm_validator and validator.get_check_code() not in ignore_list:
+                if self._is_enforced(config, validator, ignore_list):
                     if keep_going:
                         failures.append(msg)
                     else:
                         raise ValidationError(self.name, msg)
                 else:
                     logger.warning(msg)
+        finally:
+            if executor is not None:
+                # when failing fast, the validators that didn't start yet aren't needed anymore
+                executor.shutdown(wait=False, cancel_futures=True)
         if failures:
             raise ValidationError(self.name, "\n".join(failures))
 
+    @staticmethod
+    def _is_enforced(config: argparse.Namespace, validator: GiantSwarmValidator, ignore_list: Set[str]) -> bool:
+        """Tells if the validator failing fails the build."""
+        return not config.disable_strict_giantswarm_validator and validator.get_check_code() not in ignore_list
+
+    @staticmethod
+    def _run_validator(config: argparse.Namespace, validator: GiantSwarmValidator) -> bool:
+        logger.info(f"Running Giant Swarm validator '{validator.get_check_code()}: {type(validator).__name__}'.")
+        return validator.validate(config)
+
+    def _start_io_bound_validators(
+        self, config: argparse.Namespace, validators: List[GiantSwarmValidator]
+    ) -> Tuple[Optional[ThreadPoolExecutor], Dict[int, "Future[bool]"]]:
+        """
+        Starts the validators declaring 'io_bound = True' in a thread pool, so that waiting for the
+        network doesn't delay the others. Returns the futures by the validators' positions.
+        """
+        io_bound = [i for i, v in enumerate(validators) if getattr(v, "io_bound", False)]
+        if not io_bound:
+            return None, {}
+        executor = ThreadPoolExecutor(max_workers=len(io_bound), thread_name_prefix="gs-validator")
+        return executor, {
+            i: executor.submit(contextvars.copy_context().run, self._run_validator, config, validators[i])
+            for i in io_bound
+        }
+
     def _load_giant_swarm_validators(self) -> List[GiantSwarmValidator]:
-        gs_validators: List[GiantSwarmValidator] = []
-        current_frame = inspect.currentframe()
-        if current_frame is None:
-            raise ValidationError(self.name, "Can't check current frame and detect current module's path.")
-
-        cur_mod_path = os.path.dirname(os.path.abspath(inspect.getfile(current_frame)))
-        validators_mod_path = os.path.join(cur_mod_path, "giant_swarm_validators")
-
-        cur_mod_name = __name__
-        validators_mod_name_prefix = cur_mod_name.replace("giantswarm_helm_validator", "giant_swarm_validators.")
-
-        name_class_tuples: List[Tuple[str, Type]] = []
-
-        for modname in listdir(validators_mod_path):
-            if not modname.endswith(".py"):
-                continue
-
-            pkg = import_module(validators_mod_name_prefix + modname[:-3])
-            name_class_tuples = name_class_tuples + inspect.getmembers(pkg, inspect.isclass)
-
-        for _, cls in name_class_tuples:
-            if issubclass(cls, GiantSwarmValidator):
-                new_validator = cls()
-                if new_validator.get_check_code() in (c.get_check_code() for c in gs_validators):
-                    raise ValidationError(
-                        self.name,
-                        f"Found more than 1 Giant Swarm validator with check code "
-                        f"'{new_validator.get_check_code()}'. Check codes have to be unique.",
-                    )
-                gs_validators.append(new_validator)
-
-        return gs_validators
+        try:
+            return validator_registry.create_validators()
+        except GiantSwarmValidatorError as e:
+            raise ValidationError(self.name, e.msg)
+        except Exception as e:
+            # validators of plugins can fail in any way when they're imported
+            raise ValidationError(self.name, f"Can't load Giant Swarm validators: {e}")
 
     def run(self, config: argparse.Namespace, context: Context) -> None:
         pass
@@ -1,6 +1,8 @@
 """Build steps implementing helm3 based builds."""
 
-from step_exec_lib.steps import BuildStepsFilteringPipeline
+import argparse
+
+from step_exec_lib.steps import BuildStep
 
 from app_build_suite.build_steps.chart_yaml_loader import ChartYamlLoader
 from app_build_suite.build_steps.chart_yaml_writer import ChartYamlWriter
@@ -17,9 +19,15 @@ from app_build_suite.build_steps.helm_version_setter import HelmVersionSetter
 from app_build_suite.build_steps.helm_home_url_setter import HelmHomeUrlSetter
 from app_build_suite.build_steps.helm_requirements_updater import HelmRequirementsUpdater
 from app_build_suite.build_steps.kube_linter import KubeLinter
+from app_build_suite.build_steps.scheduler import (
+    ConcurrentBuildStepsFilteringPipeline,
+    chart_resource,
+    get_step_resources,
+)
+from app_build_suite.utils.chart_inventory import chart_inventory_store
 
 
-class HelmBuildFilteringPipeline(BuildStepsFilteringPipeline):
+class HelmBuildFilteringPipeline(ConcurrentBuildStepsFilteringPipeline):
     """
     Pipeline that combines all the steps required to use helm3 as a chart builder.
     """
@@ -37,11 +45,23 @@ class HelmBuildFilteringPipeline(BuildStepsFilteringPipeline):
                 GiantSwarmHelmValidator(),
                 HelmRequirementsUpdater(),
                 HelmChartToolLinter(),
-                KubeLinter(),
                 HelmTemplateValidator(),
+                KubeLinter(),
                 HelmChartBuilder(),
                 HelmChartMetadataFinalizer(),
                 HelmChartYAMLRestorer(),
             ],
             "Helm 3 build engine options",
         )
+
+    def pre_run(self, config: argparse.Namespace) -> None:
+        # the chart could have changed since an earlier build in this process ('abs serve', '--charts-root')
+        chart_inventory_store.invalidate(config.chart_dir)
+        super().pre_run(config)
+
+    def _after_step(self, config: argparse.Namespace, stage: str, step: BuildStep) -> None:
+        # the only place refreshing the chart's inventory: steps declare the chart files they write in
+        # their resources anyway, while the files cleanups write (like restored backups) aren't declared
+        resources = get_step_resources(step, config)
+        if stage == "cleanup" or (stage == "build" and (resources is None or resources.writes_to(chart_resource()))):
+            chart_inventory_store.invalidate(config.chart_dir)
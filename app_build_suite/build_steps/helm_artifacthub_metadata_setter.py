@@ -19,6 +19,7 @@ from app_build_suite.build_steps.helm_consts import (
     context_key_changes_made,
     context_key_chart_yaml,
 )
+from app_build_suite.build_steps.scheduler import StepResources, chart_resource, context_resource
 from app_build_suite.build_steps.steps import STEP_BUILD
 from app_build_suite.utils.git import GitRepoVersionInfo
 from app_build_suite.utils.git_url import GitUrlConverter
@@ -49,6 +50,18 @@ class HelmArtifactHubMetadataSetter(BuildStep):
     _license_detection_lines = 20
     _giantswarm_github_url_prefix = "https://github.com/giantswarm/"
 
+    resources = StepResources(
+        reads=frozenset({chart_resource()}),
+        writes=frozenset(
+            {
+                chart_resource(README_MD),
+                context_resource(context_key_chart_yaml),
+                context_resource(context_key_changes_made),
+                context_resource(context_key_artifacthub_readme_copied),
+            }
+        ),
+    )
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_BUILD}
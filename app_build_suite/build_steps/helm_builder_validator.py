@@ -6,13 +6,15 @@ import os
 from typing import Set
 
 import configargparse
-import yaml
 from step_exec_lib.errors import ValidationError
 from step_exec_lib.steps import BuildStep
 from step_exec_lib.types import Context, StepType
 
 from app_build_suite.build_steps.helm_consts import CHART_YAML, VALUES_YAML
+from app_build_suite.build_steps.scheduler import StepResources
 from app_build_suite.build_steps.steps import STEP_BUILD
+from app_build_suite.utils.chart_inventory import chart_inventory_store
+from app_build_suite.utils.document_store import document_store
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,9 @@ class HelmBuilderValidator(BuildStep):
 
     _RFC1123_MAX_LENGTH = 63
 
+    # the build stage does nothing, all the work is done in pre_run or cleanup
+    resources = StepResources()
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_BUILD}
@@ -40,10 +45,8 @@ class HelmBuilderValidator(BuildStep):
 
     def pre_run(self, config: argparse.Namespace) -> None:
         """Validates if basic chart files are present in the configured directory."""
-        if not (
-            os.path.exists(os.path.join(config.chart_dir, CHART_YAML))
-            and os.path.exists(os.path.join(config.chart_dir, VALUES_YAML))
-        ):
+        inventory = chart_inventory_store.get(config.chart_dir)
+        if not (inventory.get(CHART_YAML) and inventory.get(VALUES_YAML)):
             raise ValidationError(self.name, f"Can't find '{CHART_YAML}' or '{VALUES_YAML}' files.")
 
         # Validate chart name is RFC 1123 compliant
@@ -60,8 +63,7 @@ class HelmBuilderValidator(BuildStep):
         - Cannot be empty
         """
         chart_yaml_path = os.path.join(config.chart_dir, CHART_YAML)
-        with open(chart_yaml_path, "r") as file:
-            chart_yaml = yaml.safe_load(file)
+        chart_yaml = document_store.get(chart_yaml_path)
 
         # Check if 'name' field exists
         if "name" not in chart_yaml:
@@ -1,35 +1,64 @@
-"""Build step: builds a helm chart using helm package."""
+"""Build step: packages the helm chart, in-process or using helm package."""
 
 import argparse
 import logging
 import os
-from typing import Set
+import shutil
+import time
+from typing import Any, Dict, Optional, Set
 
 import configargparse
-from step_exec_lib.errors import ValidationError
+from step_exec_lib.errors import ConfigError
 from step_exec_lib.steps import BuildStep
 from step_exec_lib.types import Context, StepType
-from step_exec_lib.utils.processes import run_and_log
 
 from app_build_suite.build_steps.helm_consts import (
+    context_key_chart_digest,
     context_key_chart_file_name,
+    context_key_chart_files,
     context_key_chart_full_path,
+    context_key_chart_size,
 )
+from app_build_suite.build_steps.scheduler import RESOURCE_DESTINATION, StepResources, chart_resource, context_resource
 from app_build_suite.build_steps.steps import STEP_BUILD
 from app_build_suite.errors import BuildError
+from app_build_suite.utils.build_cache import run_cached
+from app_build_suite.utils.cache import get_cache_dir
+from app_build_suite.utils.chart_inventory import chart_inventory_store
+from app_build_suite.utils.chart_packager import DEFAULT_COMPRESS_LEVEL, FORMAT_VERSION, package_chart
+from app_build_suite.utils.processes import run_and_log
+from app_build_suite.utils.reproducible import get_source_date_epoch, is_reproducible
+from app_build_suite.utils.tools import get_tool_version, parse_helm_version
 
 logger = logging.getLogger(__name__)
 
+CHART_PACKAGER_NATIVE = "native"
+CHART_PACKAGER_HELM = "helm"
+# set by the native packager together with the archive, and stored with it in the build cache
+_PACKAGE_CONTEXT_KEYS = (context_key_chart_digest, context_key_chart_size, context_key_chart_files)
+
 
 class HelmChartBuilder(BuildStep):
     """
-    Builds a helm chart using helm3.
+    Packages the helm chart. By default the archive is written in-process (see
+    app_build_suite.utils.chart_packager); '--chart-packager helm' runs 'helm package' instead.
     """
 
     _helm_bin = "helm"
     _min_helm_version = "3.2.0"
     _max_helm_version = "4.0.0"
 
+    resources = StepResources(
+        reads=frozenset(
+            {
+                chart_resource(),
+                context_resource(context_key_chart_file_name),
+                context_resource(context_key_chart_full_path),
+            }
+        ),
+        writes=frozenset({RESOURCE_DESTINATION, *(context_resource(k) for k in _PACKAGE_CONTEXT_KEYS)}),
+    )
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_BUILD}
@@ -41,32 +70,139 @@ class HelmChartBuilder(BuildStep):
             default=".",
             help="Path of a directory to store the packaged tgz.",
         )
+        config_parser.add_argument(
+            "--chart-packager",
+            required=False,
+            default=CHART_PACKAGER_NATIVE,
+            choices=[CHART_PACKAGER_NATIVE, CHART_PACKAGER_HELM],
+            help="Create the chart's archive in-process ('native', honoring '.helmignore' like helm does) or by"
+            " running 'helm package' ('helm').",
+        )
+        config_parser.add_argument(
+            "--chart-compress-level",
+            required=False,
+            default=DEFAULT_COMPRESS_LEVEL,
+            type=int,
+            help="Gzip compression level (1-9) of the chart's archive created by the native packager.",
+        )
+        config_parser.add_argument(
+            "--chart-compress-threads",
+            required=False,
+            default=0,
+            type=int,
+            help="Number of threads compressing the chart's archive in the native packager; 0 uses one per CPU."
+            " The archive is the same for any number of threads.",
+        )
 
     def pre_run(self, config: argparse.Namespace) -> None:
         """
-        Checks if the required version of helm is installed.
+        Checks the compression options and if the required version of helm is installed, if it's used.
         :param config: the config object
         :return: None
         """
-        self._assert_binary_present_in_path(self._helm_bin)
-        run_res = run_and_log([self._helm_bin, "version"], capture_output=True)  # nosec
-        version_line = run_res.stdout.splitlines()[0]
-        prefix = "version.BuildInfo"
-        if version_line.startswith(prefix):
-            version_line = version_line[len(prefix) :].strip("{}")
-        else:
-            raise ValidationError(self.name, f"Can't parse '{self._helm_bin}' version number.")
-        version_entries = version_line.split(",")[0]
-        version = version_entries.split(":")[1].strip('"')
+        if not 1 <= self._get_compress_level(config) <= 9:
+            raise ConfigError("chart-compress-level", "The compression level must be between 1 and 9.")
+        if getattr(config, "chart_compress_threads", 0) < 0:
+            raise ConfigError("chart-compress-threads", "The number of compression threads can't be negative.")
+        if self._get_packager(config) != CHART_PACKAGER_HELM:
+            return
+        if is_reproducible(config):
+            raise ConfigError(
+                "chart-packager",
+                "Reproducible builds need the native chart packager, as 'helm package' stores the current time"
+                " in the archive.",
+            )
+        version = get_tool_version(self.name, self._helm_bin, parse_helm_version, get_cache_dir(config))
         self._assert_version_in_range(self._helm_bin, version, self._min_helm_version, self._max_helm_version)
 
     def run(self, config: argparse.Namespace, context: Context) -> None:
         """
-        Runs 'helm package' to build the chart.
+        Packages the chart or restores it from the build cache.
         :param config: the config object
         :param context: the context object
         :return: None
         """
+        packager = self._get_packager(config)
+        try:
+            source_date_epoch = get_source_date_epoch(config)
+        except ValueError as e:
+            raise BuildError(self.name, str(e))
+        run_cached(
+            config,
+            self.name,
+            logger,
+            lambda: self._get_cache_inputs(config, packager, source_date_epoch),
+            lambda: (
+                self._package_with_helm(config, context)
+                if packager == CHART_PACKAGER_HELM
+                else self._package_natively(config, context, source_date_epoch)
+            ),
+            lambda artifacts: self._restore_chart(config, artifacts),
+            lambda: {k: context[k] for k in _PACKAGE_CONTEXT_KEYS if k in context},
+            context.update,
+        )
+
+    @staticmethod
+    def _get_packager(config: argparse.Namespace) -> str:
+        return getattr(config, "chart_packager", CHART_PACKAGER_NATIVE)
+
+    @staticmethod
+    def _get_compress_level(config: argparse.Namespace) -> int:
+        return getattr(config, "chart_compress_level", DEFAULT_COMPRESS_LEVEL)
+
+    @staticmethod
+    def _get_compress_threads(config: argparse.Namespace) -> int:
+        return getattr(config, "chart_compress_threads", 0) or os.cpu_count() or 1
+
+    def _get_cache_inputs(
+        self, config: argparse.Namespace, packager: str, source_date_epoch: Optional[int]
+    ) -> Dict[str, Any]:
+        inputs: Dict[str, Any] = {
+            "packager": packager,
+            "source_date_epoch": source_date_epoch,
+            # the path is part of the output checked against the context
+            "destination": os.path.abspath(config.destination),
+        }
+        if packager == CHART_PACKAGER_HELM:
+            inputs["helm_version"] = get_tool_version(
+                self.name, self._helm_bin, parse_helm_version, get_cache_dir(config)
+            )
+        else:
+            inputs["format_version"] = FORMAT_VERSION
+            # the number of threads doesn't change the archive
+            inputs["compress_level"] = self._get_compress_level(config)
+        return inputs
+
+    def _package_natively(
+        self, config: argparse.Namespace, context: Context, source_date_epoch: Optional[int]
+    ) -> Dict[str, str]:
+        logger.info("Building chart with the native packager")
+        if source_date_epoch is not None:
+            logger.info(f"Building a reproducible archive with timestamp {source_date_epoch}.")
+        start = time.perf_counter()
+        try:
+            packaged = package_chart(
+                config.chart_dir,
+                config.destination,
+                self._get_compress_level(config),
+                source_date_epoch,
+                self._get_compress_threads(config),
+                chart_inventory_store.get(config.chart_dir),
+            )
+        except (ValueError, OSError) as e:
+            raise BuildError(self.name, f"Chart build failed: {e}")
+        self._check_chart_path(packaged.path, context)
+        context[context_key_chart_digest] = packaged.digest
+        context[context_key_chart_size] = packaged.size
+        context[context_key_chart_files] = list(packaged.files)
+        logger.info(f"Successfully packaged chart and saved it to: {packaged.path}")
+        logger.info(
+            f"Packaged {len(packaged.files)} files ({packaged.content_size} bytes) into {packaged.size} bytes"
+            f" in {time.perf_counter() - start:.3f}s."
+        )
+        return {os.path.basename(packaged.path): packaged.path}
+
+    def _package_with_helm(self, config: argparse.Namespace, context: Context) -> Dict[str, str]:
         args = [
             self._helm_bin,
             "package",
@@ -75,28 +211,38 @@ class HelmChartBuilder(BuildStep):
             config.destination,
         ]
         logger.info("Building chart with 'helm package'")
+        full_chart_path: Optional[str] = None
         run_res = run_and_log(args, capture_output=True)  # nosec, input params checked above in pre_run
         for line in run_res.stdout.splitlines():
             logger.info(line)
             if line.startswith("Successfully packaged chart and saved it to"):
                 full_chart_path = line.split(":")[1].strip()
                 full_chart_path = os.path.abspath(full_chart_path)
-                # compare our expected chart_file_name with the one returned from helm and fail if differs
-                helm_chart_file_name = os.path.basename(full_chart_path)
-                if (
-                    context_key_chart_file_name in context
-                    and helm_chart_file_name != context[context_key_chart_file_name]
-                ):
-                    raise BuildError(
-                        self.name,
-                        f"unexpected chart path '{helm_chart_file_name}' != '{context[context_key_chart_file_name]}'",
-                    )
-                if context_key_chart_full_path in context and full_chart_path != context[context_key_chart_full_path]:
-                    raise BuildError(
-                        self.name,
-                        f"unexpected helm build result: path reported in output '{full_chart_path}' "
-                        f"is not equal to '{context[context_key_chart_full_path]}'",
-                    )
+                self._check_chart_path(full_chart_path, context)
         if run_res.returncode != 0:
             logger.error(f"{self._helm_bin} run failed with exit code {run_res.returncode}")
             raise BuildError(self.name, "Chart build failed")
+        return {os.path.basename(full_chart_path): full_chart_path} if full_chart_path else {}
+
+    def _check_chart_path(self, full_chart_path: str, context: Context) -> None:
+        """Fails if the chart's archive isn't where the earlier steps expect it."""
+        chart_file_name = os.path.basename(full_chart_path)
+        if context_key_chart_file_name in context and chart_file_name != context[context_key_chart_file_name]:
+            raise BuildError(
+                self.name,
+                f"unexpected chart path '{chart_file_name}' != '{context[context_key_chart_file_name]}'",
+            )
+        if context_key_chart_full_path in context and full_chart_path != context[context_key_chart_full_path]:
+            raise BuildError(
+                self.name,
+                f"unexpected helm build result: path reported in output '{full_chart_path}' "
+                f"is not equal to '{context[context_key_chart_full_path]}'",
+            )
+
+    @staticmethod
+    def _restore_chart(config: argparse.Namespace, artifacts: Dict[str, str]) -> None:
+        for file_name, cached_path in artifacts.items():
+            target_path = os.path.abspath(os.path.join(config.destination, file_name))
+            os.makedirs(config.destination, exist_ok=True)
+            shutil.copy2(cached_path, target_path)
+            logger.info(f"Restored chart '{target_path}' from the build cache.")
@@ -8,7 +8,6 @@ from typing import Any, List, Optional, Set
 from urllib.parse import urlsplit
 
 import configargparse
-import validators
 import yaml
 from step_exec_lib.errors import ValidationError
 from step_exec_lib.steps import BuildStep
@@ -25,7 +24,10 @@ from app_build_suite.build_steps.helm_consts import (
     key_annotation_prefix,
     key_oci_annotation_prefix,
 )
+from app_build_suite.build_steps.scheduler import StepResources, chart_resource, context_resource
 from app_build_suite.build_steps.steps import STEP_METADATA
+from app_build_suite.utils.chart_inventory import chart_inventory_store
+from app_build_suite.utils.document_store import document_store
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +64,19 @@ class HelmChartMetadataBuilder(BuildStep):
     _github_host = "github.com"
     _github_raw_host = "https://raw.githubusercontent.com"
 
+    resources = StepResources(
+        reads=frozenset({chart_resource()}),
+        writes=frozenset(
+            {
+                context_resource(context_key_chart_yaml),
+                context_resource(context_key_original_chart_yaml),
+                context_resource(context_key_chart_file_name),
+                context_resource(context_key_chart_full_path),
+                context_resource(context_key_changes_made),
+            }
+        ),
+    )
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_METADATA}
@@ -92,9 +107,8 @@ class HelmChartMetadataBuilder(BuildStep):
             raise ValidationError(self.name, "config option --catalog-base-url value should end with a /")
         # first step of validation should be done already by 'ct' with correct schema (unless explicitly disabled)
         chart_yaml_path = os.path.join(config.chart_dir, CHART_YAML)
-        with open(chart_yaml_path, "r") as file:
-            chart_yaml = yaml.safe_load(file)
-        if self._key_upstream_chart_url in chart_yaml and not validators.url(chart_yaml[self._key_upstream_chart_url]):
+        chart_yaml = document_store.get(chart_yaml_path)
+        if self._key_upstream_chart_url in chart_yaml and not self._is_url(chart_yaml[self._key_upstream_chart_url]):
             raise ValidationError(
                 self.name,
                 f"Config option '{self._key_upstream_chart_url}' is not a correct URL.",
@@ -111,6 +125,13 @@ class HelmChartMetadataBuilder(BuildStep):
                 ):
                     raise ValidationError(self.name, f"Value of '{option}' is not a correct boolean.")
 
+    @staticmethod
+    def _is_url(value: Any) -> bool:
+        # imported only when there is a URL to check, as it's slow to import
+        import validators
+
+        return bool(validators.url(value))
+
     @staticmethod
     def write_chart_yaml(chart_yaml_file_name: str, data: Context) -> None:
         with open(chart_yaml_file_name, "w") as f:
@@ -211,9 +232,10 @@ class HelmChartMetadataBuilder(BuildStep):
         github_repo = self._discover_github_repo(chart_yaml)
         chart_version = chart_yaml.get("version")
         repo_root = self._find_git_repo_root(chart_dir)
+        inventory = chart_inventory_store.get(chart_dir)
         for additional_file, annotation_key in annotation_files_map.items():
             source_file_path = os.path.join(os.path.abspath(chart_dir), additional_file)
-            if os.path.isfile(source_file_path):
+            if inventory.is_file(additional_file):
                 github_url = self._build_github_annotation_url(github_repo, repo_root, source_file_path, chart_version)
                 annotations[annotation_key] = github_url
         if self._key_restrictions in chart_yaml:
@@ -7,7 +7,7 @@ import os
 import pathlib
 import shutil
 from datetime import datetime, timezone
-from typing import Any, Set
+from typing import Any, Dict, Optional, Set
 
 import yaml
 from step_exec_lib.steps import BuildStep
@@ -16,6 +16,7 @@ from step_exec_lib.types import Context, StepType
 from app_build_suite.build_steps.helm_consts import (
     CHART_YAML,
     annotation_files_map,
+    context_key_chart_digest,
     context_key_chart_file_name,
     context_key_chart_full_path,
     context_key_meta_dir_path,
@@ -23,7 +24,13 @@ from app_build_suite.build_steps.helm_consts import (
     key_annotation_prefix,
     key_oci_annotation_prefix,
 )
+from app_build_suite.build_steps.scheduler import RESOURCE_DESTINATION, StepResources, chart_resource, context_resource
 from app_build_suite.build_steps.steps import STEP_METADATA
+from app_build_suite.utils.build_cache import hash_optional_file, run_cached
+from app_build_suite.errors import BuildError
+from app_build_suite.utils.chart_inventory import chart_inventory_store
+from app_build_suite.utils.document_store import document_store
+from app_build_suite.utils.reproducible import get_source_date_epoch
 from step_exec_lib.errors import ValidationError
 from step_exec_lib.utils.files import get_file_sha256
 
@@ -51,6 +58,21 @@ class HelmChartMetadataFinalizer(BuildStep):
     _key_annotations = "annotations"
     _key_icon = "icon"
     _key_home = "home"
+    _meta_artifact = "meta"
+
+    resources = StepResources(
+        reads=frozenset(
+            {
+                chart_resource(),
+                RESOURCE_DESTINATION,
+                context_resource(context_key_chart_digest),
+                context_resource(context_key_chart_file_name),
+                context_resource(context_key_chart_full_path),
+                context_resource(context_key_original_chart_yaml),
+            }
+        ),
+        writes=frozenset({RESOURCE_DESTINATION, context_resource(context_key_meta_dir_path)}),
+    )
 
     @property
     def steps_provided(self) -> Set[StepType]:
@@ -58,8 +80,7 @@ class HelmChartMetadataFinalizer(BuildStep):
 
     def pre_run(self, config: argparse.Namespace) -> None:
         chart_yaml_path = os.path.join(config.chart_dir, CHART_YAML)
-        with open(chart_yaml_path, "r") as file:
-            chart_yaml = yaml.safe_load(file)
+        chart_yaml = document_store.get(chart_yaml_path)
         if self._key_upstream_chart_url in chart_yaml and self._key_upstream_chart_version not in chart_yaml:
             raise ValidationError(
                 self.name,
@@ -69,8 +90,10 @@ class HelmChartMetadataFinalizer(BuildStep):
             )
 
     @staticmethod
-    def get_build_timestamp() -> str:
-        return datetime.now(timezone.utc).isoformat(timespec="microseconds").split("+")[0] + "Z"
+    def get_build_timestamp(timestamp: Optional[int] = None) -> str:
+        """Formats the current time, or the given Unix timestamp of a reproducible build, like helm does."""
+        moment = datetime.now(timezone.utc) if timestamp is None else datetime.fromtimestamp(timestamp, timezone.utc)
+        return moment.isoformat(timespec="microseconds").split("+")[0] + "Z"
 
     @staticmethod
     def write_meta_file(meta_file_name: str, meta: Context) -> None:
@@ -119,11 +142,39 @@ class HelmChartMetadataFinalizer(BuildStep):
         if not config.generate_metadata:
             logger.info("Metadata generation is disabled using 'generate-metadata' option.")
             return
+        # computed by the packager while writing the archive; only 'helm package' makes reading it again necessary
+        digest = context.get(context_key_chart_digest) or get_file_sha256(context[context_key_chart_full_path])
+        try:
+            source_date_epoch = get_source_date_epoch(config)
+        except ValueError as e:
+            raise BuildError(self.name, str(e))
+        # a chart restored from the build cache gets the metadata (including the creation date) of the same build
+        run_cached(
+            config,
+            self.name,
+            logger,
+            lambda: {
+                "digest": digest,
+                "source_date_epoch": source_date_epoch,
+                "chart_file_name": context[context_key_chart_file_name],
+                "original_chart_yaml": context[context_key_original_chart_yaml],
+                "additional_files": {
+                    f: hash_optional_file(os.path.join(os.path.abspath(config.chart_dir), f))
+                    for f in annotation_files_map.keys()
+                },
+            },
+            lambda: self._write_metadata(config, context, digest, source_date_epoch),
+            lambda artifacts: self._restore_metadata(context, artifacts),
+        )
+
+    def _write_metadata(
+        self, config: argparse.Namespace, context: Context, digest: str, source_date_epoch: Optional[int]
+    ) -> Dict[str, str]:
         meta = {}
         # mandatory metadata
         meta[self._key_chart_file] = context[context_key_chart_file_name]
-        meta[self._key_digest] = get_file_sha256(context[context_key_chart_full_path])
-        meta[self._key_date_created] = self.get_build_timestamp()
+        meta[self._key_digest] = digest
+        meta[self._key_date_created] = self.get_build_timestamp(source_date_epoch)
         meta[self._key_chart_api_version] = context[context_key_original_chart_yaml][self._key_api_version]
         # optional metadata
         for key in [
@@ -149,8 +200,15 @@ class HelmChartMetadataFinalizer(BuildStep):
         logger.info(f"Metadata file saved to '{meta_file_name}'")
         # copy additional files to metadata directory
         chart_dir = config.chart_dir
+        inventory = chart_inventory_store.get(chart_dir)
         for additional_file in annotation_files_map.keys():
             source_file_path = os.path.join(os.path.abspath(chart_dir), additional_file)
-            if os.path.isfile(source_file_path):
+            if inventory.is_file(additional_file):
                 target_file_path = os.path.join(meta_dir_path, os.path.basename(additional_file))
                 shutil.copy2(source_file_path, target_file_path)
+        return {self._meta_artifact: meta_dir_path}
+
+    def _restore_metadata(self, context: Context, artifacts: Dict[str, str]) -> None:
+        context[context_key_meta_dir_path] = f"{context[context_key_chart_full_path]}-meta"
+        shutil.copytree(artifacts[self._meta_artifact], context[context_key_meta_dir_path], dirs_exist_ok=True)
+        logger.info(f"Restored metadata directory '{context[context_key_meta_dir_path]}' from the build cache.")
@@ -6,13 +6,20 @@ import os
 from typing import Set
 
 import configargparse
+import yaml
 from step_exec_lib.errors import ValidationError
 from step_exec_lib.steps import BuildStep
 from step_exec_lib.types import Context, StepType
-from step_exec_lib.utils.processes import run_and_log
 
+from app_build_suite.build_steps.helm_consts import CHART_YAML, CHARTS_DIR, REQUIREMENTS_YAML
+from app_build_suite.build_steps.scheduler import StepResources, chart_resource
 from app_build_suite.build_steps.steps import STEP_VALIDATE
 from app_build_suite.errors import BuildError
+from app_build_suite.utils.build_cache import hash_optional_file, run_cached
+from app_build_suite.utils.cache import get_cache_dir
+from app_build_suite.utils.document_store import document_store
+from app_build_suite.utils.processes import run_and_log
+from app_build_suite.utils.tools import get_tool_version, parse_ct_version
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +29,14 @@ class HelmChartToolLinter(BuildStep):
     Runs helm ct linter against the chart.
     """
 
+    # 'ct lint' runs 'helm dependency build', which rewrites the 'charts/' directory (and uses 'tmpcharts/'
+    # with older helm versions); charts without dependencies are only read, see 'get_resources'
+    resources = StepResources(
+        reads=frozenset({chart_resource()}),
+        writes=frozenset({chart_resource(CHARTS_DIR), chart_resource("tmpcharts")}),
+    )
+    _read_only_resources = StepResources(reads=frozenset({chart_resource()}))
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_VALIDATE}
@@ -49,12 +64,8 @@ class HelmChartToolLinter(BuildStep):
         :param config: the config object
         :return: None
         """
-        # verify if binary present
-        self._assert_binary_present_in_path(self._ct_bin)
-        # verify version
-        run_res = run_and_log([self._ct_bin, "version"], capture_output=True)  # nosec
-        version_line = run_res.stdout.splitlines()[0]
-        version = version_line.split(":")[1].strip()
+        # verify if binary present and its version
+        version = get_tool_version(self.name, self._ct_bin, parse_ct_version, get_cache_dir(config))
         self._assert_version_in_range(self._ct_bin, version, self._min_ct_version, self._max_ct_version)
         # validate config options
         if config.ct_config is not None and not os.path.isabs(config.ct_config):
@@ -88,7 +99,34 @@ class HelmChartToolLinter(BuildStep):
                 f"Chart tool schema file {config.ct_schema} doesn't exist.",
             )
 
+    def get_resources(self, config: argparse.Namespace) -> StepResources:
+        return self.resources if self._has_dependencies(config) else self._read_only_resources
+
+    @staticmethod
+    def _has_dependencies(config: argparse.Namespace) -> bool:
+        if os.path.isfile(os.path.join(config.chart_dir, REQUIREMENTS_YAML)):
+            return True
+        try:
+            chart_yaml = document_store.get(os.path.join(config.chart_dir, CHART_YAML))
+        except (OSError, yaml.YAMLError):
+            return True
+        return bool(isinstance(chart_yaml, dict) and chart_yaml.get("dependencies"))
+
     def run(self, config: argparse.Namespace, _: Context) -> None:
+        run_cached(
+            config,
+            self.name,
+            logger,
+            lambda: {
+                "ct_version": get_tool_version(self.name, self._ct_bin, parse_ct_version, get_cache_dir(config)),
+                "debug": config.debug,
+                "ct_config": hash_optional_file(config.ct_config),
+                "ct_schema": hash_optional_file(config.ct_schema),
+            },
+            lambda: self._lint(config),
+        )
+
+    def _lint(self, config: argparse.Namespace) -> None:
         args = [
             self._ct_bin,
             "lint",
@@ -15,12 +15,17 @@ from app_build_suite.build_steps.helm_consts import (
     context_key_changes_made,
     context_key_chart_lock_files_to_restore,
 )
+from app_build_suite.build_steps.scheduler import StepResources
 from app_build_suite.build_steps.steps import STEP_BUILD
+from app_build_suite.utils.document_store import document_store
 
 logger = logging.getLogger(__name__)
 
 
 class HelmChartYAMLRestorer(BuildStep):
+    # the build stage does nothing, all the work is done in pre_run or cleanup
+    resources = StepResources()
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_BUILD}
@@ -50,6 +55,7 @@ class HelmChartYAMLRestorer(BuildStep):
             logger.info(f"Restoring backup {CHART_YAML}.back to {CHART_YAML}")
             chart_yaml_path = os.path.join(config.chart_dir, CHART_YAML)
             shutil.move(chart_yaml_path + ".back", chart_yaml_path)
+            document_store.invalidate(chart_yaml_path)
         if context_key_chart_lock_files_to_restore in context and context[context_key_chart_lock_files_to_restore]:
             for file_name in context[context_key_chart_lock_files_to_restore]:
                 logger.info(f"Restoring backup {file_name}.back to {file_name}")
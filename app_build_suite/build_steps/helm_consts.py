@@ -7,6 +7,8 @@ README_MD = "README.md"
 CHART_LOCK = "Chart.lock"
 REQUIREMENTS_LOCK = "requirements.lock"
 TEMPLATES_DIR = "templates"
+CHARTS_DIR = "charts"
+REQUIREMENTS_YAML = "requirements.yaml"
 HELPERS_YAML = "_helpers.yaml"
 HELPERS_TPL = "_helpers.tpl"
 
@@ -14,11 +16,18 @@ HELPERS_TPL = "_helpers.tpl"
 context_key_chart_yaml: str = "chart_yaml"
 context_key_chart_full_path: str = "chart_full_path"
 context_key_chart_file_name: str = "chart_file_name"
+context_key_chart_digest: str = "chart_digest"
+"""Hexadecimal SHA-256 digest of the packaged chart, computed while it's written."""
+context_key_chart_size: str = "chart_size"
+context_key_chart_files: str = "chart_files"
+"""Paths of the files in the packaged chart, in archive order."""
 context_key_changes_made: str = "changes_made"
 context_key_meta_dir_path: str = "meta_dir_path"
 context_key_chart_lock_files_to_restore: str = "chart_lock_files_to_restore"
 context_key_original_chart_yaml: str = "original_chart_yaml"
 context_key_artifacthub_readme_copied: str = "artifacthub_readme_copied"
+context_key_rendered_manifests_dir: str = "rendered_manifests_dir"
+"""Directory with the chart rendered by 'helm template' with default values, in a file per template."""
 
 
 class BlockLiteralStr(str):
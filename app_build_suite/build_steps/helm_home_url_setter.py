@@ -13,6 +13,7 @@ from app_build_suite.build_steps.helm_consts import (
     context_key_changes_made,
     context_key_chart_yaml,
 )
+from app_build_suite.build_steps.scheduler import StepResources, chart_resource, context_resource
 from app_build_suite.build_steps.steps import STEP_BUILD
 from app_build_suite.utils.git import GitRepoVersionInfo
 from app_build_suite.utils.git_url import GitUrlConverter
@@ -31,6 +32,11 @@ class HelmHomeUrlSetter(BuildStep):
     - Adds 'home' field if missing, updates if present
     """
 
+    resources = StepResources(
+        reads=frozenset({chart_resource()}),
+        writes=frozenset({context_resource(context_key_chart_yaml), context_resource(context_key_changes_made)}),
+    )
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_BUILD}
@@ -6,18 +6,21 @@ import os
 import shutil
 from typing import List, Set
 
-from step_exec_lib.errors import ValidationError
 from step_exec_lib.steps import BuildStep
 from step_exec_lib.types import Context, StepType
-from step_exec_lib.utils.processes import run_and_log
 
 from app_build_suite.build_steps.helm_consts import (
     CHART_LOCK,
     REQUIREMENTS_LOCK,
     context_key_chart_lock_files_to_restore,
 )
+from app_build_suite.build_steps.scheduler import StepResources, chart_resource, context_resource
 from app_build_suite.build_steps.steps import STEP_BUILD
 from app_build_suite.errors import BuildError
+from app_build_suite.utils.cache import get_cache_dir
+from app_build_suite.utils.chart_inventory import chart_inventory_store
+from app_build_suite.utils.processes import run_and_log
+from app_build_suite.utils.tools import get_tool_version, parse_helm_version
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +34,10 @@ class HelmRequirementsUpdater(BuildStep):
     _min_helm_version = "3.8.1"
     _max_helm_version = "4.0.0"
 
+    resources = StepResources(
+        writes=frozenset({chart_resource(), context_resource(context_key_chart_lock_files_to_restore)}),
+    )
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_BUILD}
@@ -41,12 +48,8 @@ class HelmRequirementsUpdater(BuildStep):
 
     # noinspection PyMethodMayBeStatic
     def _detect_chart_lock_files(self, config: argparse.Namespace) -> List[str]:
-        lock_files = []
-        if os.path.isfile(os.path.join(config.chart_dir, CHART_LOCK)):
-            lock_files.append(CHART_LOCK)
-        if os.path.isfile(os.path.join(config.chart_dir, REQUIREMENTS_LOCK)):
-            lock_files.append(REQUIREMENTS_LOCK)
-        return lock_files
+        inventory = chart_inventory_store.get(config.chart_dir)
+        return [lock_file for lock_file in (CHART_LOCK, REQUIREMENTS_LOCK) if inventory.is_file(lock_file)]
 
     def pre_run(self, config: argparse.Namespace) -> None:
         """
@@ -60,16 +63,7 @@ class HelmRequirementsUpdater(BuildStep):
         if len(self._detect_chart_lock_files(config)) == 0:
             logger.debug(f"No {CHART_LOCK} or {REQUIREMENTS_LOCK} file exists, skipping dependency update.")
             return
-        self._assert_binary_present_in_path(self._helm_bin)
-        run_res = run_and_log([self._helm_bin, "version"], capture_output=True)  # nosec
-        version_line = run_res.stdout.splitlines()[0]
-        prefix = "version.BuildInfo"
-        if version_line.startswith(prefix):
-            version_line = version_line[len(prefix) :].strip("{}")
-        else:
-            raise ValidationError(self.name, f"Can't parse '{self._helm_bin}' version number.")
-        version_entries = version_line.split(",")[0]
-        version = version_entries.split(":")[1].strip('"')
+        version = get_tool_version(self.name, self._helm_bin, parse_helm_version, get_cache_dir(config))
         self._assert_version_in_range(self._helm_bin, version, self._min_helm_version, self._max_helm_version)
 
     def run(self, config: argparse.Namespace, context: Context) -> None:
@@ -1,31 +1,141 @@
 """Build step: renders the chart with 'helm template' and validates the output YAML."""
 
 import argparse
+import contextvars
+import glob
 import logging
 import os
 import re
-from typing import Set
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Set, Tuple
 
 import configargparse
 import yaml
-from step_exec_lib.errors import ValidationError
+from step_exec_lib.errors import ConfigError, ValidationError
 from step_exec_lib.steps import BuildStep
 from step_exec_lib.types import Context, StepType
-from step_exec_lib.utils.processes import run_and_log
 
-from app_build_suite.build_steps.helm_consts import CHART_YAML, context_key_chart_yaml
+from app_build_suite.build_steps.helm_consts import (
+    CHART_YAML,
+    context_key_chart_yaml,
+    context_key_rendered_manifests_dir,
+)
+from app_build_suite.build_steps.scheduler import StepResources, chart_resource, context_resource
 from app_build_suite.build_steps.steps import STEP_VALIDATE
 from app_build_suite.errors import BuildError
-from app_build_suite.utils.yaml_strict import DuplicateKeyError, UniqueKeyLoader, find_nearest_source
+from app_build_suite.utils.build_cache import hash_optional_file, run_cached
+from app_build_suite.utils.cache import get_cache_dir
+from app_build_suite.utils.chart_inventory import chart_inventory_store
+from app_build_suite.utils.document_store import document_store
+from app_build_suite.utils.processes import stream_and_log
+from app_build_suite.utils.rendered_manifests import RenderedManifestsWriter
+from app_build_suite.utils.tools import get_tool_version, parse_helm_version
+from app_build_suite.utils.yaml_strict import (
+    RenderedDocument,
+    RenderedDocumentSplitter,
+    SourceIndex,
+    StrictLoadResult,
+    check_documents,
+)
 
 logger = logging.getLogger(__name__)
 
 LIBRARY_CHART_TYPE = "library"
+DEFAULT_SCENARIO = "default values"
+# values files that 'ct lint' and 'ct install' render the chart with
+CI_VALUES_GLOB = os.path.join("ci", "*-values.yaml")
 
 # Matches a call to helm's `lookup` template function, e.g. `(lookup "v1" "ConfigMap" ns name)`.
 # Deliberately loose — this only tailors an error hint, so a false positive is harmless.
 LOOKUP_CALL_RE = re.compile(r"\blookup\s+[\"'(]")
 
+# Size of the batches of rendered documents sent to worker processes. Big enough to make the cost of
+# passing them between processes negligible, small enough to spread a chart over all the workers.
+_BATCH_SIZE = 256 * 1024
+
+
+class _DocumentBatch:
+    """Consecutive rendered documents, validated together as one YAML stream."""
+
+    def __init__(self) -> None:
+        self.documents: List[RenderedDocument] = []
+        self.size = 0
+
+    def add(self, document: RenderedDocument) -> None:
+        self.documents.append(document)
+        self.size += len(document.text)
+
+    @property
+    def text(self) -> str:
+        return "".join(d.text for d in self.documents)
+
+    @property
+    def first_line(self) -> int:
+        return self.documents[0].first_line
+
+
+class _RenderedDocumentsChecker:
+    """
+    Validates rendered documents as they're added: either one by one right away or, with an executor,
+    in batches validated in worker processes. At most 'max_pending' batches are in flight, so memory
+    use stays bounded. Results are processed in the stream order, so the reported error is always
+    the first one in the output, no matter which worker finishes first.
+    """
+
+    def __init__(
+        self, step_name: str, source_index: SourceIndex, executor: Optional[Executor], max_pending: int
+    ) -> None:
+        self._step_name = step_name
+        self._source_index = source_index
+        self._executor = executor
+        self._max_pending = max_pending
+        self._batch = _DocumentBatch()
+        self._pending: Deque[Tuple[_DocumentBatch, "Future[StrictLoadResult]"]] = deque()
+        self.document_count = 0
+
+    def add(self, document: RenderedDocument) -> None:
+        if self._executor is None:
+            batch = _DocumentBatch()
+            batch.add(document)
+            self._check_result(batch, check_documents(document.text, document.first_line))
+            return
+        self._batch.add(document)
+        if self._batch.size >= _BATCH_SIZE:
+            self._submit()
+
+    def finish(self) -> None:
+        if self._batch.documents:
+            self._submit()
+        while self._pending:
+            self._collect()
+
+    def _submit(self) -> None:
+        assert self._executor is not None
+        batch, self._batch = self._batch, _DocumentBatch()
+        self._pending.append((batch, self._executor.submit(check_documents, batch.text, batch.first_line)))
+        while len(self._pending) > self._max_pending:
+            self._collect()
+
+    def _collect(self) -> None:
+        batch, future = self._pending.popleft()
+        self._check_result(batch, future.result())
+
+    def _check_result(self, batch: _DocumentBatch, result: StrictLoadResult) -> None:
+        if result.error is None:
+            self.document_count += result.document_count
+            return
+        if result.error_line is not None:
+            source = self._source_index.source_at(result.error_line)
+        else:
+            source = batch.documents[0].source if len(batch.documents) == 1 else None
+        in_template = f" (template: '{source}')" if source else ""
+        if result.duplicate_key:
+            raise BuildError(self._step_name, f"Duplicate YAML key in the rendered chart{in_template}: {result.error}")
+        raise BuildError(self._step_name, f"Invalid YAML in the rendered chart{in_template}: {result.error}")
+
 
 class HelmTemplateValidator(BuildStep):
     """
@@ -39,6 +149,13 @@ class HelmTemplateValidator(BuildStep):
     _max_helm_version = "4.0.0"
     _release_name = "abs-validation"
 
+    _rendered_artifact = "rendered"
+
+    resources = StepResources(
+        reads=frozenset({chart_resource(), context_resource(context_key_chart_yaml)}),
+        writes=frozenset({context_resource(context_key_rendered_manifests_dir)}),
+    )
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_VALIDATE}
@@ -59,6 +176,36 @@ class HelmTemplateValidator(BuildStep):
             " don't render with default values only (e.g. templates using 'required'). Can be used multiple"
             " times.",
         )
+        config_parser.add_argument(
+            "--helm-template-values-matrix",
+            required=False,
+            action="append",
+            help="Path or glob pattern of values files to validate the chart with, each in a separate 'helm template'"
+            " run (on top of '--helm-template-extra-values'). The chart is always validated with default values"
+            " too. Can be used multiple times.",
+        )
+        config_parser.add_argument(
+            "--helm-template-ci-values",
+            required=False,
+            default=False,
+            action="store_true",
+            help="Add each 'ci/*-values.yaml' file of the chart (used by 'ct') to '--helm-template-values-matrix'.",
+        )
+        config_parser.add_argument(
+            "--helm-template-parallel-renders",
+            required=False,
+            default=1,
+            type=int,
+            help="Maximum number of 'helm template' runs of the values matrix executed at the same time.",
+        )
+        config_parser.add_argument(
+            "--helm-template-validation-workers",
+            required=False,
+            default=1,
+            type=int,
+            help="Number of processes validating the rendered chart. Use more than 1 to validate big charts"
+            " (with many rendered documents) on multiple CPU cores.",
+        )
 
     def pre_run(self, config: argparse.Namespace) -> None:
         """
@@ -69,16 +216,13 @@ class HelmTemplateValidator(BuildStep):
         if config.disable_helm_template_validator:
             logger.debug("Helm template validation is disabled, skipping pre-run.")
             return
-        self._assert_binary_present_in_path(self._helm_bin)
-        run_res = run_and_log([self._helm_bin, "version"], capture_output=True)  # nosec
-        version_line = run_res.stdout.splitlines()[0]
-        prefix = "version.BuildInfo"
-        if version_line.startswith(prefix):
-            version_line = version_line[len(prefix) :].strip("{}")
-        else:
-            raise ValidationError(self.name, f"Can't parse '{self._helm_bin}' version number.")
-        version_entries = version_line.split(",")[0]
-        version = version_entries.split(":")[1].strip('"')
+        if config.helm_template_validation_workers < 1:
+            raise ConfigError(
+                "helm-template-validation-workers", "The number of validation processes must be at least 1."
+            )
+        if config.helm_template_parallel_renders < 1:
+            raise ConfigError("helm-template-parallel-renders", "The number of parallel renders must be at least 1.")
+        version = get_tool_version(self.name, self._helm_bin, parse_helm_version, get_cache_dir(config))
         self._assert_version_in_range(self._helm_bin, version, self._min_helm_version, self._max_helm_version)
         extra_values = config.helm_template_extra_values or []
         for i, values_file in enumerate(extra_values):
@@ -89,6 +233,30 @@ class HelmTemplateValidator(BuildStep):
                     self.name,
                     f"Values file '{values_file}' configured with '--helm-template-extra-values' doesn't exist.",
                 )
+        config.helm_template_values_matrix = self._expand_values_matrix(config.helm_template_values_matrix or [])
+
+    def _expand_values_matrix(self, patterns: List[str]) -> List[str]:
+        """Resolves the '--helm-template-values-matrix' entries to absolute paths of existing files."""
+        values_files: List[str] = []
+        for pattern in patterns:
+            if not os.path.isabs(pattern):
+                pattern = os.path.join(os.getcwd(), pattern)
+            if any(c in pattern for c in "*?["):
+                matches = sorted(f for f in glob.glob(pattern) if os.path.isfile(f))
+                if not matches:
+                    raise ValidationError(
+                        self.name,
+                        f"Pattern '{pattern}' configured with '--helm-template-values-matrix' doesn't match any file.",
+                    )
+                values_files += matches
+            elif os.path.isfile(pattern):
+                values_files.append(pattern)
+            else:
+                raise ValidationError(
+                    self.name,
+                    f"Values file '{pattern}' configured with '--helm-template-values-matrix' doesn't exist.",
+                )
+        return values_files
 
     def _is_library_chart(self, config: argparse.Namespace, context: Context) -> bool:
         """
@@ -101,8 +269,7 @@ class HelmTemplateValidator(BuildStep):
         chart_yaml = context.get(context_key_chart_yaml) if context else None
         if chart_yaml is None:
             try:
-                with open(os.path.join(config.chart_dir, CHART_YAML), "r") as f:
-                    chart_yaml = yaml.safe_load(f)
+                chart_yaml = document_store.get(os.path.join(config.chart_dir, CHART_YAML))
             except (OSError, yaml.YAMLError):
                 # Chart.yaml is validated by other steps; don't fail here, just don't skip.
                 return False
@@ -116,16 +283,14 @@ class HelmTemplateValidator(BuildStep):
         `lookup` defensively and render fine, so its presence says nothing about whether the
         render should have succeeded.
         """
-        for root, _, files in os.walk(chart_dir):
-            for name in files:
-                if not name.endswith((".yaml", ".yml", ".tpl", ".txt")):
-                    continue
-                try:
-                    with open(os.path.join(root, name), "r", errors="replace") as f:
-                        if LOOKUP_CALL_RE.search(f.read()):
-                            return True
-                except OSError:
-                    continue
+        inventory = chart_inventory_store.get(chart_dir)
+        for entry in inventory.files((".yaml", ".yml", ".tpl", ".txt")):
+            try:
+                with open(inventory.get_abs_path(entry), "r", errors="replace") as f:
+                    if LOOKUP_CALL_RE.search(f.read()):
+                        return True
+            except OSError:
+                continue
         return False
 
     def _render_failure_hints(self, config: argparse.Namespace) -> str:
@@ -152,6 +317,122 @@ class HelmTemplateValidator(BuildStep):
             # They have no renderable output of their own, so there is nothing to validate.
             logger.info("Chart is a library chart and cannot be rendered by 'helm template'; skipping.")
             return
+        # the manifests rendered with default values are shared with the following steps, like KubeLinter
+        rendered_dir = tempfile.mkdtemp(prefix="abs-rendered-")
+        try:
+            run_cached(
+                config,
+                self.name,
+                logger,
+                lambda: {
+                    "helm_version": get_tool_version(
+                        self.name, self._helm_bin, parse_helm_version, get_cache_dir(config)
+                    ),
+                    "extra_values": [hash_optional_file(f) for f in config.helm_template_extra_values or []],
+                    "values_matrix": [hash_optional_file(f) for f in config.helm_template_values_matrix or []],
+                    "ci_values": config.helm_template_ci_values,
+                },
+                lambda: self._validate_scenarios(config, rendered_dir),
+                lambda artifacts: self._restore_rendered(artifacts, rendered_dir),
+            )
+        except BaseException:
+            shutil.rmtree(rendered_dir, ignore_errors=True)
+            raise
+        context[context_key_rendered_manifests_dir] = rendered_dir
+
+    def _restore_rendered(self, artifacts: Dict[str, str], rendered_dir: str) -> None:
+        shutil.copytree(artifacts[self._rendered_artifact], rendered_dir, dirs_exist_ok=True)
+
+    def cleanup(
+        self,
+        config: argparse.Namespace,
+        context: Context,
+        has_build_failed: bool,
+    ) -> None:
+        rendered_dir = context.get(context_key_rendered_manifests_dir)
+        if rendered_dir:
+            logger.debug(f"Removing rendered manifests from '{rendered_dir}'.")
+            shutil.rmtree(rendered_dir, ignore_errors=True)
+
+    def _get_scenarios(self, config: argparse.Namespace) -> List[Tuple[str, List[str]]]:
+        """Returns the name and the values files of every 'helm template' run to validate."""
+        extra_values = list(config.helm_template_extra_values or [])
+        matrix = list(config.helm_template_values_matrix or [])
+        if config.helm_template_ci_values:
+            matrix += sorted(glob.glob(os.path.join(config.chart_dir, CI_VALUES_GLOB)))
+        scenarios = [(DEFAULT_SCENARIO, extra_values)]
+        scenarios += [(f"values file '{values_file}'", extra_values + [values_file]) for values_file in matrix]
+        return scenarios
+
+    def _validate_scenarios(self, config: argparse.Namespace, rendered_dir: str) -> Dict[str, str]:
+        """Validates all the scenarios; returns the directory with manifests rendered with default values."""
+        scenarios = self._get_scenarios(config)
+        workers = config.helm_template_validation_workers
+        # a single process pool validates the output of all the renders
+        executor: Optional[Executor] = None
+        if workers > 1:
+            # importing the process pool loads multiprocessing, so it's done only when workers are used
+            from concurrent.futures import ProcessPoolExecutor
+
+            executor = ProcessPoolExecutor(max_workers=workers)
+        failed: List[str] = []
+        try:
+            if len(scenarios) == 1:
+                name, values_files = scenarios[0]
+                doc_count = self._render_and_validate(config, name, values_files, executor, rendered_dir)
+                logger.info(f"Rendered chart is valid YAML ({doc_count} documents, no duplicate keys).")
+                return {self._rendered_artifact: rendered_dir}
+            logger.info(f"Validating the chart rendered with {len(scenarios)} values scenarios.")
+            with ThreadPoolExecutor(
+                max_workers=config.helm_template_parallel_renders, thread_name_prefix="helm-template"
+            ) as renders:
+                futures = [
+                    # each render runs in a copy of the context, so it's profiled as a part of this step
+                    renders.submit(
+                        contextvars.copy_context().run,
+                        self._render_and_validate,
+                        config,
+                        name,
+                        values_files,
+                        executor,
+                        rendered_dir if name == DEFAULT_SCENARIO else None,
+                    )
+                    for name, values_files in scenarios
+                ]
+                # results are logged here, in the scenarios' order, and not by the threads
+                for (name, _), future in zip(scenarios, futures):
+                    try:
+                        doc_count = future.result()
+                    except BuildError as e:
+                        logger.error(f"Scenario {name}: {e.msg}")
+                        failed.append(name)
+                        continue
+                    logger.info(f"Scenario {name}: rendered chart is valid YAML ({doc_count} documents).")
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        if failed:
+            raise BuildError(
+                self.name,
+                f"Rendered chart validation failed for {len(failed)} of {len(scenarios)} values scenarios:"
+                f" {', '.join(failed)}.",
+            )
+        logger.info(f"Rendered chart is valid YAML in all the {len(scenarios)} values scenarios.")
+        return {self._rendered_artifact: rendered_dir}
+
+    def _render_and_validate(
+        self,
+        config: argparse.Namespace,
+        scenario: str,
+        values_files: List[str],
+        executor: Optional[Executor],
+        output_dir: Optional[str] = None,
+    ) -> int:
+        """
+        Renders the chart with the values files and validates the output.
+        :param output_dir: If set, the rendered documents are also stored there, in a file per template.
+        :return: The number of rendered documents.
+        """
         args = [
             self._helm_bin,
             "template",
@@ -159,10 +440,29 @@ class HelmTemplateValidator(BuildStep):
             config.chart_dir,
             "--include-crds",
         ]
-        for values_file in config.helm_template_extra_values or []:
+        for values_file in values_files:
             args += ["--values", values_file]
-        logger.info("Rendering the chart with 'helm template' to validate the output.")
-        run_res = run_and_log(args, capture_output=True)  # nosec, input params checked above in pre_run
+        logger.info(f"Rendering the chart with 'helm template' and {scenario} to validate the output.")
+        # the output of big charts can be hundreds of MBs, so documents are validated as soon as they're
+        # read from the pipe instead of buffering the whole output first
+        splitter = RenderedDocumentSplitter()
+        checker = _RenderedDocumentsChecker(
+            self.name, splitter.source_index, executor, 2 * config.helm_template_validation_workers
+        )
+
+        writer = RenderedManifestsWriter(output_dir) if output_dir else None
+
+        def add_document(document: RenderedDocument) -> None:
+            if writer is not None:
+                writer.write(document)
+            checker.add(document)
+
+        def validate_line(line: str) -> None:
+            document = splitter.feed(line)
+            if document is not None:
+                add_document(document)
+
+        run_res = stream_and_log(args, validate_line)  # nosec, input params checked above in pre_run
         if run_res.returncode != 0:
             logger.error(f"{self._helm_bin} template run failed with exit code {run_res.returncode}")
             for line in run_res.stderr.splitlines():
@@ -170,18 +470,8 @@ class HelmTemplateValidator(BuildStep):
             for line in self._render_failure_hints(config).splitlines():
                 logger.error(line)
             raise BuildError(self.name, "'helm template' rendering failed")
-        rendered = run_res.stdout
-        try:
-            doc_count = sum(1 for _ in yaml.load_all(rendered, Loader=UniqueKeyLoader))  # nosec, safe subclass
-        except DuplicateKeyError as e:
-            source = find_nearest_source(rendered, e.line)
-            in_template = f" (template: '{source}')" if source else ""
-            raise BuildError(self.name, f"Duplicate YAML key in the rendered chart{in_template}: {e}")
-        except yaml.MarkedYAMLError as e:
-            line = e.problem_mark.line + 1 if e.problem_mark else 0
-            source = find_nearest_source(rendered, line) if line else None
-            in_template = f" (template: '{source}')" if source else ""
-            raise BuildError(self.name, f"Invalid YAML in the rendered chart{in_template}: {e}")
-        except yaml.YAMLError as e:
-            raise BuildError(self.name, f"Invalid YAML in the rendered chart: {e}")
-        logger.info(f"Rendered chart is valid YAML ({doc_count} documents, no duplicate keys).")
+        last_document = splitter.close()
+        if last_document is not None:
+            add_document(last_document)
+        checker.finish()
+        return checker.document_count
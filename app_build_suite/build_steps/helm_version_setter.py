@@ -15,6 +15,7 @@ from app_build_suite.build_steps.helm_consts import (
     context_key_changes_made,
     context_key_chart_yaml,
 )
+from app_build_suite.build_steps.scheduler import StepResources, context_resource
 from app_build_suite.build_steps.steps import STEP_BUILD
 
 logger = logging.getLogger(__name__)
@@ -25,6 +26,10 @@ class HelmVersionSetter(BuildStep):
     Sets chart `version` and/or `appVersion` from explicit command line arguments.
     """
 
+    resources = StepResources(
+        writes=frozenset({context_resource(context_key_chart_yaml), context_resource(context_key_changes_made)}),
+    )
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_BUILD}
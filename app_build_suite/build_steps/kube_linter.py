@@ -3,16 +3,21 @@
 import argparse
 import logging
 import os
-from typing import Set
+from typing import Optional, Set
 
 import configargparse
 from step_exec_lib.errors import ValidationError
 from step_exec_lib.steps import BuildStep
 from step_exec_lib.types import Context, StepType
-from step_exec_lib.utils.processes import run_and_log
 
+from app_build_suite.build_steps.helm_consts import context_key_rendered_manifests_dir
+from app_build_suite.build_steps.scheduler import StepResources, chart_resource, context_resource
 from app_build_suite.build_steps.steps import STEP_STATIC_CHECK
 from app_build_suite.errors import BuildError
+from app_build_suite.utils.build_cache import get_build_cache, hash_optional_file, run_cached
+from app_build_suite.utils.cache import get_cache_dir
+from app_build_suite.utils.processes import run_and_log
+from app_build_suite.utils.tools import get_tool_version, parse_first_line_version
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +25,13 @@ logger = logging.getLogger(__name__)
 class KubeLinter(BuildStep):
     """
     Runs kube-linter against the chart.
+
+    If HelmTemplateValidator already rendered the chart, kube-linter lints these manifests instead
+    of rendering the chart once more on its own.
     """
 
+    resources = StepResources(reads=frozenset({chart_resource(), context_resource(context_key_rendered_manifests_dir)}))
+
     @property
     def steps_provided(self) -> Set[StepType]:
         return {STEP_STATIC_CHECK}
@@ -45,11 +55,8 @@ class KubeLinter(BuildStep):
         :param config: the config object
         :return: None
         """
-        # verify if binary present
-        self._assert_binary_present_in_path(self._kubelinter_bin)
-        # verify version
-        run_res = run_and_log([self._kubelinter_bin, "version"], capture_output=True)  # nosec
-        version = run_res.stdout.splitlines()[0]
+        # verify if binary present and its version
+        version = get_tool_version(self.name, self._kubelinter_bin, parse_first_line_version, get_cache_dir(config))
         self._assert_version_in_range(
             self._kubelinter_bin,
             version,
@@ -68,11 +75,35 @@ class KubeLinter(BuildStep):
         if not config.kubelinter_config and os.path.isfile(_default_cfg_path):
             config.kubelinter_config = _default_cfg_path
 
-    def run(self, config: argparse.Namespace, _: Context) -> None:
+    def run(self, config: argparse.Namespace, context: Context) -> None:
+        rendered_dir = context.get(context_key_rendered_manifests_dir)
+        run_cached(
+            config,
+            self.name,
+            logger,
+            lambda: {
+                "kube_linter_version": get_tool_version(
+                    self.name, self._kubelinter_bin, parse_first_line_version, get_cache_dir(config)
+                ),
+                "kubelinter_config": hash_optional_file(config.kubelinter_config),
+                # the rendered manifests also depend on options like '--helm-template-extra-values'
+                "rendered_manifests": self._hash_rendered_manifests(config, rendered_dir),
+            },
+            lambda: self._lint(config, rendered_dir or config.chart_dir),
+        )
+
+    @staticmethod
+    def _hash_rendered_manifests(config: argparse.Namespace, rendered_dir: Optional[str]) -> Optional[str]:
+        cache = get_build_cache(config)
+        if cache is None or not rendered_dir:
+            return None
+        return cache.hash_tree(rendered_dir)
+
+    def _lint(self, config: argparse.Namespace, lint_path: str) -> None:
         args = [
             self._kubelinter_bin,
             "lint",
-            config.chart_dir,
+            lint_path,
             "--verbose",
         ]
 
@@ -81,7 +112,10 @@ class KubeLinter(BuildStep):
 
         if config.kubelinter_config is not None:
             args.append(f"--config={config.kubelinter_config}")
-        logger.info("Running kube-linter tool")
+        if lint_path == config.chart_dir:
+            logger.info("Running kube-linter tool")
+        else:
+            logger.info("Running kube-linter tool on the manifests rendered by HelmTemplateValidator")
         run_res = run_and_log(args, capture_output=True)  # nosec, input params checked above in pre_run
         for line in run_res.stdout.splitlines():
             logger.info(line)
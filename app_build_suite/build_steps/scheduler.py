@@ -0,0 +1,225 @@
+"""Pipeline running the build stage of independent steps concurrently."""
+
+import argparse
+import contextvars
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set
+
+import configargparse
+from step_exec_lib.errors import ConfigError, Error
+from step_exec_lib.steps import BuildStep, BuildStepsFilteringPipeline
+from step_exec_lib.types import STEP_ALL, Context
+
+from app_build_suite.utils.profiling import get_profiler
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_DESTINATION = "destination:"
+"""The directory where build artifacts are stored ('--destination')."""
+
+
+def context_resource(key: str) -> str:
+    """Name of the resource representing a key in the build context."""
+    return f"context:{key}"
+
+
+def chart_resource(rel_path: str = "") -> str:
+    """Name of the resource representing a path in the chart directory; empty path means the whole chart."""
+    return f"chart:{rel_path}"
+
+
+def _resources_overlap(first: str, second: str) -> bool:
+    """Two resources overlap if they're equal or one is a parent path of the other."""
+    if first == second:
+        return True
+    shorter, longer = sorted((first, second), key=len)
+    if not longer.startswith(shorter):
+        return False
+    return shorter.endswith(":") or shorter.endswith("/") or longer[len(shorter)] == "/"
+
+
+def _any_overlap(first: Iterable[str], second: Iterable[str]) -> bool:
+    return any(_resources_overlap(f, s) for f in first for s in second)
+
+
+@dataclass(frozen=True)
+class StepResources:
+    """
+    Declares resources a BuildStep reads and writes in its 'run' method.
+
+    Resources are strings like 'context:<key>' (see 'context_resource'), 'chart:<path>'
+    (see 'chart_resource') or 'destination:'. Steps are declaring them with a 'resources'
+    attribute, or with a 'get_resources(config)' method if they depend on the build's config;
+    a step without either is treated as conflicting with every other step.
+    """
+
+    reads: FrozenSet[str] = field(default_factory=frozenset)
+    writes: FrozenSet[str] = field(default_factory=frozenset)
+
+    def writes_to(self, resource: str) -> bool:
+        """Tells if the step writes the resource or any part of it, like a file in the chart for 'chart:'."""
+        return _any_overlap(self.writes, (resource,))
+
+    def conflicts_with(self, other: "StepResources") -> bool:
+        return (
+            _any_overlap(self.writes, other.writes)
+            or _any_overlap(self.writes, other.reads)
+            or _any_overlap(self.reads, other.writes)
+        )
+
+
+def get_step_resources(step: BuildStep, config: argparse.Namespace) -> Optional[StepResources]:
+    get_resources = getattr(step, "get_resources", None)
+    if get_resources is not None:
+        return get_resources(config)
+    return getattr(step, "resources", None)
+
+
+class ConcurrentBuildStepsFilteringPipeline(BuildStepsFilteringPipeline):
+    """
+    BuildStepsFilteringPipeline that runs the build stage of steps in parallel when their declared
+    resources don't conflict.
+
+    The pipeline order defines dependencies: a step starts only after all the earlier steps it
+    conflicts with are done. Steps without declared resources act as barriers. 'pre_run' and
+    'cleanup' are still executed sequentially. With '--max-parallel-steps 1' (the default) the
+    behaviour is exactly the same as for BuildStepsFilteringPipeline.
+
+    All the stages of steps are also measured if profiling is enabled with '--profile-output'.
+    """
+
+    def initialize_config(self, config_parser: configargparse.ArgParser) -> None:
+        super().initialize_config(config_parser)
+        assert self._config_parser_group is not None
+        self._config_parser_group.add_argument(
+            "--max-parallel-steps",
+            required=False,
+            default=1,
+            type=int,
+            help="Maximum number of build steps that can run at the same time. Only steps that don't depend"
+            " on each other (like the linters and validators) are run in parallel.",
+        )
+
+    def pre_run(self, config: argparse.Namespace) -> None:
+        if self._get_max_parallel_steps(config) < 1:
+            raise ConfigError("max-parallel-steps", "The number of parallel steps must be at least 1.")
+        super().pre_run(config)
+
+    def run(self, config: argparse.Namespace, context: Context) -> None:
+        max_parallel_steps = self._get_max_parallel_steps(config)
+        if max_parallel_steps <= 1:
+            super().run(config, context)
+            return
+        enabled_steps = []
+        for step in self._pipeline:
+            if self._is_step_enabled(config, step):
+                enabled_steps.append(step)
+            else:
+                logger.info(f"Skipping build step for {step.name} as it was not configured to run.")
+        self._all_runs_skipped = not enabled_steps
+        self._run_concurrently(config, context, enabled_steps, max_parallel_steps)
+
+    def _after_step(self, config: argparse.Namespace, stage: str, step: BuildStep) -> None:
+        """
+        Called after every stage ('pre-run', 'build' or 'cleanup') of every step that ran, even if it
+        failed, in the thread that ran it.
+        """
+        pass
+
+    def _iterate_steps(
+        self,
+        config: configargparse.Namespace,
+        stage: str,
+        step_function: Callable[[BuildStep], None],
+    ) -> bool:
+        profiler = get_profiler(config)
+
+        def observed_step_function(step: BuildStep) -> None:
+            try:
+                if profiler is None:
+                    step_function(step)
+                    return
+                with profiler.measure(getattr(config, "chart_dir", ""), step.name, stage):
+                    step_function(step)
+            finally:
+                self._after_step(config, stage, step)
+
+        return super()._iterate_steps(config, stage, observed_step_function)
+
+    @staticmethod
+    def _get_max_parallel_steps(config: argparse.Namespace) -> int:
+        return getattr(config, "max_parallel_steps", 1)
+
+    @staticmethod
+    def _is_step_enabled(config: argparse.Namespace, step: BuildStep) -> bool:
+        # the same filtering as in BuildStepsFilteringPipeline._iterate_steps, which is private; that's why
+        # step-exec-lib is pinned to an exact version and the filters are checked to agree in tests
+        execute_all = STEP_ALL in config.steps
+        is_requested_step = any(s in step.steps_provided for s in config.steps)
+        is_requested_skip = any(s in step.steps_provided for s in config.skip_steps)
+        return (execute_all or is_requested_step) and not is_requested_skip
+
+    @staticmethod
+    def _get_dependencies(steps: List[BuildStep], config: argparse.Namespace) -> List[Set[int]]:
+        """For each step, returns indexes of earlier steps that it has to wait for."""
+        resources_list = [get_step_resources(step, config) for step in steps]
+        dependencies: List[Set[int]] = []
+        for i, resources in enumerate(resources_list):
+            deps = set()
+            for j in range(i):
+                other = resources_list[j]
+                if resources is None or other is None or resources.conflicts_with(other):
+                    deps.add(j)
+            dependencies.append(deps)
+        return dependencies
+
+    def _run_concurrently(
+        self, config: argparse.Namespace, context: Context, steps: List[BuildStep], max_workers: int
+    ) -> None:
+        dependencies = self._get_dependencies(steps, config)
+        pending = set(range(len(steps)))
+        done: Set[int] = set()
+        running: Dict["Future[None]", int] = {}
+        errors: Dict[int, BaseException] = {}
+
+        profiler = get_profiler(config)
+
+        def run_step(step: BuildStep) -> None:
+            logger.info(f"Running build step for {step.name}")
+            try:
+                if profiler is None:
+                    step.run(config, context)
+                    return
+                with profiler.measure(getattr(config, "chart_dir", ""), step.name, "build"):
+                    step.run(config, context)
+            finally:
+                self._after_step(config, "build", step)
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="build-step") as executor:
+            while pending or running:
+                # once anything failed, we only wait for the steps that are already running
+                if not errors:
+                    for i in sorted(pending):
+                        if len(running) >= max_workers:
+                            break
+                        if dependencies[i] <= done:
+                            pending.remove(i)
+                            # a copy of the context keeps the chart's name in the logs of '--charts-root' builds
+                            running[executor.submit(contextvars.copy_context().run, run_step, steps[i])] = i
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = running.pop(future)
+                    exc = future.exception()
+                    if exc is None:
+                        done.add(i)
+                        continue
+                    errors[i] = exc
+                    if isinstance(exc, Error):
+                        logger.error(f"Error when running build step for {steps[i].name}: {exc.msg}")
+        if errors:
+            # report the same error the sequential pipeline would: the first one in pipeline order
+            raise errors[min(errors)]
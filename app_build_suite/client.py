@@ -0,0 +1,98 @@
+"""Thin client of the build server ('abs serve').
+
+Sends the command line to a running build server and prints the logs and the output it streams back,
+so a build doesn't pay for starting the interpreter and importing the build steps. This module must
+only import the standard library, as avoiding the imports is its whole point.
+
+The protocol uses one JSON object per line. The client sends a single request:
+    {"args": [...], "cwd": "...", "env": {"ABS_...": "...", "PATH": "..."}}
+and the server answers with any number of
+    {"log": "<message>", "level": <logging level>}
+    {"stdout": "<text>"}
+followed by the final
+    {"result": {"success": <bool>, "duration": <seconds>}}
+"""
+
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+from typing import Any, Dict, IO, List, Optional
+
+ENV_VAR_PREFIX = "ABS_"
+"""Prefix of environment variables setting build options; they are forwarded to the server."""
+FORWARDED_ENV_VARS = ("PATH",)
+"""Other environment variables forwarded to the server, so the build finds the same tools as a one-shot run."""
+SOCKET_ENV_VAR = "ABS_SERVER_SOCKET"
+"""Overrides the default path of the server's socket."""
+
+
+def get_default_socket_path() -> str:
+    """Returns '$ABS_SERVER_SOCKET', or 'app-build-suite.sock' in '$XDG_RUNTIME_DIR' or the temp directory."""
+    if os.environ.get(SOCKET_ENV_VAR):
+        return os.environ[SOCKET_ENV_VAR]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "app-build-suite.sock")
+    return os.path.join(tempfile.gettempdir(), f"app-build-suite-{os.getuid()}.sock")
+
+
+def send_message(stream: io.BufferedIOBase, message: Dict[str, Any]) -> None:
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def request_build(
+    socket_path: str,
+    args: List[str],
+    stdout: IO[str],
+    stderr: IO[str],
+    cwd: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+) -> bool:
+    """
+    Runs a build on the server listening on 'socket_path', writing the logs it streams to 'stderr'
+    and the output (like '--help') to 'stdout'. Raises OSError if the server can't be reached.
+    :param args: The command line arguments of the build.
+    :param cwd: The directory to run the build in; the current directory by default.
+    :param env: Environment variables for the build; by default, the 'ABS_*' variables and 'PATH' of this
+        process.
+    :return: True if the build succeeded.
+    """
+    if env is None:
+        env = {k: v for k, v in os.environ.items() if k.startswith(ENV_VAR_PREFIX) or k in FORWARDED_ENV_VARS}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        with sock.makefile("rwb") as stream:
+            send_message(stream, {"args": args, "cwd": cwd or os.getcwd(), "env": env})
+            for line in stream:
+                message = json.loads(line)
+                if "log" in message:
+                    stderr.write(message["log"] + "\n")
+                elif "stdout" in message:
+                    stdout.write(message["stdout"])
+                elif "result" in message:
+                    return bool(message["result"]["success"])
+    raise ConnectionError("the build server closed the connection before sending the result")
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    socket_path = get_default_socket_path()
+    if args[:1] == ["--server-socket"] and len(args) > 1:
+        socket_path, args = args[1], args[2:]
+    try:
+        success = request_build(socket_path, args, sys.stdout, sys.stderr)
+    except OSError as e:
+        sys.stderr.write(
+            f"Can't run the build on the build server at '{socket_path}': {e}.\n"
+            "Start the server with 'abs serve' or run the build with 'abs'.\n"
+        )
+        sys.exit(2)
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
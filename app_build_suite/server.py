@@ -0,0 +1,246 @@
+"""Build server ('abs serve'): a long-running process running builds requested over a Unix socket.
+
+A one-shot 'abs' run spends most of the time of a small chart's build starting the interpreter and
+importing the build steps and their libraries. The server does that once: it imports the libraries
+the steps only import when they need them, creates the pipeline once and runs all the builds with it
+(except '--charts-root' builds, which create one per chart), and keeps the process-wide caches (tool
+versions, parsed files, the build cache index) warm between builds. Builds requested with the thin
+client ('abs-client', see app_build_suite.client) stream their logs back to it.
+
+Builds run one at a time: each one runs in the client's working directory, with the client's 'ABS_*'
+variables and 'PATH' (so tools are found like in a one-shot run), which are process-wide. Requests
+arriving during a build wait for it to finish.
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Dict, Iterator, List, NoReturn, Optional, cast
+
+from step_exec_lib.steps import BuildStepsFilteringPipeline
+
+from app_build_suite.__main__ import ChartLogFormatter, get_pipeline, get_version, run_build
+from app_build_suite.client import ENV_VAR_PREFIX, FORWARDED_ENV_VARS, get_default_socket_path, send_message
+
+logger = logging.getLogger(__name__)
+
+_build_lock = threading.Lock()
+
+_PRELOADED_MODULES = (
+    "git",
+    "validators",
+    "PIL.Image",
+    "cairosvg",
+    "urllib.request",
+    "concurrent.futures.process",
+)
+"""Modules the build steps import only when they need them, which the server imports up front."""
+
+
+class _ClientLogHandler(logging.Handler):
+    """Sends log records to the client; stops quietly if the client went away."""
+
+    def __init__(self, connection: "_BuildRequestHandler") -> None:
+        super().__init__()
+        self._connection = connection
+        self.setFormatter(ChartLogFormatter("%(message)s"))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._connection.send({"log": self.format(record), "level": record.levelno})
+
+
+class _ClientStdout(io.TextIOBase):
+    """Sends the text printed during the build (like the '--help' output) to the client."""
+
+    def __init__(self, connection: "_BuildRequestHandler") -> None:
+        self._connection = connection
+
+    def write(self, text: str) -> int:
+        self._connection.send({"stdout": text})
+        return len(text)
+
+
+def _is_forwarded(name: str) -> bool:
+    return name.startswith(ENV_VAR_PREFIX) or name in FORWARDED_ENV_VARS
+
+
+@contextlib.contextmanager
+def _build_environment(cwd: str, env: Dict[str, str]) -> Iterator[None]:
+    """
+    Switches to the client's working directory, build options set with 'ABS_*' variables and 'PATH'.
+    The server's 'PATH' is kept if the client didn't send one.
+    """
+    old_cwd = os.getcwd()
+    old_env = {k: v for k, v in os.environ.items() if _is_forwarded(k)}
+    for key in old_env:
+        if key.startswith(ENV_VAR_PREFIX) or key in env:
+            del os.environ[key]
+    os.environ.update({k: v for k, v in env.items() if _is_forwarded(k)})
+    os.chdir(cwd)
+    try:
+        yield
+    finally:
+        os.chdir(old_cwd)
+        for key in [k for k in os.environ if _is_forwarded(k)]:
+            del os.environ[key]
+        os.environ.update(old_env)
+
+
+def _parse_request(line: bytes) -> Dict[str, Any]:
+    """Parses and checks a build request; raises ValueError if it's invalid."""
+    request = json.loads(line)
+    if not isinstance(request, dict):
+        raise ValueError("the request is not an object")
+    args, cwd, env = request.get("args"), request.get("cwd"), request.get("env", {})
+    if not isinstance(args, list) or not all(isinstance(a, str) for a in args):
+        raise ValueError("'args' must be a list of strings")
+    if not isinstance(cwd, str) or not os.path.isdir(cwd):
+        raise ValueError("'cwd' must be an existing directory")
+    if not isinstance(env, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in env.items()):
+        raise ValueError("'env' must map strings to strings")
+    return {"args": args, "cwd": cwd, "env": env}
+
+
+class _BuildRequestHandler(socketserver.StreamRequestHandler):
+    def setup(self) -> None:
+        super().setup()
+        self._send_lock = threading.Lock()
+        self._connected = True
+
+    def send(self, message: Dict[str, Any]) -> None:
+        with self._send_lock:
+            if not self._connected:
+                return
+            try:
+                send_message(self.wfile, message)
+            except OSError:
+                # the build goes on even if nobody is waiting for its result
+                self._connected = False
+
+    def handle(self) -> None:
+        start = time.monotonic()
+        try:
+            request = _parse_request(self.rfile.readline())
+        except ValueError as e:
+            self.send({"log": f"Invalid build request: {e}.", "level": logging.ERROR})
+            self.send({"result": {"success": False, "duration": 0.0}})
+            return
+        with _build_lock:
+            success = self._run_build(request["args"], request["cwd"], request["env"])
+        duration = time.monotonic() - start
+        logger.info(f"Build {'succeeded' if success else 'failed'} in {duration:.1f}s: {' '.join(request['args'])}")
+        self.send({"result": {"success": success, "duration": duration}})
+
+    def _run_build(self, args: List[str], cwd: str, env: Dict[str, str]) -> bool:
+        root_logger = logging.getLogger()
+        old_level = root_logger.level
+        handler = _ClientLogHandler(self)
+        root_logger.addHandler(handler)
+        try:
+            server_path = os.environ.get("PATH")
+            with _build_environment(cwd, env), contextlib.redirect_stdout(_ClientStdout(self)):
+                root_logger.setLevel(logging.INFO)
+                logger.info(f"app_build_suite {get_version()} (build server)\n")
+                if "PATH" not in env:
+                    logger.info("The client didn't send its PATH, tools are looked up in the build server's PATH.")
+                elif env["PATH"] != server_path:
+                    logger.info("Tools are looked up in the client's PATH, which differs from the build server's.")
+                return run_build(args, cast(BuildServer, self.server).steps)
+        except (Exception, SystemExit) as e:
+            # nothing a build does may stop the server
+            logger.exception(f"Unexpected error when running the build: {e}")
+            return False
+        finally:
+            root_logger.removeHandler(handler)
+            root_logger.setLevel(old_level)
+
+
+class BuildServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, steps: Optional[List[BuildStepsFilteringPipeline]] = None) -> None:
+        """
+        :param socket_path: Path of the Unix socket to listen on.
+        :param steps: The pipeline running all the builds; a new one is created for every build if not set.
+        """
+        _remove_stale_socket(socket_path)
+        # only the user running the server can connect, as builds run arbitrary tools with its permissions
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, _BuildRequestHandler)
+        finally:
+            os.umask(old_umask)
+        self.socket_path = socket_path
+        self.steps = steps
+
+    def server_close(self) -> None:
+        super().server_close()
+        with contextlib.suppress(OSError):
+            os.unlink(self.socket_path)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Removes the socket file left by a server that didn't stop cleanly; fails if a server is still running."""
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+            return
+    raise OSError(f"a build server is already listening on '{socket_path}'")
+
+
+def _preload_modules() -> None:
+    for name in _PRELOADED_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            # like 'cairosvg' without the cairo library: only builds that need the module fail, like in a one-shot run
+            logger.debug(f"Can't preload module '{name}': {e}.")
+
+
+def _raise_keyboard_interrupt(*_: Any) -> NoReturn:
+    raise KeyboardInterrupt()
+
+
+def serve_main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="abs serve",
+        description="Run builds requested with 'abs-client' in a long-running process, avoiding the start-up time"
+        " of 'abs'. Builds run one at a time.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--socket",
+        default=get_default_socket_path(),
+        help="Path of the Unix socket to listen on; clients use the same default.",
+    )
+    options = parser.parse_args(argv)
+
+    # importing and creating all the steps is most of the start-up time saved for every build
+    steps = get_pipeline()
+    _preload_modules()
+    try:
+        server = BuildServer(options.socket, steps)
+    except OSError as e:
+        logger.error(f"Can't start the build server: {e}.")
+        raise SystemExit(1)
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    logger.info(f"app_build_suite {get_version()} build server listening on '{options.socket}'.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping the build server.")
+    finally:
+        server.server_close()
@@ -0,0 +1,371 @@
+"""Content-addressed cache of build step results.
+
+A cache key is computed from a hash of the chart's inventory, the step name and the step's
+other inputs (relevant config options, hashes of extra input files, tool versions). A cache entry
+stores the step's result (success or the error message), the log lines the step produced, optional
+artifacts (files or directories, like the packaged chart) and optional JSON outputs (like the
+packaged chart's digest). Entries are evicted in LRU
+order when the cache grows over the configured size.
+"""
+
+import argparse
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app_build_suite.errors import BuildError
+from app_build_suite.utils.cache import get_cache_dir
+from app_build_suite.utils.chart_inventory import ChartInventory, chart_inventory_store
+
+logger = logging.getLogger(__name__)
+
+_ENTRIES_DIR = "builds"
+_RESULT_FILE = "result.json"
+_ARTIFACTS_DIR = "artifacts"
+# files and directories created in the chart directory by the build itself
+_IGNORED_SUFFIXES = (".back", ".tgz-meta")
+# charts built with '--destination' pointing to the chart directory
+_IGNORED_TOP_LEVEL_SUFFIXES = (".tgz",)
+
+LogLines = List[Tuple[int, str]]
+"""Log records of a step as (level, message) pairs."""
+
+
+@dataclass
+class CacheEntry:
+    success: bool
+    message: str = ""
+    log: LogLines = field(default_factory=list)
+    artifacts: Dict[str, str] = field(default_factory=dict)
+    """Maps artifact names to their paths in the cache."""
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    """JSON-serializable values the step produced along with the artifacts."""
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_optional_file(path: Optional[str]) -> Optional[str]:
+    """Returns the hash of the file, or None if the path is not set or the file doesn't exist."""
+    if not path or not os.path.isfile(path):
+        return None
+    return hash_file(path)
+
+
+def _copy_artifact(source: str, target: str) -> None:
+    if os.path.isdir(source):
+        shutil.copytree(source, target, dirs_exist_ok=True)
+    else:
+        shutil.copy2(source, target)
+
+
+def _get_size(path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return size
+
+
+class BuildCache:
+    """
+    On-disk store of cache entries, each in its own directory named after the entry's key.
+
+    Entries are written to a temporary directory and renamed into place, so concurrent builds can
+    share the cache. Reading an entry marks it as recently used.
+    """
+
+    def __init__(self, cache_dir: str, max_size_bytes: int) -> None:
+        self._entries_dir = os.path.join(cache_dir, _ENTRIES_DIR)
+        self._max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        # file hashes memoized by (path, mtime, size), so unchanged files are read once for all the steps
+        self._file_hashes: Dict[Tuple[str, int, int], str] = {}
+        # chart hashes memoized by inventory, which is scanned again only when a step changes the chart
+        self._chart_hashes: "weakref.WeakKeyDictionary[ChartInventory, str]" = weakref.WeakKeyDictionary()
+
+    def hash_chart(self, inventory: ChartInventory) -> str:
+        """
+        Returns a hash of the chart's files: paths, types and contents, but no timestamps. It's computed
+        once per inventory, so all the cached steps of a build share it until the chart changes.
+        """
+        with self._lock:
+            cached = self._chart_hashes.get(inventory)
+        if cached is not None:
+            return cached
+        digest = hashlib.sha256()
+        for entry in inventory:
+            parts = entry.path.split("/")
+            if any(part.endswith(_IGNORED_SUFFIXES) for part in parts):
+                continue
+            if len(parts) == 1 and entry.path.endswith(_IGNORED_TOP_LEVEL_SUFFIXES):
+                continue
+            if entry.is_dir:
+                digest.update(f"d {entry.path}\n".encode())
+            elif entry.is_file:
+                file_hash = self._hash_file_memoized(inventory.get_abs_path(entry), entry.mtime_ns, entry.size)
+                digest.update(f"f {entry.path} {file_hash}\n".encode())
+        chart_hash = digest.hexdigest()
+        with self._lock:
+            self._chart_hashes[inventory] = chart_hash
+        return chart_hash
+
+    def hash_tree(self, path: str, _top_level: bool = True) -> str:
+        """Returns a Merkle hash of the directory: names, types and contents of entries, but no timestamps."""
+        digest = hashlib.sha256()
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for entry in entries:
+            if entry.name.endswith(_IGNORED_SUFFIXES):
+                continue
+            if _top_level and entry.name.endswith(_IGNORED_TOP_LEVEL_SUFFIXES):
+                continue
+            if entry.is_symlink():
+                digest.update(f"l {entry.name} {os.readlink(entry.path)}\n".encode())
+            elif entry.is_dir():
+                digest.update(f"d {entry.name} {self.hash_tree(entry.path, False)}\n".encode())
+            elif entry.is_file():
+                st = entry.stat()
+                file_hash = self._hash_file_memoized(entry.path, st.st_mtime_ns, st.st_size)
+                digest.update(f"f {entry.name} {file_hash}\n".encode())
+        return digest.hexdigest()
+
+    def _hash_file_memoized(self, path: str, mtime_ns: int, size: int) -> str:
+        memo_key = (os.path.abspath(path), mtime_ns, size)
+        with self._lock:
+            cached = self._file_hashes.get(memo_key)
+        if cached is None:
+            cached = hash_file(path)
+            with self._lock:
+                self._file_hashes[memo_key] = cached
+        return cached
+
+    def get_key(self, step_name: str, chart_dir: str, inputs: Dict[str, Any]) -> str:
+        """
+        Computes the cache key of a step run.
+        :param step_name: The name of the step.
+        :param chart_dir: The chart directory; its whole content, as listed by 'chart_inventory_store',
+            is part of the key.
+        :param inputs: Any other JSON-serializable inputs of the step.
+        :return: The key.
+        """
+        key_data = {
+            "step": step_name,
+            "chart": self.hash_chart(chart_inventory_store.get(chart_dir)),
+            "inputs": inputs,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self._entries_dir, key)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry_dir = self._entry_dir(key)
+        result_path = os.path.join(entry_dir, _RESULT_FILE)
+        try:
+            with open(result_path, "r") as f:
+                data = json.load(f)
+            entry = CacheEntry(
+                success=bool(data["success"]),
+                message=data.get("message", ""),
+                log=[(int(level), str(line)) for level, line in data.get("log", [])],
+                artifacts={name: os.path.join(entry_dir, _ARTIFACTS_DIR, name) for name in data.get("artifacts", [])},
+                outputs=dict(data.get("outputs", {})),
+            )
+            if not all(os.path.exists(p) for p in entry.artifacts.values()):
+                return None
+            # the modification time of the result file is used for LRU eviction
+            os.utime(result_path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return entry
+
+    def put(
+        self,
+        key: str,
+        success: bool,
+        message: str,
+        log: LogLines,
+        artifacts: Dict[str, str],
+        outputs: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Stores a new cache entry and evicts the least recently used entries if the cache is too big.
+        Errors are only logged, as failing to save to the cache must not fail the build.
+        :param artifacts: Maps artifact names to paths of files or directories to store.
+        :param outputs: JSON-serializable values to store with the entry.
+        """
+        tmp_dir = os.path.join(self._entries_dir, f".tmp-{uuid.uuid4().hex}")
+        try:
+            os.makedirs(os.path.join(tmp_dir, _ARTIFACTS_DIR))
+            for name, path in artifacts.items():
+                _copy_artifact(path, os.path.join(tmp_dir, _ARTIFACTS_DIR, name))
+            with open(os.path.join(tmp_dir, _RESULT_FILE), "w") as f:
+                json.dump(
+                    {
+                        "success": success,
+                        "message": message,
+                        "log": log,
+                        "artifacts": sorted(artifacts),
+                        "outputs": outputs or {},
+                    },
+                    f,
+                    indent=2,
+                )
+            entry_dir = self._entry_dir(key)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Can't save build cache entry: {e}.")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache is smaller than the configured size."""
+        with self._lock:
+            entries = []
+            try:
+                with os.scandir(self._entries_dir) as it:
+                    for entry in it:
+                        if entry.name.startswith(".") or not entry.is_dir():
+                            continue
+                        try:
+                            last_used = os.stat(os.path.join(entry.path, _RESULT_FILE)).st_mtime_ns
+                        except OSError:
+                            last_used = 0
+                        entries.append((last_used, entry.path, _get_size(entry.path)))
+            except OSError:
+                return
+            total_size = sum(size for _, _, size in entries)
+            for _, path, size in sorted(entries):
+                if total_size <= self._max_size_bytes:
+                    break
+                logger.debug(f"Evicting build cache entry '{path}'.")
+                shutil.rmtree(path, ignore_errors=True)
+                total_size -= size
+
+
+_caches: Dict[Tuple[str, int], BuildCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_build_cache(config: argparse.Namespace) -> Optional[BuildCache]:
+    """Returns the build cache if it's enabled in the config, None otherwise."""
+    cache_dir = get_cache_dir(config)
+    if not getattr(config, "build_cache", False) or not cache_dir:
+        return None
+    max_size_bytes = int(getattr(config, "build_cache_max_size", 1024)) * 1024 * 1024
+    with _caches_lock:
+        key = (cache_dir, max_size_bytes)
+        if key not in _caches:
+            _caches[key] = BuildCache(cache_dir, max_size_bytes)
+        return _caches[key]
+
+
+_capturing: contextvars.ContextVar[Optional[LogLines]] = contextvars.ContextVar("_capturing", default=None)
+"""The records of the action running in the current context, if it's captured."""
+
+
+class _ListHandler(logging.Handler):
+    """
+    Collects records logged by any logger (like the one logging the output of tools in 'run_and_log')
+    from the context of the captured action only, as other steps and charts are built concurrently.
+    Threads started by the action are included if they run in a copy of its context.
+    """
+
+    def __init__(self, records: LogLines) -> None:
+        super().__init__()
+        self._records = records
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if _capturing.get() is self._records:
+            self._records.append((record.levelno, record.getMessage()))
+
+
+@contextmanager
+def _capture_logs() -> Iterator[LogLines]:
+    records: LogLines = []
+    handler = _ListHandler(records)
+    token = _capturing.set(records)
+    root_logger = logging.getLogger()
+    root_logger.addHandler(handler)
+    try:
+        yield records
+    finally:
+        root_logger.removeHandler(handler)
+        _capturing.reset(token)
+
+
+def run_cached(
+    config: argparse.Namespace,
+    step_name: str,
+    step_logger: logging.Logger,
+    get_inputs: Callable[[], Dict[str, Any]],
+    action: Callable[[], Optional[Dict[str, str]]],
+    restore: Optional[Callable[[Dict[str, str]], None]] = None,
+    get_outputs: Optional[Callable[[], Dict[str, Any]]] = None,
+    restore_outputs: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> None:
+    """
+    Runs the action of a build step, unless the build cache has a result for the same inputs.
+
+    On a cache hit, the log lines of the cached run (logged by any logger) are logged again using the
+    'step_logger'; then
+    a cached failure raises BuildError with the cached message and a cached success calls 'restore'
+    with paths of the cached artifacts and 'restore_outputs' with the cached outputs. On a miss, the
+    action is run and its result, its log lines, the artifacts it returns and the outputs returned
+    by 'get_outputs' after it succeeded are stored in the cache. Only failures raised as BuildError
+    are cached.
+    :param config: The config object.
+    :param step_name: The name of the step, used in the key and as the source of errors.
+    :param step_logger: The logger used to log again the lines of a cached run.
+    :param get_inputs: Returns inputs of the step other than the chart directory (see BuildCache.get_key);
+        called only if the cache is enabled.
+    :param action: Does the actual work; returns artifacts to store as a mapping of names to paths.
+    :param restore: Restores the artifacts from the cache.
+    :param get_outputs: Returns JSON-serializable values produced by a successful action, like a digest
+        of its artifacts, so that a cache hit doesn't have to compute them again.
+    :param restore_outputs: Restores the outputs from the cache.
+    """
+    cache = get_build_cache(config)
+    if cache is None:
+        action()
+        return
+    key = cache.get_key(step_name, config.chart_dir, get_inputs())
+    entry = cache.get(key)
+    if entry is not None:
+        logger.info(f"Build cache hit for {step_name}, reusing the result of a previous run.")
+        for level, line in entry.log:
+            step_logger.log(level, line)
+        if not entry.success:
+            raise BuildError(step_name, entry.message)
+        if restore is not None:
+            restore(entry.artifacts)
+        if restore_outputs is not None:
+            restore_outputs(entry.outputs)
+        return
+    with _capture_logs() as records:
+        try:
+            artifacts = action() or {}
+        except BuildError as e:
+            cache.put(key, False, e.msg, records, {})
+            raise
+    cache.put(key, True, "", records, artifacts, get_outputs() if get_outputs is not None else None)
@@ -0,0 +1,21 @@
+"""Location of the persistent caches shared between runs."""
+
+import argparse
+import os
+from typing import Optional
+
+
+def get_default_cache_dir() -> str:
+    """Returns '$XDG_CACHE_HOME/app-build-suite', falling back to '~/.cache/app-build-suite'."""
+    base_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base_dir, "app-build-suite")
+
+
+def get_cache_dir(config: argparse.Namespace) -> Optional[str]:
+    """
+    Returns the configured cache directory or None if persistent caching is disabled.
+    Steps can be run with a config that doesn't include global options (e.g. in tests), in which
+    case nothing is persisted.
+    """
+    cache_dir = getattr(config, "cache_dir", None)
+    return cache_dir or None
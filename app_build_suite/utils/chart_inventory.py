@@ -0,0 +1,182 @@
+"""Inventory of the files of a chart, built once with 'os.scandir' and shared by all build steps.
+
+Steps used to check for files (like 'Chart.lock' or 'values.schema.json') and walk the chart tree on
+their own, each paying for a stat per probe; on slow filesystems (like overlays in containers) that
+adds up. The inventory lists every file and directory of the chart with its size and mtime, and
+whether '.helmignore' excludes it from the packaged chart, in a single walk.
+
+The inventories live in the process-wide 'chart_inventory_store' instead of the build's context:
+'pre_run' of the steps and the validators called by them don't get the context, and the charts
+of a '--charts-root' build, each with its own context, are all cached in the same store.
+
+An inventory is a snapshot, so 'HelmBuildFilteringPipeline' invalidates it:
+- at the start of every build;
+- after the 'run' of every step declaring writes to the chart in its 'resources' (or declaring
+  no resources at all), like 'helm dependency update' changing 'charts/';
+- after every 'cleanup', as cleanups restore and remove files without declaring it.
+Steps don't invalidate it themselves, but must declare in 'resources' what they write in the chart
+and must not change the chart in 'pre_run'. Code changing a chart outside of the pipeline has to
+call 'chart_inventory_store.invalidate()' itself.
+"""
+
+import os
+import posixpath
+import stat
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from app_build_suite.utils.helmignore import HelmIgnoreError, HelmIgnoreRules
+
+
+@dataclass(frozen=True)
+class ChartEntry:
+    path: str
+    """Path relative to the chart's directory, with '/' separators."""
+    kind: int
+    """File type bits of the entry's mode, like 'stat.S_IFREG'; symbolic links are followed."""
+    size: int
+    mtime_ns: int
+    ignored: bool
+    """If '.helmignore' excludes the entry (or a directory containing it) from the packaged chart."""
+
+    @property
+    def is_dir(self) -> bool:
+        return self.kind == stat.S_IFDIR
+
+    @property
+    def is_file(self) -> bool:
+        return self.kind == stat.S_IFREG
+
+
+class ChartInventory:
+    """The files and directories of a chart, in lexical order of their paths, like helm walks them."""
+
+    def __init__(
+        self, chart_dir: str, entries: Dict[str, ChartEntry], helmignore_error: Optional[HelmIgnoreError] = None
+    ) -> None:
+        self.chart_dir = chart_dir
+        self._entries = entries
+        self.helmignore_error = helmignore_error
+        """Set if '.helmignore' is invalid, in which case no entry is marked as ignored."""
+
+    @classmethod
+    def scan(cls, chart_dir: str) -> "ChartInventory":
+        """
+        Lists the chart's tree; symbolic links to directories are followed, unless they form a loop.
+        Like 'os.walk', directories that can't be read (or a chart directory that doesn't exist) are empty.
+        """
+        abs_chart_dir = os.path.abspath(chart_dir)
+        helmignore_error: Optional[HelmIgnoreError] = None
+        try:
+            rules = HelmIgnoreRules.load(abs_chart_dir)
+        except HelmIgnoreError as e:
+            # packaging the chart fails with this error, other steps can still use the inventory
+            helmignore_error = e
+            rules = HelmIgnoreRules()
+        entries: Dict[str, ChartEntry] = {}
+        try:
+            root_stat = os.stat(abs_chart_dir)
+        except OSError:
+            return cls(abs_chart_dir, entries, helmignore_error)
+        _scan_dir(abs_chart_dir, "", False, rules, entries, {(root_stat.st_dev, root_stat.st_ino)})
+        return cls(abs_chart_dir, entries, helmignore_error)
+
+    def __iter__(self) -> Iterator[ChartEntry]:
+        return iter(self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, path: str) -> Optional[ChartEntry]:
+        """Returns the entry of a path relative to the chart's directory, like './values.yaml'."""
+        return self._entries.get(_normalize(path))
+
+    def is_file(self, path: str) -> bool:
+        """
+        Tells if the path relative to the chart's directory is a regular file. Paths outside of the chart
+        (like '../../README.md') aren't in the inventory and are checked on disk.
+        """
+        normalized = _normalize(path)
+        if normalized == ".." or normalized.startswith("../"):
+            return os.path.isfile(os.path.join(self.chart_dir, path))
+        entry = self._entries.get(normalized)
+        return entry is not None and entry.is_file
+
+    def files(self, suffixes: Tuple[str, ...] = ()) -> Iterator[ChartEntry]:
+        """Returns the regular files, optionally only those with a name ending with one of the suffixes."""
+        for entry in self._entries.values():
+            if entry.is_file and (not suffixes or entry.path.endswith(suffixes)):
+                yield entry
+
+    def get_abs_path(self, entry: ChartEntry) -> str:
+        return os.path.join(self.chart_dir, *entry.path.split("/"))
+
+
+def _normalize(path: str) -> str:
+    return posixpath.normpath(path.replace(os.sep, "/"))
+
+
+def _scan_dir(
+    dir_path: str,
+    rel_dir: str,
+    ignored: bool,
+    rules: HelmIgnoreRules,
+    entries: Dict[str, ChartEntry],
+    ancestors: Set[Tuple[int, int]],
+) -> None:
+    try:
+        with os.scandir(dir_path) as it:
+            dir_entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    for dir_entry in dir_entries:
+        rel_path = f"{rel_dir}{dir_entry.name}"
+        try:
+            st = dir_entry.stat()
+        except OSError:
+            # a broken symbolic link
+            continue
+        kind = stat.S_IFMT(st.st_mode)
+        is_dir = kind == stat.S_IFDIR
+        entry_ignored = ignored or rules.is_ignored(rel_path, is_dir)
+        entries[rel_path] = ChartEntry(rel_path, kind, st.st_size, st.st_mtime_ns, entry_ignored)
+        if is_dir and (st.st_dev, st.st_ino) not in ancestors:
+            ancestors.add((st.st_dev, st.st_ino))
+            _scan_dir(dir_entry.path, f"{rel_path}/", entry_ignored, rules, entries, ancestors)
+            ancestors.remove((st.st_dev, st.st_ino))
+
+
+class ChartInventoryStore:
+    """Thread-safe cache of chart inventories, keyed by the absolute path of the chart's directory."""
+
+    def __init__(self) -> None:
+        self._inventories: Dict[str, ChartInventory] = {}
+        self._lock = threading.Lock()
+
+    def get(self, chart_dir: str) -> ChartInventory:
+        """
+        Returns the inventory of the chart, scanning its directory only if it wasn't scanned before or
+        was invalidated since.
+        """
+        abs_chart_dir = os.path.abspath(chart_dir)
+        with self._lock:
+            inventory = self._inventories.get(abs_chart_dir)
+        if inventory is None:
+            inventory = ChartInventory.scan(abs_chart_dir)
+            with self._lock:
+                self._inventories[abs_chart_dir] = inventory
+        return inventory
+
+    def invalidate(self, chart_dir: str) -> None:
+        """Drops the inventory, so it's scanned again on the next 'get()'."""
+        with self._lock:
+            self._inventories.pop(os.path.abspath(chart_dir), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._inventories.clear()
+
+
+chart_inventory_store = ChartInventoryStore()
+"""The store shared by all the build steps running in this process."""
@@ -0,0 +1,384 @@
+"""Packages a Helm chart into a '.tgz' archive in-process, instead of running 'helm package'.
+
+The archive has the layout 'helm package' produces: '<name>-<version>.tgz' with all the files under a
+'<name>/' directory, ordered like helm writes them ('Chart.yaml', the lock file, 'values.yaml',
+'values.schema.json', templates, other files, then subcharts), without directory entries, with mode
+0644 and in a gzip stream with helm's header. Files ignored by '.helmignore' are left out, subcharts
+packaged as archives in 'charts/' are expanded into directories, and UTF-8 byte order marks are
+removed, all like helm does. Files are streamed from the chart tree into the archive, and the
+archive's SHA-256 digest is computed while it's written, so it doesn't have to be read again.
+
+The archive is compressed in parallel, like pigz does: the tar stream is cut into chunks deflated
+independently on a thread pool (zlib releases the GIL while compressing), each primed with the end
+of the previous chunk as the dictionary, and joined into a single gzip stream. The archive only
+depends on the chunk size, never on the number of threads.
+
+Unlike helm, 'Chart.yaml' and 'Chart.lock' are copied as they are instead of being serialized again.
+"""
+
+import hashlib
+import io
+import os
+import posixpath
+import struct
+import tarfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import BinaryIO, Deque, Dict, List, Optional, Tuple, Union
+
+import yaml
+
+from app_build_suite.build_steps.helm_consts import CHART_YAML, TEMPLATES_DIR, VALUES_SCHEMA_JSON, VALUES_YAML
+from app_build_suite.utils.chart_inventory import ChartInventory
+
+FORMAT_VERSION = 2
+"""Changes whenever the content of the archives changes; part of the build cache key."""
+
+HELM_GZIP_EXTRA = b"+aHR0cHM6Ly95b3V0dS5iZS96OVV6MWljandyTQo="
+HELM_GZIP_COMMENT = b"Helm"
+DEFAULT_COMPRESS_LEVEL = 6
+"""The default level of Go's 'compress/gzip', used by helm."""
+CHUNK_SIZE = 256 * 1024
+"""Bytes of the tar stream deflated by one task; big enough that priming each chunk with a dictionary is cheap."""
+_DICTIONARY_SIZE = 32 * 1024
+
+_UTF8_BOM = b"\xef\xbb\xbf"
+_CHARTS_DIR = "charts"
+_CHART_LOCK = "Chart.lock"
+_REQUIREMENTS_YAML = "requirements.yaml"
+_REQUIREMENTS_LOCK = "requirements.lock"
+_API_VERSION_V1 = "v1"
+
+_Output = Union[BinaryIO, io.RawIOBase]
+
+
+class ChartPackagingError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class PackagedChart:
+    path: str
+    digest: str
+    """Hexadecimal SHA-256 digest of the archive."""
+    files: Tuple[str, ...]
+    """Paths of the files in the archive, in order."""
+    content_size: int
+    """Bytes of the files in the archive."""
+    size: int
+    """Bytes of the archive."""
+
+
+@dataclass(frozen=True)
+class _ChartFile:
+    name: str
+    """Path relative to the chart's directory, with '/' separators."""
+    path: Optional[str] = None
+    """Path of a file of the chart tree, streamed into the archive."""
+    data: bytes = b""
+    """Content of a file taken from a subchart archive."""
+
+    def open(self) -> Tuple[BinaryIO, int]:
+        """Returns the content without a UTF-8 byte order mark, and its size."""
+        if self.path is None:
+            data = self.data[len(_UTF8_BOM) :] if self.data.startswith(_UTF8_BOM) else self.data
+            return io.BytesIO(data), len(data)
+        f = open(self.path, "rb")
+        size = os.fstat(f.fileno()).st_size
+        if f.read(len(_UTF8_BOM)) == _UTF8_BOM:
+            size -= len(_UTF8_BOM)
+        else:
+            f.seek(0)
+        return f, size
+
+    def read(self) -> bytes:
+        stream, _ = self.open()
+        with stream:
+            return stream.read()
+
+
+@dataclass
+class _Chart:
+    name: str
+    version: str
+    files: List[_ChartFile]
+    """In the order they're written to the archive."""
+    subcharts: List["_Chart"] = field(default_factory=list)
+    dependencies: List[str] = field(default_factory=list)
+    """Names of the dependencies listed in 'Chart.yaml'."""
+
+
+class HashingWriter(io.RawIOBase):
+    """Passes the written data through to a file, computing its SHA-256 digest and size on the way."""
+
+    def __init__(self, fileobj: _Output) -> None:
+        super().__init__()
+        self._fileobj = fileobj
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        self._hash.update(data)
+        self.size += len(data)
+        self._fileobj.write(data)
+        return len(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class HelmGzipWriter(io.RawIOBase):
+    """Writes a gzip stream with the same header as 'helm package': helm's extra field and comment, no mtime."""
+
+    def __init__(self, fileobj: _Output, compress_level: int = DEFAULT_COMPRESS_LEVEL) -> None:
+        super().__init__()
+        self._fileobj = fileobj
+        self._compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._crc = 0
+        self.size = 0
+        """Bytes written to the stream, before compression."""
+        # Go's gzip sets the extra flags only for the best and the fastest compression levels
+        extra_flags = {9: 2, 1: 4}.get(compress_level, 0)
+        self._fileobj.write(
+            b"\x1f\x8b\x08\x14"  # magic, deflate, FEXTRA | FCOMMENT
+            + struct.pack("<IBBH", 0, extra_flags, 255, len(HELM_GZIP_EXTRA))
+            + HELM_GZIP_EXTRA
+            + HELM_GZIP_COMMENT
+            + b"\x00"
+        )
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        self._crc = zlib.crc32(data, self._crc)
+        self.size += len(data)
+        self._write_data(data)
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._finish()
+            self._fileobj.write(struct.pack("<II", self._crc, self.size & 0xFFFFFFFF))
+        super().close()
+
+    def _write_data(self, data: bytes) -> None:
+        self._fileobj.write(self._compressor.compress(data))
+
+    def _finish(self) -> None:
+        """Writes the rest of the deflate stream."""
+        self._fileobj.write(self._compressor.flush())
+
+
+def _deflate_chunk(data: bytes, dictionary: bytes, compress_level: int, last: bool) -> bytes:
+    """
+    Deflates a chunk of a stream into a part of a raw deflate stream, ending at a byte boundary unless
+    it's the last one. The dictionary (the data preceding the chunk) is what the decoder has seen last,
+    so back references into it are valid.
+    """
+    if dictionary:
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter(HelmGzipWriter):
+    """
+    Writes the same gzip stream as HelmGzipWriter, but with the data deflated in chunks, on the executor
+    if one is given. At most 'max_pending' chunks are compressed or waiting to be written at a time.
+    """
+
+    def __init__(
+        self,
+        fileobj: _Output,
+        compress_level: int = DEFAULT_COMPRESS_LEVEL,
+        executor: Optional[Executor] = None,
+        max_pending: int = 1,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> None:
+        super().__init__(fileobj, compress_level)
+        self._compress_level = compress_level
+        self._executor = executor
+        self._max_pending = max(max_pending, 1)
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._dictionary = b""
+        self._pending: Deque["Future[bytes]"] = deque()
+
+    def _write_data(self, data: bytes) -> None:
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            chunk = bytes(self._buffer[: self._chunk_size])
+            del self._buffer[: self._chunk_size]
+            self._deflate(chunk, False)
+
+    def _finish(self) -> None:
+        self._deflate(bytes(self._buffer), True)
+        self._buffer.clear()
+        while self._pending:
+            self._fileobj.write(self._pending.popleft().result())
+
+    def _deflate(self, chunk: bytes, last: bool) -> None:
+        dictionary, self._dictionary = self._dictionary, chunk[-_DICTIONARY_SIZE:]
+        if self._executor is None:
+            self._fileobj.write(_deflate_chunk(chunk, dictionary, self._compress_level, last))
+            return
+        self._pending.append(self._executor.submit(_deflate_chunk, chunk, dictionary, self._compress_level, last))
+        while len(self._pending) > self._max_pending:
+            self._fileobj.write(self._pending.popleft().result())
+
+
+def package_chart(
+    chart_dir: str,
+    destination: str,
+    compress_level: int = DEFAULT_COMPRESS_LEVEL,
+    mtime: Optional[int] = None,
+    threads: int = 1,
+    inventory: Optional[ChartInventory] = None,
+) -> PackagedChart:
+    """
+    Packages the chart into '<destination>/<name>-<version>.tgz'. Raises ChartPackagingError if the
+    chart is invalid (or HelmIgnoreError if its '.helmignore' is) and OSError if reading or writing fails.
+    :param chart_dir: The chart's directory.
+    :param destination: Directory to write the archive to; created if it doesn't exist.
+    :param compress_level: The gzip compression level.
+    :param threads: Number of threads compressing the archive.
+    :param inventory: Inventory of the chart's directory, if it was already scanned.
+    :param mtime: Modification time of the archive's entries, for reproducible archives; the current time if
+        not set. The rest of the archive only depends on the chart's files.
+    :return: The path, the digest, the files and the sizes of the archive.
+    """
+    if inventory is None:
+        inventory = ChartInventory.scan(chart_dir)
+    chart = _load_chart(_list_chart_files(inventory), os.path.basename(os.path.abspath(chart_dir)))
+    missing = [d for d in chart.dependencies if d not in {s.name for s in chart.subcharts}]
+    if missing:
+        raise ChartPackagingError(f"found in Chart.yaml, but missing in charts/ directory: {', '.join(missing)}")
+
+    os.makedirs(destination, exist_ok=True)
+    target = os.path.abspath(os.path.join(destination, f"{chart.name}-{chart.version}.tgz"))
+    tmp_target = f"{target}.{os.getpid()}.tmp"
+    mtime = int(time.time()) if mtime is None else mtime
+    try:
+        with open(tmp_target, "wb") as f, ThreadPoolExecutor(threads, thread_name_prefix="chart-gzip") as executor:
+            hashing_writer = HashingWriter(f)
+            # while the pool compresses a chunk per thread, as many more are read from the chart
+            gzip_writer = ParallelGzipWriter(
+                hashing_writer, compress_level, executor if threads > 1 else None, 2 * threads
+            )
+            with tarfile.open(fileobj=gzip_writer, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+                files = _write_chart(tar, chart, chart.name, mtime)
+            gzip_writer.close()
+        os.replace(tmp_target, target)
+    finally:
+        if os.path.exists(tmp_target):
+            os.remove(tmp_target)
+    return PackagedChart(target, hashing_writer.hexdigest(), tuple(files), gzip_writer.size, hashing_writer.size)
+
+
+def _list_chart_files(inventory: ChartInventory) -> List[_ChartFile]:
+    """Lists the files of the chart tree that aren't ignored, in lexical order like Go's 'filepath.Walk'."""
+    if inventory.helmignore_error is not None:
+        raise inventory.helmignore_error
+    files: List[_ChartFile] = []
+    for entry in inventory:
+        if entry.ignored or entry.is_dir:
+            continue
+        if not entry.is_file:
+            raise ChartPackagingError(f"cannot load irregular file '{entry.path}' as it has file mode type bits set")
+        files.append(_ChartFile(entry.path, path=inventory.get_abs_path(entry)))
+    return files
+
+
+def _load_chart(files: List[_ChartFile], location: str) -> _Chart:
+    """Orders the chart's files like helm does and loads its subcharts; 'location' is used in errors."""
+    by_name = {f.name: f for f in files}
+    if CHART_YAML not in by_name:
+        raise ChartPackagingError(f"'{CHART_YAML}' file is missing in '{location}'")
+    try:
+        metadata = yaml.safe_load(by_name[CHART_YAML].read()) or {}
+    except yaml.YAMLError as e:
+        raise ChartPackagingError(f"can't parse '{CHART_YAML}' in '{location}': {e}")
+    if not isinstance(metadata, dict) or not metadata.get("name") or not metadata.get("version"):
+        raise ChartPackagingError(f"'{CHART_YAML}' in '{location}' must set 'name' and 'version'")
+
+    # the lock file of the chart's API version is kept; the other one is only read by helm
+    v1 = str(metadata.get("apiVersion", "")) == _API_VERSION_V1
+    lock_files = [_REQUIREMENTS_YAML, _REQUIREMENTS_LOCK] if v1 else [_CHART_LOCK]
+    dropped = {_CHART_LOCK, _REQUIREMENTS_YAML, _REQUIREMENTS_LOCK} - set(lock_files)
+    special = [CHART_YAML, *lock_files, VALUES_YAML, VALUES_SCHEMA_JSON]
+    ordered = [by_name[name] for name in special if name in by_name]
+    templates: List[_ChartFile] = []
+    other: List[_ChartFile] = []
+    subchart_files: Dict[str, List[_ChartFile]] = {}
+    for f in files:
+        if f.name in special or f.name in dropped:
+            continue
+        if f.name.startswith(f"{TEMPLATES_DIR}/"):
+            templates.append(f)
+        elif f.name.startswith(f"{_CHARTS_DIR}/") and not f.name.endswith(".prov"):
+            sub_name = f.name[len(_CHARTS_DIR) + 1 :]
+            subchart_files.setdefault(sub_name.split("/", 1)[0], []).append(
+                _ChartFile(sub_name, path=f.path, data=f.data)
+            )
+        else:
+            other.append(f)
+
+    subcharts = []
+    for sub_name, sub_files in sorted(subchart_files.items()):
+        if sub_name.startswith(("_", ".")):
+            continue
+        sub_location = f"{location}/{_CHARTS_DIR}/{sub_name}"
+        if sub_name.endswith(".tgz"):
+            subcharts.append(_load_chart(_read_chart_archive(sub_files[0], sub_location), sub_location))
+        else:
+            dir_files = [
+                _ChartFile(f.name.split("/", 1)[1], path=f.path, data=f.data) for f in sub_files if "/" in f.name
+            ]
+            subcharts.append(_load_chart(dir_files, sub_location))
+
+    dependencies = [str(d.get("name")) for d in metadata.get("dependencies") or [] if isinstance(d, dict)]
+    return _Chart(str(metadata["name"]), str(metadata["version"]), ordered + templates + other, subcharts, dependencies)
+
+
+def _read_chart_archive(archive: _ChartFile, location: str) -> List[_ChartFile]:
+    """Reads the files of a packaged subchart, without the top directory of their paths."""
+    files = []
+    try:
+        with tarfile.open(fileobj=io.BytesIO(archive.read()), mode="r:gz") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                name = posixpath.normpath(member.name.replace("\\", "/").split("/", 1)[-1])
+                if "/" not in member.name.replace("\\", "/") or name.startswith(("/", "..")) or name == ".":
+                    raise ChartPackagingError(f"'{location}' contains the illegal path '{member.name}'")
+                extracted = tar.extractfile(member)
+                files.append(_ChartFile(name, data=extracted.read() if extracted else b""))
+    except (tarfile.TarError, EOFError, zlib.error) as e:
+        raise ChartPackagingError(f"can't read the chart archive '{location}': {e}")
+    return files
+
+
+def _write_chart(tar: tarfile.TarFile, chart: _Chart, prefix: str, mtime: int) -> List[str]:
+    """Writes the chart's files and subcharts under 'prefix'; returns the paths of the files written."""
+    written = []
+    for chart_file in chart.files:
+        stream, size = chart_file.open()
+        with stream:
+            # owners are left unset (0 and no names), like helm does
+            info = tarfile.TarInfo(f"{prefix}/{chart_file.name}")
+            info.size = size
+            info.mode = 0o644
+            info.mtime = mtime
+            tar.addfile(info, stream)
+        written.append(info.name)
+    for subchart in chart.subcharts:
+        written += _write_chart(tar, subchart, f"{prefix}/{_CHARTS_DIR}/{subchart.name}", mtime)
+    return written
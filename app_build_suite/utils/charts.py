@@ -0,0 +1,24 @@
+"""Discovery of Helm charts in a directory tree."""
+
+import os
+from typing import List
+
+from app_build_suite.build_steps.helm_consts import CHART_YAML
+
+
+def discover_charts(charts_root: str) -> List[str]:
+    """
+    Finds all the directories under 'charts_root' (including 'charts_root' itself) that contain a
+    Chart.yaml file. The search doesn't descend into found charts (so bundled subcharts are not
+    reported) and skips hidden directories.
+    :param charts_root: The directory to search.
+    :return: Sorted list of paths of chart directories.
+    """
+    charts: List[str] = []
+    for root, dirs, files in os.walk(charts_root):
+        if CHART_YAML in files:
+            charts.append(os.path.normpath(root))
+            dirs.clear()
+            continue
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+    return sorted(charts)
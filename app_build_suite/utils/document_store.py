@@ -0,0 +1,58 @@
+"""In-memory store of parsed YAML documents shared by all build steps.
+
+Many steps (and all the Giant Swarm validators) need the parsed Chart.yaml. The store parses each
+file once and serves the same object until the file changes on disk (detected by its mtime and size)
+or a step that rewrites the file invalidates it explicitly.
+"""
+
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+import yaml
+
+
+class ParsedDocumentStore:
+    """
+    Thread-safe cache of parsed YAML files, keyed by the absolute path plus the file's mtime and size.
+
+    The documents returned are shared between all the callers, so they must be treated as read-only;
+    use 'copy.deepcopy' before modifying them.
+    """
+
+    def __init__(self) -> None:
+        self._documents: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Any:
+        """
+        Returns the parsed content of the YAML file, parsing it only if it wasn't parsed before or
+        has changed since. Raises OSError if the file can't be read and yaml.YAMLError if it can't be parsed.
+        :param path: Path of the YAML file.
+        :return: The parsed document.
+        """
+        abs_path = os.path.abspath(path)
+        st = os.stat(abs_path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._documents.get(abs_path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        with open(abs_path, "r") as f:
+            document = yaml.safe_load(f)
+        with self._lock:
+            self._documents[abs_path] = (stamp, document)
+        return document
+
+    def invalidate(self, path: str) -> None:
+        """Drops the cached document; used by steps rewriting the file."""
+        with self._lock:
+            self._documents.pop(os.path.abspath(path), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._documents.clear()
+
+
+document_store = ParsedDocumentStore()
+"""The store shared by all the build steps running in this process."""
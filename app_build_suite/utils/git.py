@@ -2,8 +2,6 @@
 
 from typing import Optional
 
-import git
-
 
 class GitRepoVersionInfo:
     """
@@ -16,6 +14,9 @@ class GitRepoVersionInfo:
         :param path: The path to search for git information. It searches for '.git' in this folder or any parent
         folder.
         """
+        # GitPython takes longer to import than the rest of abs, so it's loaded only when needed
+        import git
+
         self._is_repo = False
         try:
             self._repo = git.Repo(path, search_parent_directories=True)
@@ -40,7 +41,23 @@ class GitRepoVersionInfo:
         """
         if not self._is_repo or self._repo is None:
             return None
+        import git
+
         try:
             return self._repo.remote(remote_name).url
         except (ValueError, git.exc.GitCommandError):
             return None
+
+    def get_last_commit_timestamp(self) -> Optional[int]:
+        """
+        Get the commit time of the commit checked out in the repo.
+
+        :return: Unix timestamp of the commit, or None if not a git repo or the repo has no commits
+        """
+        if not self._is_repo or self._repo is None:
+            return None
+        try:
+            return int(self._repo.head.commit.committed_date)
+        except ValueError:
+            # HEAD points to a branch without commits
+            return None
@@ -0,0 +1,119 @@
+"""Rules of '.helmignore' files, with the semantics of helm's 'ignore' package.
+
+Each non-empty line not starting with '#' is a shell glob matched like Go's 'filepath.Match' ('*'
+doesn't match '/'). A pattern without '/' is matched against the file's base name; one with '/' is
+matched against the whole path relative to the chart (a leading '/' is dropped). A trailing '/'
+restricts the pattern to directories and a leading '!' negates it. '**' is not supported.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Pattern
+
+HELMIGNORE = ".helmignore"
+# helm never packages hidden files of the templates directory
+_DEFAULT_RULES = ("templates/.?*",)
+
+
+class HelmIgnoreError(ValueError):
+    pass
+
+
+def _glob_to_regexp(glob: str) -> Pattern[str]:
+    """Translates a Go 'filepath.Match' pattern to a regular expression."""
+    parts = []
+    i = 0
+    while i < len(glob):
+        c = glob[i]
+        i += 1
+        if c == "*":
+            parts.append("[^/]*")
+        elif c == "?":
+            parts.append("[^/]")
+        elif c == "\\" and i < len(glob):
+            parts.append(re.escape(glob[i]))
+            i += 1
+        elif c == "[":
+            negate = glob[i : i + 1] == "^"
+            i += 1 if negate else 0
+            members: List[str] = []
+            while i < len(glob) and (glob[i] != "]" or not members):
+                member = glob[i]
+                if member == "\\" and i + 1 < len(glob):
+                    i += 1
+                    member = glob[i]
+                elif member == "-" and members:
+                    # a range between the previous and the next character
+                    members.append("-")
+                    i += 1
+                    continue
+                members.append(re.escape(member))
+                i += 1
+            if i >= len(glob):
+                raise HelmIgnoreError(f"syntax error in pattern '{glob}'")
+            parts.append(("[^/" if negate else "[") + "".join(members) + "]")
+            i += 1
+        else:
+            parts.append(re.escape(c))
+    return re.compile("".join(parts) + r"\Z")
+
+
+@dataclass(frozen=True)
+class _Rule:
+    regexp: Pattern[str]
+    negate: bool
+    must_dir: bool
+    base_name_only: bool
+
+    def matches(self, path: str) -> bool:
+        return self.regexp.match(os.path.basename(path) if self.base_name_only else path) is not None
+
+
+class HelmIgnoreRules:
+    def __init__(self) -> None:
+        self._rules: List[_Rule] = []
+
+    @classmethod
+    def load(cls, chart_dir: str) -> "HelmIgnoreRules":
+        """Returns the rules of the chart's '.helmignore' file (if any) and the defaults added by helm."""
+        rules = cls()
+        path = os.path.join(chart_dir, HELMIGNORE)
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    rules.add(line)
+        for rule in _DEFAULT_RULES:
+            rules.add(rule)
+        return rules
+
+    def add(self, rule: str) -> None:
+        """Adds a rule; raises HelmIgnoreError if it's invalid."""
+        rule = rule.strip()
+        if not rule or rule.startswith("#"):
+            return
+        if "**" in rule:
+            raise HelmIgnoreError(f"double-star (**) syntax is not supported: '{rule}'")
+        negate = rule.startswith("!")
+        rule = rule[1:] if negate else rule
+        must_dir = rule.endswith("/")
+        rule = rule.rstrip("/") if must_dir else rule
+        base_name_only = "/" not in rule
+        self._rules.append(_Rule(_glob_to_regexp(rule.lstrip("/")), negate, must_dir, base_name_only))
+
+    def is_ignored(self, path: str, is_dir: bool) -> bool:
+        """
+        Tells if the file or directory is ignored; an ignored directory is skipped with all its content.
+        :param path: Path relative to the chart's directory, with '/' separators.
+        """
+        for rule in self._rules:
+            if rule.negate:
+                # like in helm, a negated rule ignores everything it doesn't match
+                if (rule.must_dir and not is_dir) or not rule.matches(path):
+                    return True
+                continue
+            if rule.must_dir and not is_dir:
+                continue
+            if rule.matches(path):
+                return True
+        return False
@@ -0,0 +1,55 @@
+"""Running external processes, with their runs recorded in the build profile."""
+
+import logging
+import subprocess  # nosec: we need it to invoke binaries from system
+import threading
+from typing import Any, Callable, List
+
+from step_exec_lib.utils import processes
+
+from app_build_suite.utils.profiling import profile_subprocess
+
+logger = logging.getLogger(__name__)
+
+
+def run_and_log(args: List[str], **kwargs: Any) -> subprocess.CompletedProcess:
+    """step_exec_lib's run_and_log, with the run recorded in the build profile ('--profile-output')."""
+    with profile_subprocess(args):
+        return processes.run_and_log(args, **kwargs)
+
+
+def stream_and_log(args: List[str], on_stdout_line: Callable[[str], None]) -> subprocess.CompletedProcess:
+    """
+    Runs a command and passes each line of its standard output to 'on_stdout_line' as soon as it's
+    read, so the output is never held in memory as a whole. Standard error is collected in a
+    background thread (so the process can't block on a full pipe) and returned in the result.
+
+    If 'on_stdout_line' raises an exception, the process is killed and the exception is re-raised.
+    :param args: The command to run.
+    :param on_stdout_line: Called for each line of the output, including the line terminator.
+    :return: The result with 'returncode' and 'stderr' set; 'stdout' is always None.
+    """
+    logger.info("Running command:")
+    logger.info(" ".join(args))
+    stderr_chunks: List[str] = []
+    with (
+        profile_subprocess(args),
+        subprocess.Popen(  # nosec
+            args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        ) as process,
+    ):
+        assert process.stdout is not None and process.stderr is not None
+        stderr = process.stderr
+        stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(stderr.read()), daemon=True)
+        stderr_reader.start()
+        try:
+            for line in process.stdout:
+                on_stdout_line(line)
+        except BaseException:
+            process.kill()
+            raise
+        finally:
+            stderr_reader.join()
+        returncode = process.wait()
+    logger.info(f"Command executed, exit code: {returncode}.")
+    return subprocess.CompletedProcess(args, returncode, None, "".join(stderr_chunks))
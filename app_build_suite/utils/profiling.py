@@ -0,0 +1,214 @@
+"""Opt-in profiling of build steps ('--profile-output').
+
+For every stage ('pre-run', 'build', 'cleanup') of every build step, the profiler records the wall
+time, the CPU time of the thread running the step, the growth of the process' peak RSS, the number
+and the total wall time of external processes it started, and the bytes it read and wrote. The
+profile is written as JSON and in the Chrome trace event format, which can be opened in
+'chrome://tracing' or https://ui.perfetto.dev.
+"""
+
+import argparse
+import contextvars
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE_SUFFIX = ".trace.json"
+
+# all the times in profiles are relative to this moment
+_origin = time.perf_counter()
+
+
+@dataclass
+class SubprocessSpan:
+    name: str
+    start: float
+    duration: float
+    thread_id: int
+
+
+@dataclass
+class StepProfile:
+    chart: str
+    step: str
+    stage: str
+    start: float
+    """Seconds since the profiling module was loaded."""
+    thread_id: int
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    """CPU time of the thread running the step; doesn't include external processes."""
+    peak_rss_delta: int = 0
+    """Growth of the peak RSS of the whole process during the step, in bytes."""
+    subprocess_count: int = 0
+    subprocess_time: float = 0.0
+    """Total wall time of the external processes started by the step."""
+    read_bytes: Optional[int] = None
+    """Bytes read by the thread running the step (files and pipes); None if the OS doesn't report it."""
+    write_bytes: Optional[int] = None
+    subprocesses: List[SubprocessSpan] = field(default_factory=list)
+
+
+_current_profile: contextvars.ContextVar[Optional[StepProfile]] = contextvars.ContextVar(
+    "current_step_profile", default=None
+)
+_subprocess_lock = threading.Lock()
+
+
+def _get_peak_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _get_thread_io() -> Tuple[Optional[int], Optional[int]]:
+    """Returns the bytes read and written by the current thread, if the OS reports them (Linux only)."""
+    try:
+        with open("/proc/thread-self/io") as f:
+            counters = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _subtract(after: Optional[int], before: Optional[int]) -> Optional[int]:
+    return after - before if after is not None and before is not None else None
+
+
+def _profile_to_json(profile: StepProfile) -> Dict[str, Any]:
+    data = asdict(profile)
+    del data["subprocesses"], data["thread_id"]
+    return data
+
+
+class BuildProfiler:
+    """Collects profiles of build steps; safe to use from steps running in parallel."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._profiles: List[StepProfile] = []
+
+    @contextmanager
+    def measure(self, chart: str, step: str, stage: str) -> Iterator[StepProfile]:
+        """Measures the code run in the block as the stage of a step."""
+        profile = StepProfile(chart, step, stage, time.perf_counter() - _origin, threading.get_ident())
+        token = _current_profile.set(profile)
+        start_cpu = time.thread_time()
+        start_rss = _get_peak_rss()
+        start_read, start_write = _get_thread_io()
+        try:
+            yield profile
+        finally:
+            profile.wall_time = time.perf_counter() - _origin - profile.start
+            profile.cpu_time = time.thread_time() - start_cpu
+            profile.peak_rss_delta = _get_peak_rss() - start_rss
+            end_read, end_write = _get_thread_io()
+            profile.read_bytes = _subtract(end_read, start_read)
+            profile.write_bytes = _subtract(end_write, start_write)
+            _current_profile.reset(token)
+            with self._lock:
+                self._profiles.append(profile)
+
+    def clear(self) -> None:
+        """Drops the collected profiles, so the next build (of the build server) starts a new profile."""
+        with self._lock:
+            self._profiles.clear()
+
+    @property
+    def profiles(self) -> List[StepProfile]:
+        with self._lock:
+            return sorted(self._profiles, key=lambda p: p.start)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"steps": [_profile_to_json(profile) for profile in self.profiles]}
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        for profile in self.profiles:
+            events.append(
+                {
+                    "name": profile.step,
+                    "cat": profile.stage,
+                    "ph": "X",
+                    "ts": profile.start * 1e6,
+                    "dur": profile.wall_time * 1e6,
+                    "pid": pid,
+                    "tid": profile.thread_id,
+                    "args": {k: v for k, v in _profile_to_json(profile).items() if k not in ("step", "start")},
+                }
+            )
+            for span in profile.subprocesses:
+                events.append(
+                    {
+                        "name": span.name,
+                        "cat": "subprocess",
+                        "ph": "X",
+                        "ts": span.start * 1e6,
+                        "dur": span.duration * 1e6,
+                        "pid": pid,
+                        "tid": span.thread_id,
+                    }
+                )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, output_path: str) -> None:
+        """Writes the profile as JSON to 'output_path' and as a Chrome trace next to it."""
+        base_path = output_path[: -len(".json")] if output_path.endswith(".json") else output_path
+        trace_path = base_path + TRACE_FILE_SUFFIX
+        try:
+            with open(output_path, "w") as f:
+                json.dump(self.to_json(), f, indent=2)
+            with open(trace_path, "w") as f:
+                json.dump(self.to_chrome_trace(), f)
+        except OSError as e:
+            logger.warning(f"Can't write the build profile: {e}.")
+            return
+        logger.info(f"Build profile written to '{output_path}' and '{trace_path}'.")
+
+
+_profilers: Dict[str, BuildProfiler] = {}
+_profilers_lock = threading.Lock()
+
+
+def get_profiler(config: argparse.Namespace) -> Optional[BuildProfiler]:
+    """
+    Returns the profiler if profiling is enabled in the config, None otherwise. All the configs with
+    the same '--profile-output' (like the ones of charts built with '--charts-root') share one profiler.
+    """
+    output_path = getattr(config, "profile_output", None)
+    if not output_path:
+        return None
+    with _profilers_lock:
+        key = os.path.abspath(output_path)
+        if key not in _profilers:
+            _profilers[key] = BuildProfiler()
+        return _profilers[key]
+
+
+@contextmanager
+def profile_subprocess(args: List[str]) -> Iterator[None]:
+    """Records an external process run in the profile of the step being measured, if any."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        span = SubprocessSpan(os.path.basename(args[0]), start - _origin, duration, threading.get_ident())
+        with _subprocess_lock:
+            profile.subprocess_count += 1
+            profile.subprocess_time += duration
+            profile.subprocesses.append(span)
@@ -0,0 +1,38 @@
+"""Storing the output of 'helm template' as one file per template, so other tools can lint it."""
+
+import os
+from typing import Optional
+
+from app_build_suite.utils.yaml_strict import RenderedDocument
+
+UNKNOWN_SOURCE_FILE = "_unknown_source.yaml"
+"""File storing documents rendered before any '# Source:' comment."""
+
+
+class RenderedManifestsWriter:
+    """
+    Writes rendered documents to a directory, each to the path of the template it was rendered
+    from (taken from the '# Source: <path>' comments). Documents of the same template are appended
+    to the same file, so the directory mirrors the chart's templates, including subcharts.
+    """
+
+    def __init__(self, output_dir: str) -> None:
+        self._output_dir = os.path.abspath(output_dir)
+
+    def _get_path(self, source: Optional[str]) -> str:
+        if source:
+            path = os.path.normpath(os.path.join(self._output_dir, source))
+            # a template path can't escape the output directory
+            if path.startswith(self._output_dir + os.sep):
+                return path
+        return os.path.join(self._output_dir, UNKNOWN_SOURCE_FILE)
+
+    def write(self, document: RenderedDocument) -> None:
+        if not document.text.strip():
+            return
+        path = self._get_path(document.source)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(document.text)
+            if not document.text.endswith("\n"):
+                f.write("\n")
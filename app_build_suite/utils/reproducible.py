@@ -0,0 +1,55 @@
+"""Timestamps of reproducible builds.
+
+In reproducible mode ('--reproducible', or the 'SOURCE_DATE_EPOCH' environment variable when neither
+'--reproducible' nor '--no-reproducible' is given, see https://reproducible-builds.org/specs/source-date-epoch/),
+the time stored in the chart archive and
+its metadata is a fixed timestamp instead of the current time, so identical inputs produce
+byte-identical outputs. The timestamp is 'SOURCE_DATE_EPOCH' if set, otherwise the commit time of
+the chart's git repository's HEAD.
+"""
+
+import argparse
+import logging
+import os
+from typing import Optional
+
+from app_build_suite.utils.git import GitRepoVersionInfo
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DATE_EPOCH = "SOURCE_DATE_EPOCH"
+
+
+def parse_source_date_epoch(value: str) -> int:
+    """Parses the value of 'SOURCE_DATE_EPOCH'; raises ValueError if it's not a non-negative integer."""
+    if not value.strip().isdigit():
+        raise ValueError(f"'{SOURCE_DATE_EPOCH}' must be a number of seconds since the epoch, not '{value}'.")
+    return int(value)
+
+
+def is_reproducible(config: argparse.Namespace) -> bool:
+    """An explicit '--reproducible' or '--no-reproducible' wins over the 'SOURCE_DATE_EPOCH' environment variable."""
+    reproducible = getattr(config, "reproducible", None)
+    if reproducible is not None:
+        return bool(reproducible)
+    return bool(os.environ.get(SOURCE_DATE_EPOCH))
+
+
+def get_source_date_epoch(config: argparse.Namespace) -> Optional[int]:
+    """
+    Returns the timestamp to use instead of the current time, or None if the build isn't reproducible.
+    Raises ValueError if 'SOURCE_DATE_EPOCH' is invalid.
+    """
+    if not is_reproducible(config):
+        return None
+    value = os.environ.get(SOURCE_DATE_EPOCH)
+    if value:
+        return parse_source_date_epoch(value)
+    timestamp = GitRepoVersionInfo(config.chart_dir).get_last_commit_timestamp()
+    if timestamp is None:
+        logger.warning(
+            f"Chart directory '{config.chart_dir}' isn't in a git repository with commits and '{SOURCE_DATE_EPOCH}'"
+            " isn't set, using 0 as the timestamp of the reproducible build."
+        )
+        return 0
+    return timestamp
@@ -0,0 +1,185 @@
+"""Process-wide registry of the external tools (binaries) used by build steps.
+
+Every build step that wraps an external binary has to check that the binary is present and that
+its version is supported. Forking '<tool> version' for each of those checks is expensive, so the
+registry resolves each tool's version once per binary and, if a cache directory is configured,
+persists the probed version keyed by the binary's path, mtime and inode, so that repeated runs on
+the same machine don't fork at all. Resolved versions are checked against the same key on every
+lookup, so a long-running process (like the build server) notices upgraded tools.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from step_exec_lib.errors import ValidationError
+
+from app_build_suite.utils.processes import run_and_log
+
+logger = logging.getLogger(__name__)
+
+VersionParser = Callable[[str], str]
+"""Extracts a version string from the output of the tool's 'version' command. Raises ValueError."""
+
+_CACHE_FILE_NAME = "tool-versions.json"
+
+
+@dataclass(frozen=True)
+class ToolInfo:
+    name: str
+    path: str
+    version: str
+
+
+def parse_helm_version(output: str) -> str:
+    """Parses the 'version.BuildInfo{Version:"v3.21.2", ...}' line printed by 'helm version'."""
+    version_line = output.splitlines()[0] if output else ""
+    prefix = "version.BuildInfo"
+    if not version_line.startswith(prefix):
+        raise ValueError(f"unexpected output '{version_line}'")
+    version_entries = version_line[len(prefix) :].strip("{}").split(",")[0]
+    return version_entries.split(":")[1].strip('"')
+
+
+def parse_ct_version(output: str) -> str:
+    """Parses the 'Version: v3.14.0' line printed by 'ct version'."""
+    version_line = output.splitlines()[0] if output else ""
+    if ":" not in version_line:
+        raise ValueError(f"unexpected output '{version_line}'")
+    return version_line.split(":")[1].strip()
+
+
+def parse_first_line_version(output: str) -> str:
+    """Used for tools (like 'kube-linter version') that print just the version number."""
+    if not output.strip():
+        raise ValueError("empty output")
+    return output.splitlines()[0].strip()
+
+
+class ToolRegistry:
+    """
+    Resolves and caches paths and versions of external tools.
+
+    Lookups are thread-safe, so a single registry can be shared by all the steps and charts built
+    in one process.
+    """
+
+    def __init__(self) -> None:
+        # tools by binary name, with the cache key of the binary they were resolved from
+        self._tools: Dict[str, Tuple[Optional[str], ToolInfo]] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Forgets all the tools resolved so far (the on-disk cache is kept)."""
+        with self._lock:
+            self._tools.clear()
+
+    def get(
+        self,
+        check_source_name: str,
+        bin_name: str,
+        parser: VersionParser,
+        cache_dir: Optional[str] = None,
+    ) -> ToolInfo:
+        """
+        Get the path and version of the tool. Raises ValidationError if the tool can't be found
+        or its version can't be parsed.
+        :param check_source_name: The name of the component making the check (for clear exception source).
+        :param bin_name: The name of the binary executable.
+        :param parser: Function extracting the version from the output of '<bin_name> version'.
+        :param cache_dir: Directory of the persistent version cache; if empty, nothing is persisted.
+        :return: ToolInfo of the resolved binary.
+        """
+        with self._lock:
+            path = shutil.which(bin_name)
+            if path is None:
+                raise ValidationError(
+                    check_source_name,
+                    f"Can't find {bin_name} executable. Please make sure it's installed.",
+                )
+            path = os.path.realpath(path)
+            cache_key = self._get_cache_key(path)
+            known = self._tools.get(bin_name)
+            # a binary replaced since it was resolved (like an upgraded tool) has another key and is probed again
+            if known is not None and cache_key is not None and known[0] == cache_key:
+                return known[1]
+            tool = self._resolve(check_source_name, bin_name, path, cache_key, parser, cache_dir)
+            self._tools[bin_name] = (cache_key, tool)
+            return tool
+
+    def _resolve(
+        self,
+        check_source_name: str,
+        bin_name: str,
+        path: str,
+        cache_key: Optional[str],
+        parser: VersionParser,
+        cache_dir: Optional[str],
+    ) -> ToolInfo:
+        cached_output = self._load_cached_output(cache_dir, cache_key)
+        if cached_output is not None:
+            logger.debug(f"Using cached '{bin_name} version' output for '{path}'.")
+            output = cached_output
+        else:
+            run_res = run_and_log([path, "version"], capture_output=True)  # nosec, path resolved above
+            output = run_res.stdout
+        try:
+            version = parser(output)
+        except (ValueError, IndexError):
+            raise ValidationError(check_source_name, f"Can't parse '{bin_name}' version number.")
+        if cached_output is None:
+            self._store_cached_output(cache_dir, cache_key, output)
+        return ToolInfo(bin_name, path, version)
+
+    @staticmethod
+    def _get_cache_key(path: str) -> Optional[str]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return f"{path}:{st.st_mtime_ns}:{st.st_ino}"
+
+    @staticmethod
+    def _load_cache(cache_dir: str) -> Dict[str, str]:
+        try:
+            with open(os.path.join(cache_dir, _CACHE_FILE_NAME), "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _load_cached_output(self, cache_dir: Optional[str], cache_key: Optional[str]) -> Optional[str]:
+        if not cache_dir or cache_key is None:
+            return None
+        output = self._load_cache(cache_dir).get(cache_key)
+        return output if isinstance(output, str) else None
+
+    def _store_cached_output(self, cache_dir: Optional[str], cache_key: Optional[str], output: str) -> None:
+        if not cache_dir or cache_key is None:
+            return
+        # entries for replaced binaries are dropped, so the file doesn't grow with every upgrade
+        path_prefix = cache_key.rsplit(":", 2)[0] + ":"
+        data = {k: v for k, v in self._load_cache(cache_dir).items() if not k.startswith(path_prefix)}
+        data[cache_key] = output
+        cache_file = os.path.join(cache_dir, _CACHE_FILE_NAME)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(tmp_file, "w") as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.debug(f"Can't save tool version cache to '{cache_file}': {e}.")
+
+
+tool_registry = ToolRegistry()
+"""The registry shared by all the build steps running in this process."""
+
+
+def get_tool_version(check_source_name: str, bin_name: str, parser: VersionParser, cache_dir: Optional[str]) -> str:
+    """Shortcut returning just the version of the tool from the shared registry."""
+    return tool_registry.get(check_source_name, bin_name, parser, cache_dir).version
@@ -4,7 +4,9 @@ PyYAML's SafeLoader silently keeps the last value when a mapping key is duplicat
 which for rendered Helm manifests means silently dropped configuration.
 """
 
-from typing import Any, Dict, Optional
+import bisect
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Type, cast
 
 import yaml
 
@@ -16,46 +18,253 @@ class DuplicateKeyError(yaml.YAMLError):
         """1-based line of the duplicate key, relative to the parsed stream."""
 
 
-class UniqueKeyLoader(yaml.SafeLoader):
+_MERGE_TAG = "tag:yaml.org,2002:merge"
+_VALUE_TAG = "tag:yaml.org,2002:value"
+
+
+class _UniqueKeyConstructorMixin:
+    """
+    Replaces SafeConstructor.construct_mapping with one that fails on duplicate keys. Each key is
+    constructed once, both for the duplicate check and for the resulting mapping.
+
+    Only keys written in the mapping itself are checked: keys merged in with '<<' can be overridden,
+    as YAML merge semantics allow.
+    """
+
+    line_offset = 0
+    """Added to line numbers in errors, for documents cut from a bigger stream."""
+
     def construct_mapping(self, node: yaml.MappingNode, deep: bool = False) -> Dict[Any, Any]:
-        seen: Dict[Any, yaml.nodes.Node] = {}
+        loader = cast(yaml.SafeLoader, self)
+        if not isinstance(node, yaml.MappingNode):
+            raise yaml.constructor.ConstructorError(
+                None, None, f"expected a mapping node, but found {node.id}", node.start_mark
+            )
+        own_key_nodes = set()
+        merge_key_node = None
         for key_node, _ in node.value:
-            key = self.construct_object(key_node, deep=True)
+            own_key_nodes.add(id(key_node))
+            if key_node.tag == _MERGE_TAG:
+                if merge_key_node is not None:
+                    raise self._duplicate_key_error("<<", key_node, merge_key_node)
+                merge_key_node = key_node
+        loader.flatten_mapping(node)
+        mapping: Dict[Any, Any] = {}
+        seen: Dict[Any, yaml.nodes.Node] = {}
+        for key_node, value_node in node.value:
+            key = loader.construct_object(key_node, deep=True)
             try:
                 hash(key)
             except TypeError:
-                # unhashable keys are reported by SafeLoader itself
-                continue
-            if key in seen:
-                raise DuplicateKeyError(
-                    f"duplicate key '{key}' at line {key_node.start_mark.line + 1},"
-                    f" column {key_node.start_mark.column + 1}"
-                    f" (first defined at line {seen[key].start_mark.line + 1})",
-                    key_node.start_mark.line + 1,
+                raise yaml.constructor.ConstructorError(
+                    "while constructing a mapping", node.start_mark, "found unhashable key", key_node.start_mark
                 )
-            seen[key] = key_node
-        return super().construct_mapping(node, deep)
+            if id(key_node) in own_key_nodes:
+                if key in seen:
+                    raise self._duplicate_key_error(key, key_node, seen[key])
+                seen[key] = key_node
+            mapping[key] = loader.construct_object(value_node, deep=deep)
+        return mapping
+
+    def _duplicate_key_error(
+        self, key: Any, key_node: yaml.nodes.Node, first_node: yaml.nodes.Node
+    ) -> DuplicateKeyError:
+        line = key_node.start_mark.line + 1 + self.line_offset
+        return DuplicateKeyError(
+            f"duplicate key '{key}' at line {line},"
+            f" column {key_node.start_mark.column + 1}"
+            f" (first defined at line {first_node.start_mark.line + 1 + self.line_offset})",
+            line,
+        )
+
 
+class PyUniqueKeyLoader(_UniqueKeyConstructorMixin, yaml.SafeLoader):
+    """Duplicate-key-checking loader based on the pure Python SafeLoader."""
 
-def _construct_scalar_as_str(loader: UniqueKeyLoader, node: yaml.ScalarNode) -> str:
+
+def _construct_scalar_as_str(loader: yaml.SafeLoader, node: yaml.ScalarNode) -> str:
     return loader.construct_scalar(node)
 
 
 # PyYAML implements YAML 1.1, so it resolves a plain '=' to the 'value' tag and a plain '<<' to the
 # 'merge' tag, but SafeConstructor registers no constructor for either. Anything containing them then
 # fails to load: a bare '=' scalar (e.g. the upstream prometheus-operator AlertmanagerConfig
-# 'matchType' enum), or a '<<' merge key -- which SafeLoader itself handles via flatten_mapping, but
-# construct_mapping above constructs key nodes before that happens. YAML 1.2 dropped both tags;
-# treat them as the plain strings they are.
-UniqueKeyLoader.add_constructor("tag:yaml.org,2002:value", _construct_scalar_as_str)
-UniqueKeyLoader.add_constructor("tag:yaml.org,2002:merge", _construct_scalar_as_str)
+# 'matchType' enum), or a '<<' in value position, where flatten_mapping never sees it. YAML 1.2
+# dropped both tags; treat them as the plain strings they are.
+PyUniqueKeyLoader.add_constructor(_VALUE_TAG, _construct_scalar_as_str)
+PyUniqueKeyLoader.add_constructor(_MERGE_TAG, _construct_scalar_as_str)
+
+UniqueKeyLoader: Type[Any] = PyUniqueKeyLoader
+"""The fastest available duplicate-key-checking loader: CUniqueKeyLoader if PyYAML is built with libyaml."""
+
+if yaml.__with_libyaml__:
+
+    class CUniqueKeyLoader(_UniqueKeyConstructorMixin, yaml.CSafeLoader):
+        """Duplicate-key-checking loader parsing with libyaml; the same semantics as PyUniqueKeyLoader."""
+
+    CUniqueKeyLoader.add_constructor(_VALUE_TAG, _construct_scalar_as_str)
+    CUniqueKeyLoader.add_constructor(_MERGE_TAG, _construct_scalar_as_str)
+    UniqueKeyLoader = CUniqueKeyLoader
+
+
+SOURCE_PREFIX = "# Source: "
+
+
+def parse_source_comment(line: str) -> Optional[str]:
+    """Returns the template path of a '# Source: <path>' comment line, or None for any other line."""
+    if line.startswith(SOURCE_PREFIX):
+        return line[len(SOURCE_PREFIX) :].strip()
+    return None
+
+
+class SourceIndex:
+    """
+    Maps lines of 'helm template' output back to the originating template files, using the
+    '# Source: <path>' comments helm emits at the start of each document.
+
+    Keeps only the lines of the comments, so it's small even for huge outputs. Build it once per
+    render (with 'from_text' or by calling 'add' while reading the output) and query it with
+    'source_at' as many times as needed; each query is a binary search.
+    """
+
+    def __init__(self) -> None:
+        self._lines: List[int] = []
+        self._sources: List[str] = []
+
+    @classmethod
+    def from_text(cls, rendered: str) -> "SourceIndex":
+        index = cls()
+        for line_no, line in enumerate(rendered.splitlines(), start=1):
+            source = parse_source_comment(line)
+            if source is not None:
+                index.add(line_no, source)
+        return index
+
+    def add(self, line_no: int, source: str) -> None:
+        """Records a '# Source:' comment at a 1-based line; lines have to be added in increasing order."""
+        if self._lines and line_no <= self._lines[-1]:
+            raise ValueError(f"Source comments must be added in order, got line {line_no} after {self._lines[-1]}.")
+        self._lines.append(line_no)
+        self._sources.append(source)
+
+    def source_at(self, line_no: int) -> Optional[str]:
+        """Returns the template the 1-based line was rendered from: the last '# Source:' at or before it."""
+        i = bisect.bisect_right(self._lines, line_no)
+        return self._sources[i - 1] if i > 0 else None
+
+    def __len__(self) -> int:
+        return len(self._lines)
 
 
 def find_nearest_source(rendered: str, line_no: int) -> Optional[str]:
     """Map a 1-based line in 'helm template' output back to the originating template file
-    using the '# Source: <path>' comments helm emits at the start of each document."""
-    lines = rendered.splitlines()
-    for line in reversed(lines[: min(line_no, len(lines))]):
-        if line.startswith("# Source: "):
-            return line[len("# Source: ") :].strip()
-    return None
+    using the '# Source: <path>' comments helm emits at the start of each document.
+    To look up many lines of the same output, use SourceIndex instead."""
+    return SourceIndex.from_text(rendered).source_at(line_no)
+
+
+def _shift_mark(mark: yaml.Mark, lines: int) -> yaml.Mark:
+    return yaml.Mark(mark.name, mark.index, mark.line + lines, mark.column, mark.buffer, mark.pointer)
+
+
+def load_all_strict(text: str, first_line: int = 1) -> int:
+    """
+    Loads all the documents in 'text' with UniqueKeyLoader and returns their count.
+    :param text: The YAML stream.
+    :param first_line: The 1-based line number of the first line of 'text' in a bigger stream it was
+        cut from; line numbers in raised errors are relative to that stream.
+    :return: Number of documents loaded.
+    """
+    loader = UniqueKeyLoader(text)
+    loader.line_offset = first_line - 1
+    count = 0
+    try:
+        while loader.check_data():
+            loader.get_data()
+            count += 1
+    except yaml.MarkedYAMLError as e:
+        # make the error report lines of the whole stream; libyaml's marks are read-only, so replace them
+        if e.context_mark is not None:
+            e.context_mark = _shift_mark(e.context_mark, first_line - 1)
+        if e.problem_mark is not None:
+            e.problem_mark = _shift_mark(e.problem_mark, first_line - 1)
+        raise
+    finally:
+        loader.dispose()
+    return count
+
+
+@dataclass
+class StrictLoadResult:
+    """The outcome of load_all_strict, in a form that can be passed between processes."""
+
+    document_count: int
+    error: Optional[str] = None
+    error_line: Optional[int] = None
+    """1-based line of the error in the whole stream, if known."""
+    duplicate_key: bool = False
+
+
+def check_documents(text: str, first_line: int = 1) -> StrictLoadResult:
+    """Like load_all_strict, but returns YAML errors instead of raising them."""
+    try:
+        return StrictLoadResult(load_all_strict(text, first_line))
+    except DuplicateKeyError as e:
+        return StrictLoadResult(0, str(e), e.line, duplicate_key=True)
+    except yaml.MarkedYAMLError as e:
+        return StrictLoadResult(0, str(e), e.problem_mark.line + 1 if e.problem_mark else None)
+    except yaml.YAMLError as e:
+        return StrictLoadResult(0, str(e))
+
+
+@dataclass
+class RenderedDocument:
+    text: str
+    first_line: int
+    """1-based line of the document's first line in the whole stream."""
+    source: Optional[str]
+    """The template the document was rendered from, taken from the last '# Source:' comment seen."""
+
+
+def _is_document_start(line: str) -> bool:
+    return line.startswith("---") and (len(line) == 3 or line[3] in " \t\r\n")
+
+
+class RenderedDocumentSplitter:
+    """
+    Splits a multi-document YAML stream fed line by line (like 'helm template' output read from a
+    pipe) into single documents on '---' markers, tracking the '# Source:' comments on the way. Only
+    the current document is kept in memory.
+    """
+
+    def __init__(self) -> None:
+        self._lines: List[str] = []
+        self._first_line = 1
+        self._line_no = 0
+        self._source: Optional[str] = None
+        self.source_index = SourceIndex()
+        """Index of all the '# Source:' comments fed so far."""
+
+    def feed(self, line: str) -> Optional[RenderedDocument]:
+        """Adds the next line of the stream; returns the previous document if the line starts a new one."""
+        self._line_no += 1
+        finished = None
+        if _is_document_start(line) and self._lines:
+            finished = self._flush()
+        if not self._lines:
+            self._first_line = self._line_no
+        self._lines.append(line)
+        source = parse_source_comment(line)
+        if source is not None:
+            self._source = source
+            self.source_index.add(self._line_no, source)
+        return finished
+
+    def close(self) -> Optional[RenderedDocument]:
+        """Ends the stream; returns the last document, if there's any."""
+        return self._flush() if self._lines else None
+
+    def _flush(self) -> RenderedDocument:
+        document = RenderedDocument("".join(self._lines), self._first_line, self._source)
+        self._lines = []
+        return document
@@ -0,0 +1,4 @@
+"""Benchmarks of the build pipeline, run on synthetic charts of configurable size.
+
+Run with 'python -m benchmarks'; see the 'Benchmarks' section of docs/CONTRIBUTING.md.
+"""
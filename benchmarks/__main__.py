@@ -0,0 +1,243 @@
+"""Runs the benchmarks, stores the results and optionally compares them with a previous run."""
+
+import argparse
+import copy
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from dataclasses import asdict, replace
+from typing import Any, Dict, List
+
+import yaml
+
+from benchmarks.harness import (
+    DEFAULT_RESULTS_DIR,
+    Benchmark,
+    compare_runs,
+    find_run,
+    format_comparison,
+    load_run,
+    new_run,
+    run_benchmark,
+    save_run,
+)
+from benchmarks.synthetic import SIZES, ChartSpec, generate_chart, render_chart, write_stub_tools
+
+from app_build_suite.build_steps.chart_yaml_writer import ChartYamlWriter
+from app_build_suite.build_steps.helm_chart_metadata_builder import HelmChartMetadataBuilder
+from app_build_suite.build_steps.helm_consts import (
+    CHART_YAML,
+    context_key_changes_made,
+    context_key_chart_yaml,
+)
+from app_build_suite.build_steps.helm_template_validator import HelmTemplateValidator
+from app_build_suite.utils.chart_packager import package_chart
+from app_build_suite.utils.tools import tool_registry
+from app_build_suite.utils.yaml_strict import find_nearest_source, load_all_strict
+
+logger = logging.getLogger("benchmarks")
+
+_CATALOG_BASE_URL = "https://example.com/catalog/"
+# lines looked up in every run of the 'find_nearest_source' benchmark
+_SOURCE_LOOKUPS = 20
+
+
+class _Workspace:
+    """The synthetic chart, its rendered output and the stub tools, all in one temporary directory."""
+
+    def __init__(self, spec: ChartSpec) -> None:
+        self.root = tempfile.mkdtemp(prefix="abs-benchmarks-")
+        self.chart_dir = os.path.join(self.root, "chart")
+        self.bin_dir = os.path.join(self.root, "bin")
+        self.rendered_path = os.path.join(self.root, "rendered.yaml")
+        self._copies = 0
+        generate_chart(spec, self.chart_dir)
+        self.rendered = render_chart(spec)
+        with open(self.rendered_path, "w") as f:
+            f.write(self.rendered)
+        write_stub_tools(self.bin_dir, self.rendered_path)
+        with open(os.path.join(self.chart_dir, CHART_YAML)) as f:
+            self.chart_yaml = yaml.safe_load(f)
+
+    def copy_chart(self) -> str:
+        """Returns a fresh copy of the chart, for benchmarks that modify it."""
+        self._copies += 1
+        path = os.path.join(self.root, f"chart-{self._copies}", "chart")
+        shutil.copytree(self.chart_dir, path)
+        return path
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _metadata_config(chart_dir: str) -> argparse.Namespace:
+    return argparse.Namespace(
+        chart_dir=chart_dir,
+        destination=chart_dir,
+        generate_metadata=True,
+        catalog_base_url=_CATALOG_BASE_URL,
+    )
+
+
+def _run_pipeline(workspace: _Workspace, chart_dir: str) -> None:
+    # imported here, as it pulls in the image libraries of the Giant Swarm validators
+    from step_exec_lib.steps import Runner
+
+    from app_build_suite.__main__ import get_config, get_pipeline
+
+    steps = get_pipeline()
+    args = [
+        "--chart-dir",
+        chart_dir,
+        "--destination",
+        os.path.join(os.path.dirname(chart_dir), "build"),
+        "--cache-dir",
+        os.path.join(workspace.root, "cache"),
+        "--generate-metadata",
+        "--catalog-base-url",
+        _CATALOG_BASE_URL,
+        "--disable-strict-giantswarm-validator",
+        # the synthetic chart has no icon, as checking it would need network access
+        "--giantswarm-validator-ignored-checks",
+        "C0002",
+    ]
+    config = get_config(steps, args, config_file_path="")
+    try:
+        Runner(config, steps).run()
+    except SystemExit as e:
+        if e.code not in (0, None):
+            raise RuntimeError("The build of the synthetic chart failed, run with '--verbose' to see why.")
+
+
+def get_benchmarks(workspace: _Workspace) -> List[Benchmark]:
+    rendered_lines = workspace.rendered.count("\n")
+    lookup_lines = [1 + i * rendered_lines // _SOURCE_LOOKUPS for i in range(_SOURCE_LOOKUPS)]
+    metadata_builder = HelmChartMetadataBuilder()
+    chart_yaml_writer = ChartYamlWriter()
+    template_validator = HelmTemplateValidator()
+    writer_chart_dir = workspace.copy_chart()
+
+    def metadata_context() -> Dict[str, Any]:
+        return {context_key_chart_yaml: copy.deepcopy(workspace.chart_yaml)}
+
+    def writer_context() -> Dict[str, Any]:
+        context = metadata_context()
+        metadata_builder.run(_metadata_config(writer_chart_dir), context)
+        context[context_key_changes_made] = True
+        return context
+
+    return [
+        Benchmark("yaml_load_rendered", lambda _: load_all_strict(workspace.rendered)),
+        Benchmark(
+            "find_nearest_source",
+            lambda _: [find_nearest_source(workspace.rendered, line) for line in lookup_lines],
+        ),
+        Benchmark("uses_lookup", lambda _: template_validator._uses_lookup(workspace.chart_dir)),
+        Benchmark(
+            "metadata_builder_run",
+            lambda context: metadata_builder.run(_metadata_config(workspace.chart_dir), context),
+            metadata_context,
+        ),
+        Benchmark(
+            "chart_yaml_writer_run",
+            lambda context: chart_yaml_writer.run(_metadata_config(writer_chart_dir), context),
+            writer_context,
+        ),
+        Benchmark(
+            "package_chart",
+            lambda _: package_chart(
+                workspace.chart_dir, os.path.join(workspace.root, "packaged"), threads=os.cpu_count() or 1
+            ),
+        ),
+        Benchmark("pipeline", lambda chart_dir: _run_pipeline(workspace, chart_dir), workspace.copy_chart),
+    ]
+
+
+def _get_spec(args: argparse.Namespace) -> ChartSpec:
+    spec = SIZES[args.size]
+    overrides = {name: getattr(args, name) for name in asdict(spec) if getattr(args, name) is not None}
+    return replace(spec, **overrides)
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the build pipeline on a synthetic chart. Runs offline: 'helm', 'ct' and"
+        " 'kube-linter' are replaced with stubs.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--size", choices=sorted(SIZES), default="medium", help="Size preset of the chart.")
+    for name in asdict(SIZES["small"]):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, help=f"Override '{name}' of the size preset.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of measured runs of each benchmark.")
+    parser.add_argument("--warmup", type=int, default=1, help="Number of runs before the measured ones.")
+    parser.add_argument(
+        "-k", "--benchmarks", nargs="+", help="Run only these benchmarks (by default, all of them are run)."
+    )
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR, help="Directory storing results of runs.")
+    parser.add_argument(
+        "--compare",
+        help="Compare with a stored run: a path to its results file, or a commit (the newest run of it is used).",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="With '--compare', exit with an error if any median time grew by more than this fraction.",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show log messages of the build steps.")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = _parse_args(argv)
+    logging.basicConfig(format="%(message)s", level=logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+    spec = _get_spec(args)
+    baseline = None
+    if args.compare:
+        baseline_path = args.compare if os.path.isfile(args.compare) else find_run(args.results_dir, args.compare)
+        if baseline_path is None:
+            logger.error(f"No stored results of '{args.compare}' in '{args.results_dir}'.")
+            return 2
+        baseline = load_run(baseline_path)
+        if baseline.parameters != asdict(spec):
+            logger.warning(f"The baseline was run with different parameters: {baseline.parameters}.")
+
+    workspace = _Workspace(spec)
+    os.environ["PATH"] = workspace.bin_dir + os.pathsep + os.environ.get("PATH", "")
+    # tools resolved before (in tests, for example) must not shadow the stubs
+    tool_registry.clear()
+    run = new_run(asdict(spec))
+    try:
+        benchmarks = get_benchmarks(workspace)
+        unknown = set(args.benchmarks or []) - {b.name for b in benchmarks}
+        if unknown:
+            logger.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}.")
+            return 2
+        logger.info(f"Benchmarking a chart with {spec.rendered_documents} rendered documents: {asdict(spec)}.")
+        for benchmark in benchmarks:
+            if args.benchmarks and benchmark.name not in args.benchmarks:
+                continue
+            result = run_benchmark(benchmark, args.repeat, args.warmup)
+            run.results[benchmark.name] = result
+            logger.info(
+                f"{benchmark.name:<28} median {result.median * 1000:>10.2f}ms"
+                f"  min {result.min * 1000:>10.2f}ms  stdev {result.stdev * 1000:>8.2f}ms"
+            )
+    finally:
+        workspace.cleanup()
+
+    logger.info(f"Results saved to '{save_run(run, args.results_dir)}'.")
+    if baseline is None:
+        return 0
+    comparisons = compare_runs(baseline, run)
+    logger.info(f"Compared with {baseline.commit[:12]} ({baseline.timestamp}):")
+    logger.info(format_comparison(comparisons, args.threshold))
+    return 1 if any(c.change > args.threshold for c in comparisons) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
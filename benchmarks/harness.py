@@ -0,0 +1,166 @@
+"""Timing of benchmarks and storing their results, so runs on different commits can be compared."""
+
+import json
+import os
+import platform
+import statistics
+import subprocess  # nosec: only used to ask git for the current commit
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_RESULTS_DIR = ".benchmarks"
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: Callable[[Any], Any]
+    """The measured code; gets the value returned by 'setup'."""
+    setup: Callable[[], Any] = lambda: None
+    """Prepares a single run of 'func'; not measured."""
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    times: List[float]
+    """Wall time of each run, in seconds."""
+
+    @property
+    def min(self) -> float:
+        return min(self.times)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    @property
+    def stdev(self) -> float:
+        return statistics.stdev(self.times) if len(self.times) > 1 else 0.0
+
+
+@dataclass
+class BenchmarkRun:
+    """Results of all the benchmarks run on one commit, with the conditions they were run in."""
+
+    commit: str
+    dirty: bool
+    timestamp: str
+    python: str
+    machine: str
+    parameters: Dict[str, Any]
+    results: Dict[str, BenchmarkResult] = field(default_factory=dict)
+
+    def to_json(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["results"] = {
+            name: {"min": r.min, "median": r.median, "stdev": r.stdev, "times": r.times}
+            for name, r in self.results.items()
+        }
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "BenchmarkRun":
+        results = {name: BenchmarkResult(name, list(r["times"])) for name, r in data["results"].items()}
+        return cls(
+            commit=data["commit"],
+            dirty=data["dirty"],
+            timestamp=data["timestamp"],
+            python=data["python"],
+            machine=data["machine"],
+            parameters=data["parameters"],
+            results=results,
+        )
+
+
+def run_benchmark(benchmark: Benchmark, repeat: int, warmup: int = 1) -> BenchmarkResult:
+    """Runs the benchmark 'warmup' times without measuring, then 'repeat' times measuring each run."""
+    times: List[float] = []
+    for i in range(warmup + repeat):
+        arg = benchmark.setup()
+        start = time.perf_counter()
+        benchmark.func(arg)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            times.append(elapsed)
+    return BenchmarkResult(benchmark.name, times)
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        res = subprocess.run(["git", *args], capture_output=True, text=True, check=True)  # nosec
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return res.stdout.strip()
+
+
+def new_run(parameters: Dict[str, Any]) -> BenchmarkRun:
+    """Creates an empty run for the current commit (or 'unknown', outside of a git repository)."""
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return BenchmarkRun(
+        commit=_git("rev-parse", "HEAD") or "unknown",
+        dirty=bool(status),
+        timestamp=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        python=sys.version.split()[0],
+        machine=f"{platform.system()}-{platform.machine()}",
+        parameters=parameters,
+    )
+
+
+def save_run(run: BenchmarkRun, results_dir: str) -> str:
+    """Saves the run as '<results_dir>/<timestamp>-<commit>.json' and returns the path."""
+    os.makedirs(results_dir, exist_ok=True)
+    timestamp = run.timestamp.replace(":", "").replace("-", "")
+    path = os.path.join(results_dir, f"{timestamp}-{run.commit[:12]}{'-dirty' if run.dirty else ''}.json")
+    with open(path, "w") as f:
+        json.dump(run.to_json(), f, indent=2)
+    return path
+
+
+def load_run(path: str) -> BenchmarkRun:
+    with open(path, "r") as f:
+        return BenchmarkRun.from_json(json.load(f))
+
+
+def find_run(results_dir: str, commit: str) -> Optional[str]:
+    """Returns the path of the newest stored run of the commit (or of a commit with this prefix)."""
+    try:
+        names = sorted(os.listdir(results_dir), reverse=True)
+    except OSError:
+        return None
+    for name in names:
+        if name.endswith(".json") and name.split("-")[1].startswith(commit[:12]):
+            return os.path.join(results_dir, name)
+    return None
+
+
+@dataclass(frozen=True)
+class Comparison:
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        """Relative change of the median time; positive means slower."""
+        return self.current / self.baseline - 1.0 if self.baseline else 0.0
+
+
+def compare_runs(baseline: BenchmarkRun, current: BenchmarkRun) -> List[Comparison]:
+    """Compares median times of the benchmarks present in both runs."""
+    return [
+        Comparison(name, baseline.results[name].median, result.median)
+        for name, result in current.results.items()
+        if name in baseline.results
+    ]
+
+
+def format_comparison(comparisons: List[Comparison], threshold: float) -> str:
+    lines = [f"{'benchmark':<28} {'baseline':>12} {'current':>12} {'change':>9}"]
+    for c in comparisons:
+        flag = "  REGRESSION" if c.change > threshold else ""
+        lines.append(f"{c.name:<28} {c.baseline * 1000:>10.2f}ms {c.current * 1000:>10.2f}ms {c.change:>+9.1%}{flag}")
+    return "\n".join(lines)
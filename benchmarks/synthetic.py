@@ -0,0 +1,204 @@
+"""Synthetic charts and stub binaries of the external tools, so benchmarks run offline."""
+
+import os
+import stat
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import yaml
+
+CHART_NAME = "synthetic-app"
+CHART_VERSION = "1.0.0"
+STUB_HELM_VERSION = "v3.16.4"
+STUB_CT_VERSION = "v3.11.0"
+STUB_KUBE_LINTER_VERSION = "0.6.8"
+
+
+@dataclass(frozen=True)
+class ChartSpec:
+    templates: int
+    """Number of files in the 'templates/' directory."""
+    documents_per_template: int
+    """Number of documents each template renders to."""
+    values_depth: int
+    """Depth of the tree in 'values.yaml'."""
+    values_width: int
+    """Number of children of every inner node of the values tree."""
+    annotations: int
+    """Number of annotations in Chart.yaml."""
+    document_annotations: int
+    """Number of annotations in every rendered document."""
+
+    @property
+    def rendered_documents(self) -> int:
+        return self.templates * self.documents_per_template
+
+
+SIZES: Dict[str, ChartSpec] = {
+    "small": ChartSpec(
+        templates=10, documents_per_template=5, values_depth=3, values_width=3, annotations=20, document_annotations=5
+    ),
+    "medium": ChartSpec(
+        templates=50,
+        documents_per_template=20,
+        values_depth=5,
+        values_width=4,
+        annotations=200,
+        document_annotations=20,
+    ),
+    "large": ChartSpec(
+        templates=200,
+        documents_per_template=50,
+        values_depth=7,
+        values_width=4,
+        annotations=2000,
+        document_annotations=50,
+    ),
+}
+
+
+def _values_tree(depth: int, width: int, path: str = "") -> Dict[str, Any]:
+    if depth <= 1:
+        return {f"key{i}": f"{path}value{i}" for i in range(width)}
+    return {f"level{depth}_{i}": _values_tree(depth - 1, width, f"{path}{i}.") for i in range(width)}
+
+
+def _chart_yaml(spec: ChartSpec) -> Dict[str, Any]:
+    annotations: Dict[str, str] = {
+        "application.giantswarm.io/team": "synthetic",
+        "application.giantswarm.io/readme": "https://example.com/README.md",
+    }
+    for i in range(spec.annotations):
+        annotations[f"example.com/annotation-{i}"] = f"value {i} " * 4
+    return {
+        "apiVersion": "v2",
+        "name": CHART_NAME,
+        "version": CHART_VERSION,
+        "appVersion": "1.0.0",
+        "description": "Synthetic chart generated for benchmarks",
+        "home": "https://github.com/example/synthetic-app",
+        "annotations": annotations,
+        "restrictions": {"clusterSingleton": True, "compatibleProviders": ["aws", "azure"]},
+    }
+
+
+def _template(spec: ChartSpec, index: int) -> str:
+    # the templates are never rendered by the stub helm, they only have to look (and weigh) like real ones
+    documents = []
+    for doc in range(spec.documents_per_template):
+        documents.append(
+            f"apiVersion: v1\n"
+            f"kind: ConfigMap\n"
+            f"metadata:\n"
+            f"  name: {{{{ .Release.Name }}}}-{index}-{doc}\n"
+            f"  labels:\n"
+            f'    {{{{- include "synthetic.labels" . | nindent 4 }}}}\n'
+            f"data:\n"
+            f"  value: {{{{ .Values.level{spec.values_depth}_0 | toYaml | quote }}}}\n"
+        )
+    return "---\n".join(documents)
+
+
+def _rendered_document(spec: ChartSpec, index: int, doc: int) -> Dict[str, Any]:
+    return {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {
+            "name": f"release-name-{index}-{doc}",
+            "labels": {"app.kubernetes.io/name": CHART_NAME, "app.kubernetes.io/instance": "release-name"},
+            "annotations": {f"example.com/annotation-{i}": f"value {i}" for i in range(spec.document_annotations)},
+        },
+        "data": {f"key{i}": f"value {index}.{doc}.{i}" for i in range(10)},
+    }
+
+
+def render_chart(spec: ChartSpec) -> str:
+    """Returns what 'helm template' would print for the chart generated from the spec."""
+    parts: List[str] = []
+    for index in range(spec.templates):
+        for doc in range(spec.documents_per_template):
+            parts.append(f"---\n# Source: {CHART_NAME}/templates/template-{index}.yaml\n")
+            parts.append(yaml.safe_dump(_rendered_document(spec, index, doc), sort_keys=False))
+    return "".join(parts)
+
+
+def generate_chart(spec: ChartSpec, chart_dir: str) -> None:
+    """Writes a chart with the size given by the spec to 'chart_dir'."""
+    templates_dir = os.path.join(chart_dir, "templates")
+    os.makedirs(templates_dir, exist_ok=True)
+    with open(os.path.join(chart_dir, "Chart.yaml"), "w") as f:
+        yaml.safe_dump(_chart_yaml(spec), f, sort_keys=False)
+    with open(os.path.join(chart_dir, "values.yaml"), "w") as f:
+        yaml.safe_dump(_values_tree(spec.values_depth, spec.values_width), f, sort_keys=False)
+    with open(os.path.join(chart_dir, "values.schema.json"), "w") as f:
+        f.write('{"$schema": "http://json-schema.org/schema#", "type": "object"}\n')
+    with open(os.path.join(templates_dir, "_helpers.tpl"), "w") as f:
+        f.write(
+            '{{- define "synthetic.labels" -}}\n'
+            "app.kubernetes.io/name: {{ .Chart.Name }}\n"
+            "app.kubernetes.io/instance: {{ .Release.Name }}\n"
+            'application.giantswarm.io/team: {{ index .Chart.Annotations "application.giantswarm.io/team" | quote }}\n'
+            "{{- end -}}\n"
+        )
+    for index in range(spec.templates):
+        with open(os.path.join(templates_dir, f"template-{index}.yaml"), "w") as f:
+            f.write(_template(spec, index))
+
+
+_STUB_HELM = """
+import os
+import sys
+import tarfile
+
+import yaml
+
+args = sys.argv[1:]
+if args[:1] == ["version"]:
+    print('version.BuildInfo{{Version:"{helm_version}", GitCommit:"stub", GitTreeState:"clean"}}')
+elif args[:1] == ["template"]:
+    with open({rendered_path!r}) as f:
+        for line in f:
+            sys.stdout.write(line)
+elif args[:1] == ["package"]:
+    chart_dir = args[1]
+    destination = args[args.index("--destination") + 1] if "--destination" in args else "."
+    with open(os.path.join(chart_dir, "Chart.yaml")) as f:
+        chart_yaml = yaml.safe_load(f)
+    os.makedirs(destination, exist_ok=True)
+    path = os.path.join(destination, f"{{chart_yaml['name']}}-{{chart_yaml['version']}}.tgz")
+    with tarfile.open(path, "w:gz") as archive:
+        archive.add(chart_dir, arcname=chart_yaml["name"])
+    print(f"Successfully packaged chart and saved it to: {{path}}")
+"""
+
+_STUB_PRINT_VERSION = """
+import sys
+
+if sys.argv[1:2] == ["version"]:
+    print({version_output!r})
+"""
+
+
+def _write_script(path: str, body: str) -> None:
+    with open(path, "w") as f:
+        f.write(f"#!{sys.executable}\n{body}")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def write_stub_tools(bin_dir: str, rendered_path: str) -> None:
+    """
+    Writes stubs of 'helm', 'ct' and 'kube-linter' to 'bin_dir'. The stub 'helm template' prints the
+    file 'rendered_path', 'helm package' archives the chart directory; everything else succeeds
+    without doing anything.
+    """
+    os.makedirs(bin_dir, exist_ok=True)
+    _write_script(
+        os.path.join(bin_dir, "helm"),
+        _STUB_HELM.format(helm_version=STUB_HELM_VERSION, rendered_path=os.path.abspath(rendered_path)),
+    )
+    _write_script(os.path.join(bin_dir, "ct"), _STUB_PRINT_VERSION.format(version_output=f"Version: {STUB_CT_VERSION}"))
+    _write_script(
+        os.path.join(bin_dir, "kube-linter"),
+        _STUB_PRINT_VERSION.format(version_output=STUB_KUBE_LINTER_VERSION),
+    )
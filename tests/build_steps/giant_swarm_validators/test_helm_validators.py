@@ -1,3 +1,4 @@
+import builtins
 import os.path
 import pathlib
 
@@ -19,6 +20,7 @@ from app_build_suite.build_steps.helm_consts import (
     VALUES_SCHEMA_JSON,
     CHART_YAML,
     TEMPLATES_DIR,
+    HELPERS_TPL,
     HELPERS_YAML,
 )
 from tests.build_steps.helpers import init_config_for_step
@@ -31,13 +33,20 @@ def config() -> Namespace:
     return cfg
 
 
-def test_has_values_schema_validator(mocker: MockerFixture, config: Namespace) -> None:
-    mock_exists = mocker.patch("os.path.exists")
+def _write_chart_yaml(config: Namespace, chart_dir: pathlib.Path, chart_yaml_input: str) -> None:
+    (chart_dir / CHART_YAML).write_text(chart_yaml_input)
+    config.chart_dir = str(chart_dir)
+
+
+@pytest.mark.parametrize("has_schema", [True, False])
+def test_has_values_schema_validator(config: Namespace, tmp_path: pathlib.Path, has_schema: bool) -> None:
+    _write_chart_yaml(config, tmp_path, "name: app")
+    if has_schema:
+        (tmp_path / VALUES_SCHEMA_JSON).write_text("{}")
 
     val = HasValuesSchema()
 
-    assert val.validate(config)
-    assert mock_exists.call_args.args[0] == os.path.join(config.chart_dir, VALUES_SCHEMA_JSON)
+    assert val.validate(config) == has_schema
 
 
 @pytest.mark.parametrize(
@@ -143,26 +152,20 @@ def test_has_team_label_validator(
     expected_result: bool,
     mocker: MockerFixture,
     config: Namespace,
+    tmp_path: pathlib.Path,
 ) -> None:
-    mock_exists = mocker.patch("os.path.exists")
-    mock_open_chart_yaml = mocker.mock_open(read_data=chart_yaml_input)
-    mock_open_templates = mocker.mock_open(read_data=templates_input)
-    mock_opens_chart_yaml = mocker.patch("app_build_suite.build_steps.giant_swarm_validators.mixins.open")
-    mock_opens_template_yaml = mocker.patch("app_build_suite.build_steps.giant_swarm_validators.helm.open")
-
-    mock_opens_chart_yaml.return_value = mock_open_chart_yaml()
-    mock_opens_template_yaml.return_value = mock_open_templates()
+    _write_chart_yaml(config, tmp_path, chart_yaml_input)
+    (tmp_path / TEMPLATES_DIR).mkdir()
+    (tmp_path / TEMPLATES_DIR / HELPERS_YAML).write_text(templates_input)
+    # '_helpers.yaml' is used before '_helpers.tpl'
+    (tmp_path / TEMPLATES_DIR / HELPERS_TPL).write_text("")
+    open_spy = mocker.spy(builtins, "open")
 
     val = HasTeamLabel()
     assert val.validate(config) == expected_result
-    assert mock_exists.call_args_list[0].args[0] == os.path.join(config.chart_dir, CHART_YAML)
-    assert mock_opens_chart_yaml.call_args_list[0].args[0] == os.path.join(config.chart_dir, CHART_YAML)
 
-    if mock_exists.call_count > 1:
-        assert mock_exists.call_args_list[1].args[0] == os.path.join(config.chart_dir, TEMPLATES_DIR, HELPERS_YAML)
-        assert mock_opens_template_yaml.call_args_list[0].args[0] == os.path.join(
-            config.chart_dir, TEMPLATES_DIR, HELPERS_YAML
-        )
+    helpers_tpl_path = os.path.join(config.chart_dir, TEMPLATES_DIR, HELPERS_TPL)
+    assert all(c.args[0] != helpers_tpl_path for c in open_spy.call_args_list)
 
 
 @pytest.mark.parametrize(
@@ -198,7 +201,7 @@ def test_has_team_label_validator(
     ],
 )
 def test_icon_is_almost_square_validator(
-    logo_filename: str, expected_result: bool, mocker: MockerFixture, config: Namespace
+    logo_filename: str, expected_result: bool, config: Namespace, tmp_path: pathlib.Path
 ) -> None:
     current_folder = pathlib.Path(__file__).parent.absolute()
     logo_path = os.path.join(current_folder, logo_filename)
@@ -210,10 +213,7 @@ icon: file://{logo_path}"""
         else "no: icon"
     )
 
-    mocker.patch("os.path.exists")
-    mock_open_chart_yaml = mocker.mock_open(read_data=chart_yaml_input)
-    mock_opens = mocker.patch("app_build_suite.build_steps.giant_swarm_validators.mixins.open")
-    mock_opens.return_value = mock_open_chart_yaml.return_value
+    _write_chart_yaml(config, tmp_path, chart_yaml_input)
 
     val = IconIsAlmostSquare()
 
@@ -241,13 +241,10 @@ icon: file://./test_files/test_logo.svg""",
 def test_icon_exists(
     chart_yaml_input: str,
     expected_result: str,
-    mocker: MockerFixture,
     config: Namespace,
+    tmp_path: pathlib.Path,
 ) -> None:
-    mocker.patch("os.path.exists")
-    mock_open_chart_yaml = mocker.mock_open(read_data=chart_yaml_input)
-    mock_opens = mocker.patch("app_build_suite.build_steps.giant_swarm_validators.mixins.open")
-    mock_opens.return_value = mock_open_chart_yaml.return_value
+    _write_chart_yaml(config, tmp_path, chart_yaml_input)
 
     val = IconExists()
 
@@ -287,13 +284,10 @@ icon: https://example.com/icon.png""",
 def test_icon_domain_is_valid(
     chart_yaml_input: str,
     expected_result: bool,
-    mocker: MockerFixture,
     config: Namespace,
+    tmp_path: pathlib.Path,
 ) -> None:
-    mocker.patch("os.path.exists")
-    mock_open_chart_yaml = mocker.mock_open(read_data=chart_yaml_input)
-    mock_opens = mocker.patch("app_build_suite.build_steps.giant_swarm_validators.mixins.open")
-    mock_opens.return_value = mock_open_chart_yaml.return_value
+    _write_chart_yaml(config, tmp_path, chart_yaml_input)
 
     val = IconDomainIsValid()
 
@@ -0,0 +1,157 @@
+import argparse
+import io
+import pathlib
+import urllib.error
+import urllib.request
+from email.message import Message
+from typing import Any, List, Optional
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app_build_suite.build_steps.giant_swarm_validators.errors import GiantSwarmValidatorError
+from app_build_suite.build_steps.giant_swarm_validators.icon import IconIsAlmostSquare
+from app_build_suite.build_steps.giant_swarm_validators.icon_cache import CachedIconSize, IconSizeCache
+from app_build_suite.build_steps.giant_swarm_validators.mixins import ChartSnapshot
+from app_build_suite.build_steps.giantswarm_helm_validator import GiantSwarmHelmValidator
+from tests.build_steps.helpers import init_config_for_step
+
+ICON_URL = "https://s.giantswarm.io/app-icons/1/png/icon.png"
+ICON_FILE = pathlib.Path(__file__).parent / "test_files" / "test_icon.png"
+
+
+class FakeResponse(io.BytesIO):
+    def __init__(self, body: bytes, etag: str) -> None:
+        super().__init__(body)
+        self.headers = Message()
+        self.headers["ETag"] = etag
+
+
+class FakeServer:
+    """Serves the test icon with an ETag, answering conditional requests with '304 Not Modified'."""
+
+    def __init__(self, etag: str = '"v1"') -> None:
+        self.etag = etag
+        self.requests: List[urllib.request.Request] = []
+
+    def urlopen(self, request: urllib.request.Request, *args: Any, **kwargs: Any) -> FakeResponse:
+        self.requests.append(request)
+        if request.get_header("If-none-match") == self.etag:
+            raise urllib.error.HTTPError(request.full_url, 304, "Not Modified", Message(), None)
+        return FakeResponse(ICON_FILE.read_bytes(), self.etag)
+
+
+@pytest.fixture
+def server(mocker: MockerFixture) -> FakeServer:
+    fake = FakeServer()
+    mocker.patch.object(urllib.request, "urlopen", fake.urlopen)
+    return fake
+
+
+def _config(tmp_path: pathlib.Path, cache_dir: Optional[str] = None) -> argparse.Namespace:
+    config = init_config_for_step(GiantSwarmHelmValidator())
+    config.chart_dir = str(tmp_path)
+    config.cache_dir = cache_dir if cache_dir is not None else str(tmp_path / "cache")
+    return config
+
+
+def _validator() -> IconIsAlmostSquare:
+    validator = IconIsAlmostSquare()
+    validator.chart_snapshot = ChartSnapshot(chart_yaml={"icon": ICON_URL})
+    return validator
+
+
+def test_icon_size_is_cached(server: FakeServer, tmp_path: pathlib.Path) -> None:
+    config = _config(tmp_path)
+
+    assert _validator().validate(config)
+    assert _validator().validate(config)
+
+    assert len(server.requests) == 1
+    cached = IconSizeCache(config.cache_dir).get(ICON_URL)
+    assert cached is not None and cached.etag == '"v1"'
+
+
+def test_stale_icon_size_is_revalidated(server: FakeServer, tmp_path: pathlib.Path) -> None:
+    config = _config(tmp_path)
+    cache = IconSizeCache(config.cache_dir)
+    cache.put(ICON_URL, CachedIconSize(100, 100, 0.0, etag='"v1"'))
+
+    assert _validator().validate(config)
+
+    assert server.requests[0].get_header("If-none-match") == '"v1"'
+    refreshed = cache.get(ICON_URL)
+    assert refreshed is not None and refreshed.checked_at > 0
+    # the server answered '304 Not Modified', so the cached size is kept
+    assert (refreshed.width, refreshed.height) == (100, 100)
+
+
+def test_changed_icon_is_downloaded_again(server: FakeServer, tmp_path: pathlib.Path) -> None:
+    config = _config(tmp_path)
+    IconSizeCache(config.cache_dir).put(ICON_URL, CachedIconSize(10, 100, 0.0, etag='"v0"'))
+
+    assert _validator().validate(config)
+    cached = IconSizeCache(config.cache_dir).get(ICON_URL)
+    assert cached is not None and cached.etag == '"v1"' and cached.width != 10
+
+
+def test_offline_mode_trusts_cached_sizes(server: FakeServer, tmp_path: pathlib.Path) -> None:
+    config = _config(tmp_path)
+    config.giantswarm_icon_offline = True
+    IconSizeCache(config.cache_dir).put(ICON_URL, CachedIconSize(10, 100, 0.0))
+
+    assert not _validator().validate(config)
+    IconSizeCache(config.cache_dir).put(ICON_URL, CachedIconSize(100, 100, 0.0))
+    assert _validator().validate(config)
+    assert server.requests == []
+
+
+def test_offline_mode_skips_icons_never_checked(server: FakeServer, tmp_path: pathlib.Path) -> None:
+    config = _config(tmp_path)
+    config.giantswarm_icon_offline = True
+
+    assert _validator().validate(config)
+    assert server.requests == []
+
+
+def test_offline_mode_never_downloads_without_cache_dir(server: FakeServer, tmp_path: pathlib.Path) -> None:
+    config = _config(tmp_path, cache_dir="")
+    config.giantswarm_icon_offline = True
+
+    assert _validator().validate(config)
+    assert server.requests == []
+
+
+def test_nothing_is_cached_without_cache_dir(server: FakeServer, tmp_path: pathlib.Path) -> None:
+    config = _config(tmp_path, cache_dir="")
+
+    assert _validator().validate(config)
+    assert _validator().validate(config)
+    assert len(server.requests) == 2
+
+
+@pytest.mark.parametrize("send_length", [True, False], ids=["with Content-Length", "without Content-Length"])
+def test_icon_download_is_limited_in_size(mocker: MockerFixture, send_length: bool) -> None:
+    def urlopen_icon(*args: Any, **kwargs: Any) -> FakeResponse:
+        response = FakeResponse(b"x" * 100, '"v1"')
+        if send_length:
+            response.headers["Content-Length"] = "100"
+        return response
+
+    urlopen = mocker.patch.object(urllib.request, "urlopen", side_effect=urlopen_icon)
+
+    with pytest.raises(GiantSwarmValidatorError) as exc:
+        IconIsAlmostSquare().fetch_icon(ICON_URL, max_size=99, timeout=2.5)
+    assert "bigger than the maximum allowed size of 99 bytes" in exc.value.msg
+    assert urlopen.call_args.kwargs["timeout"] == 2.5
+
+    downloaded = IconIsAlmostSquare().fetch_icon(ICON_URL, max_size=100)
+    assert downloaded is not None and downloaded[0] == b"x" * 100
+
+
+def test_icon_download_timeout_fails_validation(mocker: MockerFixture) -> None:
+    mocker.patch.object(urllib.request, "urlopen", side_effect=TimeoutError("timed out"))
+
+    with pytest.raises(GiantSwarmValidatorError) as exc:
+        IconIsAlmostSquare().fetch_icon(ICON_URL)
+    assert exc.value.msg == f"Error fetching icon from '{ICON_URL}'. Error: timed out."
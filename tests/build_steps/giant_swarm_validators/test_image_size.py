@@ -0,0 +1,77 @@
+import io
+import pathlib
+from typing import Any, Dict, Optional
+
+import pytest
+from PIL import Image
+from pytest_mock import MockerFixture
+
+from app_build_suite.build_steps.giant_swarm_validators.icon import IconIsAlmostSquare
+from app_build_suite.build_steps.giant_swarm_validators.image_size import (
+    ImageSize,
+    probe_image_size,
+    probe_svg_size,
+)
+
+TEST_FILES = pathlib.Path(__file__).parent / "test_files"
+
+
+def _encode(image_format: str, mode: str = "RGB", size: ImageSize = (37, 21), **params: Any) -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, format=image_format, **params)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "image_format,mode,params",
+    [
+        ("PNG", "RGB", {}),
+        ("GIF", "P", {}),
+        ("JPEG", "RGB", {}),
+        ("JPEG", "RGB", {"progressive": True, "exif": b"Exif\x00\x00" + b"\x00" * 2000}),
+        ("WEBP", "RGB", {}),
+        ("WEBP", "RGB", {"lossless": True}),
+        ("WEBP", "RGBA", {"exif": b"Exif\x00\x00MM"}),
+    ],
+    ids=["png", "gif", "jpeg", "progressive jpeg with exif", "lossy webp", "lossless webp", "extended webp"],
+)
+def test_raster_image_size_is_read_from_header(image_format: str, mode: str, params: Dict[str, Any]) -> None:
+    data = _encode(image_format, mode, **params)
+
+    assert probe_image_size(data[:512] if image_format != "JPEG" else data) == (37, 21)
+
+
+@pytest.mark.parametrize(
+    "root,expected",
+    [
+        ('width="48" height="32"', (48, 32)),
+        ('width="48px" height="32px" viewBox="0 0 10 10"', (48, 32)),
+        ('width="100%" height="100%" viewBox="0 0 262.5 364"', (262, 364)),
+        ('width="2cm" height="30px" viewBox="0,0,20,30"', (20, 30)),
+        ('viewBox="-1 -2 0.4 0.6"', (1, 1)),
+        ('width="48"', None),
+    ],
+    ids=["width and height", "width and height over viewBox", "percentages", "mixed units", "tiny", "no size"],
+)
+def test_svg_size_is_read_from_root_element(root: str, expected: Optional[ImageSize]) -> None:
+    svg = f'<?xml version="1.0"?>\n<!-- icon -->\n<svg xmlns="http://www.w3.org/2000/svg" {root}><g>'
+
+    # the document doesn't have to be complete
+    assert probe_svg_size(svg.encode()) == expected
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"\x89PNG\r\n", b"GIF89a", b"\xff\xd8\xff\xe0\x00", b"RIFF\x00\x00\x00\x00WEBPVP8 ", b"<html></html>"],
+    ids=["empty", "truncated png", "truncated gif", "truncated jpeg", "truncated webp", "not an svg"],
+)
+def test_unknown_or_truncated_images_are_not_probed(data: bytes) -> None:
+    assert probe_image_size(data) is None
+
+
+def test_icon_validator_doesnt_rasterize_svg(mocker: MockerFixture) -> None:
+    validator = IconIsAlmostSquare()
+    convert = mocker.patch.object(validator, "convert_svg_to_png")
+
+    assert validator.get_icon_size(memoryview((TEST_FILES / "test_logo.svg").read_bytes())) == (530, 274)
+    convert.assert_not_called()
@@ -0,0 +1,87 @@
+import argparse
+from typing import Any, List
+
+import pytest
+from pytest_mock import MockerFixture
+from step_exec_lib.errors import ValidationError
+
+from app_build_suite.build_steps.giant_swarm_validators import registry
+from app_build_suite.build_steps.giant_swarm_validators.errors import GiantSwarmValidatorError
+from app_build_suite.build_steps.giant_swarm_validators.icon import IconExists
+from app_build_suite.build_steps.giant_swarm_validators.registry import ValidatorRegistry, validator_registry
+from app_build_suite.build_steps.giantswarm_helm_validator import GiantSwarmHelmValidator
+
+
+class PluginValidator:
+    def validate(self, config: argparse.Namespace) -> bool:
+        return True
+
+    def get_check_code(self) -> str:
+        return "X0001"
+
+
+class ClashingValidator(PluginValidator):
+    def get_check_code(self) -> str:
+        return "C0002"
+
+
+class FakeEntryPoint:
+    def __init__(self, loaded: Any) -> None:
+        self.name = "plugin"
+        self.value = "plugin:validator"
+        self._loaded = loaded
+
+    def load(self) -> Any:
+        if isinstance(self._loaded, Exception):
+            raise self._loaded
+        return self._loaded
+
+
+def _mock_entry_points(mocker: MockerFixture, loaded: List[Any]) -> None:
+    mocker.patch.object(registry, "entry_points", return_value=[FakeEntryPoint(item) for item in loaded])
+
+
+def test_builtin_validators_are_registered() -> None:
+    codes = [v.get_check_code() for v in validator_registry.create_validators()]
+
+    assert sorted(codes) == ["C0001", "C0002", "C0003", "C0004", "F0001"]
+    assert validator_registry.get("C0002") is IconExists
+
+
+def test_plugin_validators_are_loaded_once(mocker: MockerFixture) -> None:
+    _mock_entry_points(mocker, [PluginValidator])
+    plugins = ValidatorRegistry()
+
+    assert [type(v) for v in plugins.create_validators()] == [PluginValidator]
+    plugins.create_validators()
+    assert registry.entry_points.call_count == 1  # type: ignore[attr-defined]
+
+
+def test_duplicate_check_code_is_rejected() -> None:
+    plugins = ValidatorRegistry()
+    plugins.register(IconExists)
+    # registering the same class again is fine
+    plugins.register(IconExists)
+
+    with pytest.raises(GiantSwarmValidatorError) as exc:
+        plugins.register(ClashingValidator)
+    assert "check code 'C0002'" in exc.value.msg
+
+
+@pytest.mark.parametrize(
+    "loaded,error",
+    [
+        (ClashingValidator, "Found more than 1 Giant Swarm validator with check code 'C0002'"),
+        (ImportError("No module named 'plugin'"), "Can't load Giant Swarm validators: No module named 'plugin'"),
+    ],
+    ids=["clashing check code", "broken plugin"],
+)
+def test_step_fails_on_plugin_errors(mocker: MockerFixture, loaded: Any, error: str) -> None:
+    _mock_entry_points(mocker, [loaded])
+    plugins = ValidatorRegistry()
+    plugins.register(IconExists)
+    mocker.patch("app_build_suite.build_steps.giantswarm_helm_validator.validator_registry", plugins)
+
+    with pytest.raises(ValidationError) as exc:
+        GiantSwarmHelmValidator()._load_giant_swarm_validators()
+    assert exc.value.msg.startswith(error)
@@ -1,27 +1,41 @@
 import argparse
+import hashlib
 import os.path
+import pathlib
 import re
+import tarfile
+import threading
 from typing import Dict, Any, List
 from unittest.mock import mock_open, patch
 
 import yaml
 import pytest
 from pytest_mock import MockerFixture
-from step_exec_lib.errors import ValidationError
+from step_exec_lib.errors import ConfigError, ValidationError
 
 import app_build_suite
+from app_build_suite.build_steps.giant_swarm_validators.icon import IconDomainIsValid, IconExists
 from app_build_suite.build_steps.giantswarm_helm_validator import GiantSwarmHelmValidator
 from app_build_suite.build_steps.helm_builder_validator import HelmBuilderValidator
+from app_build_suite.build_steps.helm_chart_builder import HelmChartBuilder
 from app_build_suite.build_steps.helm_chart_metadata_builder import HelmChartMetadataBuilder
 from app_build_suite.build_steps.helm_chart_metadata_finalizer import HelmChartMetadataFinalizer
 from app_build_suite.build_steps.helm_consts import (
+    CHART_YAML,
     context_key_changes_made,
+    context_key_chart_digest,
     context_key_chart_file_name,
+    context_key_chart_files,
     context_key_chart_full_path,
+    context_key_chart_size,
     context_key_chart_yaml,
     context_key_meta_dir_path,
     context_key_original_chart_yaml,
+    VALUES_YAML,
 )
+from app_build_suite.errors import BuildError
+from app_build_suite.utils.chart_inventory import ChartInventory
+from app_build_suite.utils.document_store import document_store
 from tests.build_steps.helpers import init_config_for_step
 
 
@@ -39,9 +53,10 @@ def test_prepare_metadata(monkeypatch: pytest.MonkeyPatch) -> None:
     chart_yaml_data = yaml.safe_load(input_chart_yaml)
 
     # run pre_run
-    with patch(
-        "app_build_suite.build_steps.helm_chart_metadata_builder.open", mock_open(read_data=input_chart_yaml)
-    ) as m:
+    document_store.clear()
+    with patch("app_build_suite.utils.document_store.open", mock_open(read_data=input_chart_yaml)) as m:
+        step.pre_run(config)
+        # the second read is served from the parsed document store
         step.pre_run(config)
         m.assert_called_once_with(input_chart_path, "r")
 
@@ -90,7 +105,7 @@ def test_prepare_metadata(monkeypatch: pytest.MonkeyPatch) -> None:
                 == chart_yaml_data["upstreamChartVersion"]
             )
 
-        monkeypatch.setattr("app_build_suite.build_steps.helm_chart_metadata_builder.os.path.isfile", lambda _: True)
+        monkeypatch.setattr(ChartInventory, "is_file", lambda *_: True)
         monkeypatch.setattr("app_build_suite.build_steps.helm_chart_metadata_builder.os.path.abspath", os.path.abspath)
         monkeypatch.setattr(
             app_build_suite.build_steps.helm.HelmChartMetadataBuilder,  # type: ignore[attr-defined]
@@ -149,7 +164,7 @@ def test_generate_metadata(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(
         app_build_suite.build_steps.helm.HelmChartMetadataFinalizer,  # type: ignore[attr-defined]
         "get_build_timestamp",
-        lambda _: "1020-10-20T10:20:10.000000",
+        lambda *_: "1020-10-20T10:20:10.000000",
     )
     step.pre_run(config)
     step.run(config, context)
@@ -160,6 +175,7 @@ def test_format_timestamp_to_match_helms() -> None:
     ts_str = HelmChartMetadataFinalizer.get_build_timestamp()
     ts_regex = re.compile("^[0-9]{4}-(1[0-2]|0[1-9])-[0-3][0-9]T[0-2][0-9]:[0-5][0-9]:[0-5][0-9](.[0-9]+)?Z?$")
     assert ts_regex.fullmatch(ts_str)
+    assert HelmChartMetadataFinalizer.get_build_timestamp(1700000000) == "2023-11-14T22:13:20.000000Z"
 
 
 class GiantSwarmTestValidator:
@@ -281,7 +297,7 @@ def test_annotation_conversion_new_to_oci_format(
             assert "application.giantswarm.io/values-schema" not in annotations
             assert "application.giantswarm.io/readme" not in annotations
 
-        monkeypatch.setattr("app_build_suite.build_steps.helm_chart_metadata_builder.os.path.isfile", lambda _: False)
+        monkeypatch.setattr(ChartInventory, "is_file", lambda *_: False)
         monkeypatch.setattr(
             app_build_suite.build_steps.helm.HelmChartMetadataBuilder,  # type: ignore[attr-defined]
             "write_chart_yaml",
@@ -331,7 +347,7 @@ def test_annotation_conversion_with_restrictions(
             assert "io.giantswarm.application.restrictions.fixed-namespace" in annotations
             assert annotations["io.giantswarm.application.restrictions.fixed-namespace"] == "test-namespace"
 
-        monkeypatch.setattr("app_build_suite.build_steps.helm_chart_metadata_builder.os.path.isfile", lambda _: False)
+        monkeypatch.setattr(ChartInventory, "is_file", lambda *_: False)
         monkeypatch.setattr(
             app_build_suite.build_steps.helm.HelmChartMetadataBuilder,  # type: ignore[attr-defined]
             "write_chart_yaml",
@@ -399,7 +415,7 @@ def test_annotation_conversion_mixed_formats(monkeypatch: pytest.MonkeyPatch) ->
             assert "other.annotation/key" in annotations
             assert annotations["other.annotation/key"] == "other-value"
 
-        monkeypatch.setattr("app_build_suite.build_steps.helm_chart_metadata_builder.os.path.isfile", lambda _: False)
+        monkeypatch.setattr(ChartInventory, "is_file", lambda *_: False)
         monkeypatch.setattr(
             app_build_suite.build_steps.helm.HelmChartMetadataBuilder,  # type: ignore[attr-defined]
             "write_chart_yaml",
@@ -443,7 +459,7 @@ def test_annotation_conversion_preserves_values(
             # Verify the value is preserved exactly
             assert annotations["io.giantswarm.application.values-schema"] == test_value
 
-        monkeypatch.setattr("app_build_suite.build_steps.helm_chart_metadata_builder.os.path.isfile", lambda _: False)
+        monkeypatch.setattr(ChartInventory, "is_file", lambda *_: False)
         monkeypatch.setattr(
             app_build_suite.build_steps.helm.HelmChartMetadataBuilder,  # type: ignore[attr-defined]
             "write_chart_yaml",
@@ -488,7 +504,7 @@ def test_annotation_conversion_no_annotations(monkeypatch: pytest.MonkeyPatch) -
                 == "https://some-bogus-catalog/test-app-v1.0.0.tgz-meta/main.yaml"
             )
 
-        monkeypatch.setattr("app_build_suite.build_steps.helm_chart_metadata_builder.os.path.isfile", lambda _: False)
+        monkeypatch.setattr(ChartInventory, "is_file", lambda *_: False)
         monkeypatch.setattr(
             app_build_suite.build_steps.helm.HelmChartMetadataBuilder,  # type: ignore[attr-defined]
             "write_chart_yaml",
@@ -531,7 +547,7 @@ def test_annotation_conversion_empty_annotations(
             # Verify metadata annotation is generated
             assert "io.giantswarm.application.metadata" in annotations
 
-        monkeypatch.setattr("app_build_suite.build_steps.helm_chart_metadata_builder.os.path.isfile", lambda _: False)
+        monkeypatch.setattr(ChartInventory, "is_file", lambda *_: False)
         monkeypatch.setattr(
             app_build_suite.build_steps.helm.HelmChartMetadataBuilder,  # type: ignore[attr-defined]
             "write_chart_yaml",
@@ -585,7 +601,7 @@ def test_metadata_finalizer_no_annotations(monkeypatch: pytest.MonkeyPatch) -> N
     monkeypatch.setattr(
         app_build_suite.build_steps.helm.HelmChartMetadataFinalizer,  # type: ignore[attr-defined]
         "get_build_timestamp",
-        lambda _: "1020-10-20T10:20:10.000000",
+        lambda *_: "1020-10-20T10:20:10.000000",
     )
     monkeypatch.setattr("app_build_suite.build_steps.helm_chart_metadata_finalizer.os.path.isfile", lambda _: False)
     monkeypatch.setattr("app_build_suite.build_steps.helm_chart_metadata_finalizer.shutil.copy2", lambda _, __: None)
@@ -619,6 +635,11 @@ def test_build_github_annotation_url_with_tag_version(
     assert url == expected_url
 
 
+def _write_chart_files(chart_dir: pathlib.Path, chart_yaml_content: str) -> None:
+    (chart_dir / CHART_YAML).write_text(chart_yaml_content, encoding="utf-8")
+    (chart_dir / VALUES_YAML).write_text("{}\n")
+
+
 @pytest.mark.parametrize(
     "chart_name,should_pass",
     [
@@ -687,17 +708,14 @@ def test_build_github_annotation_url_with_tag_version(
 def test_helm_builder_validator_rfc1123_chart_name(
     chart_name: str,
     should_pass: bool,
-    mocker: MockerFixture,
+    tmp_path: pathlib.Path,
 ) -> None:
     """Test that HelmBuilderValidator validates chart names against RFC 1123."""
     step = HelmBuilderValidator()
     config = init_config_for_step(step)
-    config.chart_dir = "/fake/chart/dir"
-
-    chart_yaml_content = f"name: {chart_name}\nversion: 1.0.0"
+    config.chart_dir = str(tmp_path)
 
-    mocker.patch("os.path.exists", return_value=True)
-    mocker.patch("builtins.open", mock_open(read_data=chart_yaml_content))
+    _write_chart_files(tmp_path, f"name: {chart_name}\nversion: 1.0.0")
 
     if should_pass:
         step.pre_run(config)  # Should not raise
@@ -707,38 +725,131 @@ def test_helm_builder_validator_rfc1123_chart_name(
         assert "RFC 1123" in exc_info.value.msg
 
 
-def test_helm_builder_validator_missing_name(mocker: MockerFixture) -> None:
+def test_helm_builder_validator_missing_name(tmp_path: pathlib.Path) -> None:
     """Test that HelmBuilderValidator raises error when name is missing."""
     step = HelmBuilderValidator()
     config = init_config_for_step(step)
-    config.chart_dir = "/fake/chart/dir"
+    config.chart_dir = str(tmp_path)
 
-    chart_yaml_content = "version: 1.0.0"
-
-    mocker.patch("os.path.exists", return_value=True)
-    mocker.patch("builtins.open", mock_open(read_data=chart_yaml_content))
+    _write_chart_files(tmp_path, "version: 1.0.0")
 
     with pytest.raises(ValidationError) as exc_info:
         step.pre_run(config)
     assert "missing required field 'name'" in exc_info.value.msg
 
 
-def test_helm_builder_validator_empty_name(mocker: MockerFixture) -> None:
+def test_helm_builder_validator_empty_name(tmp_path: pathlib.Path) -> None:
     """Test that HelmBuilderValidator raises error when name is empty."""
     step = HelmBuilderValidator()
     config = init_config_for_step(step)
-    config.chart_dir = "/fake/chart/dir"
-
-    chart_yaml_content = "name: \nversion: 1.0.0"
+    config.chart_dir = str(tmp_path)
 
-    mocker.patch("os.path.exists", return_value=True)
-    mocker.patch("builtins.open", mock_open(read_data=chart_yaml_content))
+    _write_chart_files(tmp_path, "name: \nversion: 1.0.0")
 
     with pytest.raises(ValidationError) as exc_info:
         step.pre_run(config)
     assert "field 'name' is empty" in exc_info.value.msg
 
 
+def test_helm_chart_builder_packages_chart_natively(tmp_path: pathlib.Path) -> None:
+    step = HelmChartBuilder()
+    config = init_config_for_step(step)
+    config.chart_dir = str(tmp_path / "chart")
+    config.destination = str(tmp_path / "out")
+    (tmp_path / "chart").mkdir()
+    _write_chart_files(tmp_path / "chart", "name: app\nversion: 1.0.0")
+    config.build_cache = True
+    config.cache_dir = str(tmp_path / "cache")
+    chart_path = str(tmp_path / "out" / "app-1.0.0.tgz")
+    context = {context_key_chart_file_name: "app-1.0.0.tgz", context_key_chart_full_path: chart_path}
+
+    step.pre_run(config)
+    step.run(config, context)
+
+    with open(chart_path, "rb") as f:
+        assert context[context_key_chart_digest] == hashlib.sha256(f.read()).hexdigest()
+    assert context[context_key_chart_size] == os.path.getsize(chart_path)
+    assert context[context_key_chart_files] == ["app/Chart.yaml", "app/values.yaml"]
+
+    # a chart restored from the build cache comes with the digest computed when it was packaged
+    os.remove(chart_path)
+    restored_context = {context_key_chart_file_name: "app-1.0.0.tgz", context_key_chart_full_path: chart_path}
+    step.run(config, restored_context)
+    assert os.path.isfile(chart_path)
+    assert restored_context == context
+
+
+def test_helm_chart_builder_builds_reproducible_archives(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch, mocker: MockerFixture
+) -> None:
+    step = HelmChartBuilder()
+    config = init_config_for_step(step)
+    config.chart_dir = str(tmp_path / "chart")
+    (tmp_path / "chart").mkdir()
+    _write_chart_files(tmp_path / "chart", "name: app\nversion: 1.0.0")
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    time_mock = mocker.patch("app_build_suite.utils.chart_packager.time.time")
+
+    digests = []
+    for now in (1800000000, 1900000000):
+        time_mock.return_value = now
+        config.destination = str(tmp_path / str(now))
+        context: Dict[str, Any] = {}
+        step.run(config, context)
+        digests.append(context[context_key_chart_digest])
+
+    assert digests[0] == digests[1]
+    with tarfile.open(tmp_path / "1800000000" / "app-1.0.0.tgz") as tar:
+        assert {m.mtime for m in tar} == {1700000000}
+
+
+def test_helm_chart_builder_rejects_reproducible_builds_with_helm(monkeypatch: pytest.MonkeyPatch) -> None:
+    step = HelmChartBuilder()
+    config = init_config_for_step(step)
+    config.chart_packager = "helm"
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+
+    with pytest.raises(ConfigError):
+        step.pre_run(config)
+
+
+def test_helm_chart_builder_allows_helm_with_no_reproducible(
+    monkeypatch: pytest.MonkeyPatch, mocker: MockerFixture
+) -> None:
+    mocker.patch("app_build_suite.build_steps.helm_chart_builder.get_tool_version", return_value="v3.21.2")
+    step = HelmChartBuilder()
+    config = init_config_for_step(step)
+    config.chart_packager = "helm"
+    config.reproducible = False
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+
+    step.pre_run(config)
+
+
+@pytest.mark.parametrize(
+    "option,value", [("chart_compress_level", 0), ("chart_compress_level", 10), ("chart_compress_threads", -1)]
+)
+def test_helm_chart_builder_rejects_invalid_compression_options(option: str, value: int) -> None:
+    step = HelmChartBuilder()
+    config = init_config_for_step(step)
+    setattr(config, option, value)
+
+    with pytest.raises(ConfigError):
+        step.pre_run(config)
+
+
+def test_helm_chart_builder_fails_on_unexpected_chart_path(tmp_path: pathlib.Path) -> None:
+    step = HelmChartBuilder()
+    config = init_config_for_step(step)
+    config.chart_dir = str(tmp_path)
+    config.destination = str(tmp_path / "out")
+    _write_chart_files(tmp_path, "name: app\nversion: 1.0.1")
+
+    with pytest.raises(BuildError) as exc_info:
+        step.run(config, {context_key_chart_file_name: "app-1.0.0.tgz"})
+    assert exc_info.value.msg == "unexpected chart path 'app-1.0.1.tgz' != 'app-1.0.0.tgz'"
+
+
 def test_giant_swarm_validator_collects_all_failures(mocker: MockerFixture) -> None:
     validators = [
         GiantSwarmTestValidator(False, "W1"),
@@ -780,3 +891,71 @@ def test_giant_swarm_validator_fails_fast_when_keep_going_disabled(mocker: Mocke
 
     assert "W1" in exc.value.msg
     assert not validators[1].validate_called
+
+
+class SlowGiantSwarmTestValidator(GiantSwarmTestValidator):
+    io_bound = True
+
+    def __init__(self, check_code: str, released: threading.Event) -> None:
+        super().__init__(True, check_code)
+        self.released = released
+        self.thread_name = ""
+
+    def validate(self, config: argparse.Namespace) -> bool:
+        self.thread_name = threading.current_thread().name
+        # passes only if the other validators run while this one waits
+        return self.released.wait(timeout=5)
+
+
+class ReleasingGiantSwarmTestValidator(GiantSwarmTestValidator):
+    def __init__(self, valid: bool, check_code: str, released: threading.Event) -> None:
+        super().__init__(valid, check_code)
+        self.released = released
+
+    def validate(self, config: argparse.Namespace) -> bool:
+        self.released.set()
+        return super().validate(config)
+
+
+def test_giant_swarm_validator_runs_io_bound_validators_concurrently(mocker: MockerFixture) -> None:
+    released = threading.Event()
+    slow = SlowGiantSwarmTestValidator("W1", released)
+    validators = [
+        ReleasingGiantSwarmTestValidator(False, "W3", released),
+        GiantSwarmTestValidator(False, "W2"),
+        slow,
+    ]
+    step = GiantSwarmHelmValidator()
+    config = init_config_for_step(step)
+    config.disable_strict_giantswarm_validator = False
+    config.giantswarm_validator_ignored_checks = ""
+    mocker.patch.object(step, "_load_giant_swarm_validators", return_value=validators)
+
+    with pytest.raises(ValidationError) as exc:
+        step.pre_run(config)
+
+    assert slow.thread_name.startswith("gs-validator")
+    # failures are reported in check-code order
+    assert exc.value.msg.splitlines() == [
+        "Giant Swarm validator 'W2: GiantSwarmTestValidator' failed its checks.",
+        "Giant Swarm validator 'W3: ReleasingGiantSwarmTestValidator' failed its checks.",
+    ]
+
+
+def test_giant_swarm_validators_share_chart_snapshot(mocker: MockerFixture, tmp_path: pathlib.Path) -> None:
+    _write_chart_files(tmp_path, "name: app\nversion: 1.0.0\nicon: ''\nannotations:\n  a: b\n")
+    validators = [IconExists(), IconDomainIsValid()]
+    step = GiantSwarmHelmValidator()
+    config = init_config_for_step(step)
+    config.chart_dir = str(tmp_path)
+    config.disable_strict_giantswarm_validator = True
+    mocker.patch.object(step, "_load_giant_swarm_validators", return_value=validators)
+
+    step.pre_run(config)
+
+    snapshot = validators[0].chart_snapshot
+    assert snapshot is not None and validators[1].chart_snapshot is snapshot
+    chart_yaml = validators[0].get_chart_yaml(config)
+    assert chart_yaml["annotations"]["a"] == "b"
+    with pytest.raises(TypeError):
+        chart_yaml["annotations"]["a"] = "c"  # type: ignore[index]
@@ -1,13 +1,19 @@
 """Tests for HelmArtifactHubMetadataSetter build step."""
 
+import io
+import tarfile
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
 import configargparse
+import pytest
 import yaml
 
+from app_build_suite.build_steps.chart_yaml_loader import ChartYamlLoader
 from app_build_suite.build_steps.chart_yaml_writer import ChartYamlWriter
 from app_build_suite.build_steps.helm_artifacthub_metadata_setter import HelmArtifactHubMetadataSetter
+from app_build_suite.build_steps.helm_builder_validator import HelmBuilderValidator
+from app_build_suite.build_steps.helm_chart_builder import HelmChartBuilder
 from app_build_suite.build_steps.helm_chart_yaml_restorer import HelmChartYAMLRestorer
 from app_build_suite.build_steps.helm_consts import (
     BlockLiteralStr,
@@ -15,6 +21,7 @@ from app_build_suite.build_steps.helm_consts import (
     context_key_changes_made,
     context_key_chart_yaml,
 )
+from app_build_suite.utils.chart_inventory import chart_inventory_store
 from tests.build_steps.helpers import init_config_for_step
 
 APACHE_2_LICENSE_TEXT = """
@@ -328,3 +335,84 @@ def test_writer_block_scalars_only_the_links_annotation(tmp_path: Path) -> None:
     assert "artifacthub.io/links: |" in raw
     assert "description: |" not in raw
     assert yaml.safe_load(raw)["description"] == "line one\nline two"
+
+
+def _package_with_pipeline(tmp_path: Path, chart_dir: Path, max_parallel_steps: int = 1) -> Path:
+    """Runs the steps changing the chart and packaging it; returns the path of the packaged chart."""
+    from app_build_suite.build_steps.helm import HelmBuildFilteringPipeline
+
+    pipeline = HelmBuildFilteringPipeline()
+    # the inventory is scanned by HelmBuilderValidator in 'pre_run', before the README is copied
+    pipeline._pipeline = [
+        ChartYamlLoader(),
+        HelmBuilderValidator(),
+        HelmArtifactHubMetadataSetter(),
+        ChartYamlWriter(),
+        HelmChartBuilder(),
+        HelmChartYAMLRestorer(),
+    ]
+    config = init_config_for_step(pipeline)
+    config.chart_dir = str(chart_dir)
+    config.destination = str(tmp_path / "out")
+    config.max_parallel_steps = max_parallel_steps
+    context: Dict[str, Any] = {}
+
+    pipeline.pre_run(config)
+    pipeline.run(config, context)
+    pipeline.cleanup(config, context, False)
+    return (
+        tmp_path / "out" / f"{context[context_key_chart_yaml]['name']}-{context[context_key_chart_yaml]['version']}.tgz"
+    )
+
+
+@pytest.mark.parametrize("max_parallel_steps", [1, 2])
+def test_copied_readme_is_packaged(tmp_path: Path, max_parallel_steps: int) -> None:
+    """The inventory the native packager uses is refreshed after the README is copied into the chart."""
+    chart_dir = _make_repo(tmp_path, root_readme="# root readme")
+    (chart_dir / "Chart.yaml").write_text("apiVersion: v2\nname: test-app\nversion: 0.0.1\n")
+    (chart_dir / "values.yaml").write_text("replicas: 1\n")
+
+    chart_path = _package_with_pipeline(tmp_path, chart_dir, max_parallel_steps)
+
+    with tarfile.open(chart_path) as tar:
+        assert tar.extractfile("test-app/README.md").read() == b"# root readme"  # type: ignore[union-attr]
+    assert not (chart_dir / "README.md").exists()
+    assert chart_inventory_store.get(str(chart_dir)).get("README.md") is None
+
+
+def test_packaged_chart_has_helms_layout(tmp_path: Path) -> None:
+    """The native packager is the default, so what the build adds to the chart has to end up where helm puts it."""
+    chart_dir = _make_repo(tmp_path, root_readme="# root readme")
+    (chart_dir / "Chart.yaml").write_text(
+        "apiVersion: v2\nname: test-app\nversion: 0.0.1\n"
+        "dependencies:\n- name: dep\n  version: 1.0.0\n  repository: https://example.com/charts\n"
+    )
+    (chart_dir / "values.yaml").write_text("replicas: 1\n")
+    (chart_dir / ".helmignore").write_text("ci/\n*.bak\n")
+    (chart_dir / "ci").mkdir()
+    (chart_dir / "ci" / "ci-values.yaml").write_text("a: b\n")
+    (chart_dir / "templates").mkdir()
+    (chart_dir / "templates" / "cm.yaml").write_text("kind: ConfigMap\n")
+    (chart_dir / "templates" / "old.bak").write_text("")
+    (chart_dir / "charts").mkdir()
+    with tarfile.open(chart_dir / "charts" / "dep-1.0.0.tgz", "w:gz") as tar:
+        for name, content in {"dep/Chart.yaml": b"name: dep\nversion: 1.0.0\n", "dep/values.yaml": b"{}\n"}.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+    chart_path = _package_with_pipeline(tmp_path, chart_dir)
+
+    with tarfile.open(chart_path) as tar:
+        members = tar.getmembers()
+    # the order of 'helm package': chart metadata, values, templates, other files, then the subcharts
+    assert [m.name for m in members] == [
+        "test-app/Chart.yaml",
+        "test-app/values.yaml",
+        "test-app/templates/cm.yaml",
+        "test-app/.helmignore",
+        "test-app/README.md",
+        "test-app/charts/dep/Chart.yaml",
+        "test-app/charts/dep/values.yaml",
+    ]
+    assert all(m.isfile() and m.mode == 0o644 for m in members)
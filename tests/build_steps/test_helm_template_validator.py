@@ -1,13 +1,18 @@
 import os
+import subprocess
+import tempfile
+import threading
 import unittest.mock
 from pathlib import Path
-from typing import cast
+from typing import Callable, Dict, List, cast
 
+import configargparse
 import pytest
 from pytest_mock import MockerFixture
-from step_exec_lib.errors import ValidationError
+from step_exec_lib.errors import ConfigError, ValidationError
 
 from app_build_suite.build_steps import helm_template_validator
+from app_build_suite.build_steps.helm_consts import context_key_rendered_manifests_dir
 from app_build_suite.build_steps.helm_template_validator import HelmTemplateValidator
 from app_build_suite.errors import BuildError
 from tests.build_steps.helpers import init_config_for_step
@@ -94,24 +99,38 @@ metadata:
 """
 
 
-def _run_validator(mocker: MockerFixture, stdout: str, returncode: int = 0) -> unittest.mock.Mock:
-    run_res = mocker.Mock(name="RunResult")
-    run_res.returncode = returncode
-    run_res.stdout = stdout
-    run_res.stderr = "some helm error" if returncode != 0 else ""
-    run_and_log = mocker.patch(
-        "app_build_suite.build_steps.helm_template_validator.run_and_log",
-        return_value=run_res,
+@pytest.fixture(autouse=True)
+def _rendered_manifests_in_tmp_path(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Keeps the directories with rendered manifests created by the step out of the system temp dir."""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+
+def _mock_helm(mocker: MockerFixture, stdout: str, returncode: int = 0, stderr: str = "") -> unittest.mock.Mock:
+    """Mocks the streamed 'helm template' run, feeding 'stdout' to the step line by line."""
+
+    def stream(args: List[str], on_stdout_line: Callable[[str], None]) -> subprocess.CompletedProcess:
+        for line in stdout.splitlines(keepends=True):
+            on_stdout_line(line)
+        return subprocess.CompletedProcess(args, returncode, None, stderr)
+
+    return mocker.patch(
+        "app_build_suite.build_steps.helm_template_validator.stream_and_log",
+        side_effect=stream,
     )
+
+
+def _run_validator(mocker: MockerFixture, stdout: str, returncode: int = 0, workers: int = 1) -> unittest.mock.Mock:
+    stream_and_log = _mock_helm(mocker, stdout, returncode, "some helm error" if returncode != 0 else "")
     step = HelmTemplateValidator()
     config = init_config_for_step(step)
+    config.helm_template_validation_workers = workers
     step.run(config, {})
-    return run_and_log
+    return stream_and_log
 
 
 def test_valid_rendered_chart_passes(mocker: MockerFixture) -> None:
-    run_and_log = _run_validator(mocker, RENDERED_OK)
-    args = run_and_log.call_args.args[0]
+    stream_and_log = _run_validator(mocker, RENDERED_OK)
+    args = stream_and_log.call_args.args[0]
     assert args[:3] == ["helm", "template", "abs-validation"]
     assert "--include-crds" in args
 
@@ -119,8 +138,8 @@ def test_valid_rendered_chart_passes(mocker: MockerFixture) -> None:
 def test_rendered_chart_with_yaml_11_tags_passes(mocker: MockerFixture) -> None:
     """A bare '=' scalar and a '<<' merge key are both accepted by Kubernetes, so neither
     may fail the step."""
-    run_and_log = _run_validator(mocker, RENDERED_YAML_11_TAGS)
-    assert "--include-crds" in run_and_log.call_args.args[0]
+    stream_and_log = _run_validator(mocker, RENDERED_YAML_11_TAGS)
+    assert "--include-crds" in stream_and_log.call_args.args[0]
 
 
 def test_duplicate_key_is_still_attributed_when_value_tag_present(mocker: MockerFixture) -> None:
@@ -139,6 +158,33 @@ def test_duplicate_key_in_rendered_chart_fails(mocker: MockerFixture) -> None:
     assert "duplicate key 'labels'" in excinfo.value.msg
 
 
+def test_error_line_is_relative_to_the_whole_output(mocker: MockerFixture) -> None:
+    """Documents are validated one by one, but reported lines must still match 'helm template' output."""
+    with pytest.raises(BuildError) as excinfo:
+        _run_validator(mocker, RENDERED_OK + RENDERED_DUPLICATE_KEY)
+    rendered_lines = (RENDERED_OK + RENDERED_DUPLICATE_KEY).splitlines()
+    duplicate_line = len(rendered_lines) - rendered_lines[::-1].index("  labels:")
+    assert f"duplicate key 'labels' at line {duplicate_line}," in excinfo.value.msg
+    assert "my-app/templates/deployment.yaml" in excinfo.value.msg
+
+
+def test_invalid_document_stops_reading_the_output(mocker: MockerFixture) -> None:
+    fed: List[str] = []
+
+    def stream(args: List[str], on_stdout_line: Callable[[str], None]) -> subprocess.CompletedProcess:
+        for line in (RENDERED_DUPLICATE_KEY + RENDERED_OK).splitlines(keepends=True):
+            fed.append(line)
+            on_stdout_line(line)
+        return subprocess.CompletedProcess(args, 0, None, "")
+
+    mocker.patch("app_build_suite.build_steps.helm_template_validator.stream_and_log", side_effect=stream)
+    step = HelmTemplateValidator()
+    with pytest.raises(BuildError):
+        step.run(init_config_for_step(step), {})
+    # the error is raised as soon as the next document starts, the rest is never read
+    assert "# Source: my-app/templates/service.yaml\n" not in fed
+
+
 def test_syntax_error_in_rendered_chart_fails(mocker: MockerFixture) -> None:
     with pytest.raises(BuildError) as excinfo:
         _run_validator(mocker, RENDERED_SYNTAX_ERROR)
@@ -146,6 +192,57 @@ def test_syntax_error_in_rendered_chart_fails(mocker: MockerFixture) -> None:
     assert "my-app/templates/broken.yaml" in excinfo.value.msg
 
 
+def _rendered_config_maps(count: int) -> str:
+    return "".join(
+        f"---\n# Source: my-app/templates/cm-{i}.yaml\nkind: ConfigMap\nmetadata:\n  name: cm-{i}\n"
+        for i in range(count)
+    )
+
+
+def test_parallel_validation_passes(mocker: MockerFixture) -> None:
+    mocker.patch.object(helm_template_validator, "_BATCH_SIZE", 200)
+    info = mocker.spy(helm_template_validator.logger, "info")
+    _run_validator(mocker, _rendered_config_maps(50), workers=2)
+    assert any("(50 documents," in str(c.args[0]) for c in info.call_args_list)
+
+
+def test_parallel_validation_reports_the_first_error_in_output_order(mocker: MockerFixture) -> None:
+    mocker.patch.object(helm_template_validator, "_BATCH_SIZE", 200)
+    rendered = _rendered_config_maps(20) + RENDERED_DUPLICATE_KEY + _rendered_config_maps(20) + RENDERED_SYNTAX_ERROR
+    with pytest.raises(BuildError) as excinfo:
+        _run_validator(mocker, rendered, workers=4)
+    assert "Duplicate YAML key" in excinfo.value.msg
+    assert "my-app/templates/deployment.yaml" in excinfo.value.msg
+    # the duplicate 'labels:' is right above 'team: my-team', so its 1-based number is that line's index
+    duplicate_line = rendered.splitlines().index("    team: my-team")
+    assert f"at line {duplicate_line}," in excinfo.value.msg
+
+
+def test_invalid_number_of_workers_fails_pre_run(mocker: MockerFixture) -> None:
+    step = HelmTemplateValidator()
+    config = init_config_for_step(step)
+    config.helm_template_validation_workers = 0
+    with pytest.raises(ConfigError):
+        step.pre_run(config)
+
+
+def test_rendered_manifests_are_shared_in_context(mocker: MockerFixture) -> None:
+    _mock_helm(mocker, RENDERED_OK + RENDERED_OK.replace("my-app/templates/service.yaml", "sub/templates/svc.yaml"))
+    step = HelmTemplateValidator()
+    config = init_config_for_step(step)
+    context: dict = {}
+    step.run(config, context)
+
+    rendered_dir = Path(context[context_key_rendered_manifests_dir])
+    deployment = (rendered_dir / "my-app" / "templates" / "deployment.yaml").read_text()
+    assert deployment.count("kind: Deployment") == 2
+    assert (rendered_dir / "my-app" / "templates" / "service.yaml").is_file()
+    assert (rendered_dir / "sub" / "templates" / "svc.yaml").is_file()
+
+    step.cleanup(config, context, False)
+    assert not rendered_dir.exists()
+
+
 def test_failed_helm_template_run_fails(mocker: MockerFixture) -> None:
     with pytest.raises(BuildError) as excinfo:
         _run_validator(mocker, "", returncode=1)
@@ -154,14 +251,7 @@ def test_failed_helm_template_run_fails(mocker: MockerFixture) -> None:
 
 def _fail_render_in(mocker: MockerFixture, chart_dir: Path) -> list:
     """Runs the step against a real chart dir with a failing `helm template`; returns logged errors."""
-    run_res = mocker.Mock(name="RunResult")
-    run_res.returncode = 1
-    run_res.stdout = ""
-    run_res.stderr = "Error: some chart-specific failure"
-    mocker.patch(
-        "app_build_suite.build_steps.helm_template_validator.run_and_log",
-        return_value=run_res,
-    )
+    _mock_helm(mocker, "", 1, "Error: some chart-specific failure")
     logged: list = []
     mocker.patch.object(
         helm_template_validator.logger, "error", side_effect=lambda msg, *a, **k: logged.append(str(msg))
@@ -204,138 +294,201 @@ def test_lookup_never_causes_a_skip(mocker: MockerFixture, tmp_path: Path) -> No
     validation the way `type: library` does — it only changes the hint on failure."""
     (tmp_path / "templates").mkdir()
     (tmp_path / "templates" / "_helpers.tpl").write_text('{{ lookup "v1" "ConfigMap" "ns" "n" }}\n')
-    run_res = mocker.Mock(name="RunResult")
-    run_res.returncode = 0
-    run_res.stdout = RENDERED_OK
-    run_res.stderr = ""
-    run_and_log = mocker.patch(
-        "app_build_suite.build_steps.helm_template_validator.run_and_log",
-        return_value=run_res,
-    )
+    stream_and_log = _mock_helm(mocker, RENDERED_OK)
     step = HelmTemplateValidator()
     config = init_config_for_step(step)
     config.chart_dir = str(tmp_path)
     step.run(config, {})
-    run_and_log.assert_called_once()
+    stream_and_log.assert_called_once()
 
 
 def test_disabled_validator_skips_run(mocker: MockerFixture) -> None:
-    run_and_log = mocker.patch("app_build_suite.build_steps.helm_template_validator.run_and_log")
+    stream_and_log = mocker.patch("app_build_suite.build_steps.helm_template_validator.stream_and_log")
     step = HelmTemplateValidator()
     config = init_config_for_step(step)
     config.disable_helm_template_validator = True
     step.pre_run(config)
     step.run(config, {})
-    run_and_log.assert_not_called()
+    stream_and_log.assert_not_called()
 
 
 def test_extra_values_files_are_passed_to_helm(mocker: MockerFixture) -> None:
-    run_res = mocker.Mock(name="RunResult")
-    run_res.returncode = 0
-    run_res.stdout = RENDERED_OK
-    run_and_log = mocker.patch(
-        "app_build_suite.build_steps.helm_template_validator.run_and_log",
-        return_value=run_res,
-    )
+    stream_and_log = _mock_helm(mocker, RENDERED_OK)
     mocker.patch("os.path.isfile", return_value=True)
+    mocker.patch("app_build_suite.build_steps.helm_template_validator.get_tool_version", return_value="v3.21.2")
     step = HelmTemplateValidator()
-    mocker.patch.object(step, "_assert_binary_present_in_path")
-    mocker.patch.object(step, "_assert_version_in_range")
     config = init_config_for_step(step)
     config.helm_template_extra_values = ["extra-values.yaml"]
-    run_res.stdout = 'version.BuildInfo{Version:"v3.21.2"}'
     step.pre_run(config)
-    run_res.stdout = RENDERED_OK
     step.run(config, {})
 
     expected_path = os.path.join(os.getcwd(), "extra-values.yaml")
     assert config.helm_template_extra_values == [expected_path]
-    args = run_and_log.call_args.args[0]
+    args = stream_and_log.call_args.args[0]
     values_idx = args.index("--values")
     assert args[values_idx + 1] == expected_path
 
 
 def test_missing_extra_values_file_fails_pre_run(mocker: MockerFixture) -> None:
-    run_res = mocker.Mock(name="RunResult")
-    run_res.returncode = 0
-    run_res.stdout = 'version.BuildInfo{Version:"v3.21.2"}'
-    mocker.patch(
-        "app_build_suite.build_steps.helm_template_validator.run_and_log",
-        return_value=run_res,
-    )
+    mocker.patch("app_build_suite.build_steps.helm_template_validator.get_tool_version", return_value="v3.21.2")
     step = HelmTemplateValidator()
-    mocker.patch.object(step, "_assert_binary_present_in_path")
-    mocker.patch.object(step, "_assert_version_in_range")
     config = init_config_for_step(step)
     config.helm_template_extra_values = ["/nonexisting-fhtagn42/values.yaml"]
-    with pytest.raises(ValidationError):
+    with pytest.raises(ValidationError) as excinfo:
         step.pre_run(config)
+    assert "doesn't exist" in excinfo.value.msg
 
 
-def _run_with_context(mocker: MockerFixture, context: dict) -> unittest.mock.Mock:
-    run_res = mocker.Mock(name="RunResult")
-    run_res.returncode = 0
-    run_res.stdout = RENDERED_OK
-    run_res.stderr = ""
-    run_and_log = mocker.patch(
-        "app_build_suite.build_steps.helm_template_validator.run_and_log",
-        return_value=run_res,
+def _mock_helm_per_values(mocker: MockerFixture, outputs: Dict[str, str]) -> unittest.mock.Mock:
+    """Mocks 'helm template' rendering the output mapped to the name of the last values file ("" for none)."""
+
+    def stream(args: List[str], on_stdout_line: Callable[[str], None]) -> subprocess.CompletedProcess:
+        values = os.path.basename(args[-1]) if args[-2] == "--values" else ""
+        for line in outputs[values].splitlines(keepends=True):
+            on_stdout_line(line)
+        return subprocess.CompletedProcess(args, 0, None, "")
+
+    return mocker.patch("app_build_suite.build_steps.helm_template_validator.stream_and_log", side_effect=stream)
+
+
+def _matrix_chart(tmp_path: Path) -> Path:
+    (tmp_path / "ci").mkdir()
+    (tmp_path / "ci" / "aws-values.yaml").write_text("provider: aws\n")
+    (tmp_path / "ci" / "azure-values.yaml").write_text("provider: azure\n")
+    (tmp_path / "ci" / "notes.txt").write_text("not a values file\n")
+    (tmp_path / "scenarios").mkdir()
+    (tmp_path / "scenarios" / "big.yaml").write_text("replicas: 10\n")
+    (tmp_path / "scenarios" / "small.yaml").write_text("replicas: 1\n")
+    return tmp_path
+
+
+def _matrix_config(mocker: MockerFixture, chart_dir: Path, step: HelmTemplateValidator) -> configargparse.Namespace:
+    mocker.patch("app_build_suite.build_steps.helm_template_validator.get_tool_version", return_value="v3.21.2")
+    config = init_config_for_step(step)
+    config.chart_dir = str(chart_dir)
+    config.helm_template_values_matrix = [str(chart_dir / "scenarios" / "*.yaml")]
+    config.helm_template_ci_values = True
+    config.helm_template_parallel_renders = 3
+    step.pre_run(config)
+    return config
+
+
+def test_values_matrix_renders_each_scenario(mocker: MockerFixture, tmp_path: Path) -> None:
+    chart_dir = _matrix_chart(tmp_path)
+    step = HelmTemplateValidator()
+    config = _matrix_config(mocker, chart_dir, step)
+    outputs = {name: RENDERED_OK for name in ["", "big.yaml", "small.yaml", "aws-values.yaml", "azure-values.yaml"]}
+    stream_and_log = _mock_helm_per_values(mocker, outputs)
+
+    step.run(config, {})
+
+    rendered_values = sorted(c.args[0][-1] for c in stream_and_log.call_args_list if c.args[0][-2] == "--values")
+    assert rendered_values == sorted(
+        [
+            str(chart_dir / "ci" / "aws-values.yaml"),
+            str(chart_dir / "ci" / "azure-values.yaml"),
+            str(chart_dir / "scenarios" / "big.yaml"),
+            str(chart_dir / "scenarios" / "small.yaml"),
+        ]
+    )
+    assert stream_and_log.call_count == 5
+
+
+def test_values_matrix_reports_every_failed_scenario(mocker: MockerFixture, tmp_path: Path) -> None:
+    chart_dir = _matrix_chart(tmp_path)
+    step = HelmTemplateValidator()
+    config = _matrix_config(mocker, chart_dir, step)
+    outputs = {name: RENDERED_OK for name in ["", "big.yaml", "aws-values.yaml"]}
+    outputs["small.yaml"] = RENDERED_SYNTAX_ERROR
+    outputs["azure-values.yaml"] = RENDERED_DUPLICATE_KEY
+    _mock_helm_per_values(mocker, outputs)
+    logged: list = []
+    mocker.patch.object(
+        helm_template_validator.logger, "error", side_effect=lambda msg, *a, **k: logged.append(str(msg))
     )
+
+    with pytest.raises(BuildError) as excinfo:
+        step.run(config, {})
+
+    assert "2 of 5 values scenarios" in excinfo.value.msg
+    assert "azure-values.yaml" in excinfo.value.msg and "small.yaml" in excinfo.value.msg
+    assert any("azure-values.yaml" in line and "Duplicate YAML key" in line for line in logged)
+    assert any("small.yaml" in line and "Invalid YAML" in line for line in logged)
+
+
+def test_values_matrix_renders_in_parallel(mocker: MockerFixture, tmp_path: Path) -> None:
+    chart_dir = _matrix_chart(tmp_path)
+    step = HelmTemplateValidator()
+    config = _matrix_config(mocker, chart_dir, step)
+    config.helm_template_ci_values = False
+    barrier = threading.Barrier(3)
+
+    def stream(args: List[str], on_stdout_line: Callable[[str], None]) -> subprocess.CompletedProcess:
+        # raises BrokenBarrierError unless all the scenarios are rendered at the same time
+        barrier.wait(timeout=5)
+        return subprocess.CompletedProcess(args, 0, None, "")
+
+    mocker.patch("app_build_suite.build_steps.helm_template_validator.stream_and_log", side_effect=stream)
+    step.run(config, {})
+
+
+def test_values_matrix_pattern_without_matches_fails_pre_run(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch("app_build_suite.build_steps.helm_template_validator.get_tool_version", return_value="v3.21.2")
+    step = HelmTemplateValidator()
+    config = init_config_for_step(step)
+    config.helm_template_values_matrix = [str(tmp_path / "*.yaml")]
+    with pytest.raises(ValidationError) as excinfo:
+        step.pre_run(config)
+    assert "doesn't match any file" in excinfo.value.msg
+
+
+def _run_with_context(mocker: MockerFixture, context: dict) -> unittest.mock.Mock:
+    stream_and_log = _mock_helm(mocker, RENDERED_OK)
     step = HelmTemplateValidator()
     config = init_config_for_step(step)
     step.run(config, context)
-    return run_and_log
+    return stream_and_log
 
 
 def test_library_chart_is_skipped(mocker: MockerFixture) -> None:
     """'helm template' rejects library charts ("library charts are not installable"), so the
     step must skip them instead of failing the build."""
-    run_and_log = _run_with_context(mocker, {"chart_yaml": {"name": "my-lib", "type": "library"}})
-    run_and_log.assert_not_called()
+    stream_and_log = _run_with_context(mocker, {"chart_yaml": {"name": "my-lib", "type": "library"}})
+    stream_and_log.assert_not_called()
 
 
 def test_application_chart_is_not_skipped(mocker: MockerFixture) -> None:
-    run_and_log = _run_with_context(mocker, {"chart_yaml": {"name": "my-app", "type": "application"}})
-    run_and_log.assert_called_once()
+    stream_and_log = _run_with_context(mocker, {"chart_yaml": {"name": "my-app", "type": "application"}})
+    stream_and_log.assert_called_once()
 
 
 def test_chart_without_explicit_type_is_not_skipped(mocker: MockerFixture) -> None:
     """'type' is optional in Chart.yaml and defaults to 'application'."""
-    run_and_log = _run_with_context(mocker, {"chart_yaml": {"name": "my-app"}})
-    run_and_log.assert_called_once()
+    stream_and_log = _run_with_context(mocker, {"chart_yaml": {"name": "my-app"}})
+    stream_and_log.assert_called_once()
 
 
 def test_library_chart_is_detected_from_disk_without_context(mocker: MockerFixture, tmp_path: Path) -> None:
     """When only the validate step runs, ChartYamlLoader hasn't populated the context, so the
     chart type has to be read from disk."""
     (tmp_path / "Chart.yaml").write_text("name: my-lib\ntype: library\n")
-    run_res = mocker.Mock(name="RunResult")
-    run_res.returncode = 0
-    run_res.stdout = RENDERED_OK
-    run_res.stderr = ""
-    run_and_log = mocker.patch(
-        "app_build_suite.build_steps.helm_template_validator.run_and_log",
-        return_value=run_res,
-    )
+    stream_and_log = _mock_helm(mocker, RENDERED_OK)
     step = HelmTemplateValidator()
     config = init_config_for_step(step)
     config.chart_dir = str(tmp_path)
     step.run(config, {})
-    run_and_log.assert_not_called()
+    stream_and_log.assert_not_called()
 
 
 def test_unreadable_chart_yaml_does_not_skip(mocker: MockerFixture, tmp_path: Path) -> None:
     """A missing or broken Chart.yaml is other steps' problem to report; this step must not
     swallow the validation by silently skipping."""
-    run_and_log = mocker.patch(
-        "app_build_suite.build_steps.helm_template_validator.run_and_log",
-        return_value=mocker.Mock(returncode=0, stdout=RENDERED_OK, stderr=""),
-    )
+    stream_and_log = _mock_helm(mocker, RENDERED_OK)
     step = HelmTemplateValidator()
     config = init_config_for_step(step)
     config.chart_dir = str(tmp_path / "nonexistent")
     step.run(config, {})
-    run_and_log.assert_called_once()
+    stream_and_log.assert_called_once()
 
 
 def test_step_is_registered_in_helm_pipeline() -> None:
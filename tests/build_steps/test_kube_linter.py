@@ -0,0 +1,26 @@
+from pytest_mock import MockerFixture
+
+from app_build_suite.build_steps.helm_consts import context_key_rendered_manifests_dir
+from app_build_suite.build_steps.kube_linter import KubeLinter
+from tests.build_steps.helpers import init_config_for_step
+
+
+def _run_kube_linter(mocker: MockerFixture, context: dict) -> list:
+    run_and_log = mocker.patch(
+        "app_build_suite.build_steps.kube_linter.run_and_log",
+        return_value=mocker.Mock(returncode=0, stdout="", stderr=""),
+    )
+    step = KubeLinter()
+    config = init_config_for_step(step)
+    step.run(config, context)
+    return run_and_log.call_args.args[0]
+
+
+def test_lints_the_chart_directory_by_default(mocker: MockerFixture) -> None:
+    args = _run_kube_linter(mocker, {})
+    assert args[:3] == ["kube-linter", "lint", "res_test_helm"]
+
+
+def test_lints_manifests_rendered_by_the_template_validator(mocker: MockerFixture) -> None:
+    args = _run_kube_linter(mocker, {context_key_rendered_manifests_dir: "/tmp/abs-rendered-1234"})
+    assert args[:3] == ["kube-linter", "lint", "/tmp/abs-rendered-1234"]
@@ -0,0 +1,265 @@
+import argparse
+import contextvars
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Set
+
+import pytest
+from step_exec_lib.errors import ConfigError
+from step_exec_lib.steps import BuildStep, BuildStepsFilteringPipeline
+from step_exec_lib.types import STEP_ALL, Context, StepType
+
+from app_build_suite.build_steps.scheduler import (
+    ConcurrentBuildStepsFilteringPipeline,
+    StepResources,
+    chart_resource,
+    context_resource,
+)
+from app_build_suite.build_steps.steps import STEP_BUILD, STEP_VALIDATE
+from app_build_suite.errors import BuildError
+from app_build_suite.utils.profiling import get_profiler
+from tests.build_steps.helpers import init_config_for_step
+
+
+class RecordingStep(BuildStep):
+    def __init__(
+        self,
+        name: str,
+        log: List[str],
+        resources: Optional[StepResources],
+        barrier: Optional[threading.Barrier] = None,
+        fail: bool = False,
+        delay: float = 0.0,
+        step_type: StepType = STEP_VALIDATE,
+    ) -> None:
+        self._name = name
+        self._log = log
+        if resources is not None:
+            self.resources = resources
+        self._barrier = barrier
+        self._fail = fail
+        self._delay = delay
+        self._step_type = step_type
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def steps_provided(self) -> Set[StepType]:
+        return {self._step_type}
+
+    def run(self, config: argparse.Namespace, context: Context) -> None:
+        self._log.append(f"start {self._name}")
+        if self._barrier is not None:
+            # raises BrokenBarrierError if the other steps don't run at the same time
+            self._barrier.wait(timeout=5)
+        time.sleep(self._delay)
+        self._log.append(f"end {self._name}")
+        if self._fail:
+            raise BuildError(self._name, "failed")
+
+
+READ_CHART = StepResources(reads=frozenset({chart_resource()}))
+
+_build_name: contextvars.ContextVar[str] = contextvars.ContextVar("build_name", default="")
+
+
+class ContextRecordingStep(RecordingStep):
+    def run(self, config: argparse.Namespace, context: Context) -> None:
+        self._log.append(f"{self._name} in {_build_name.get()}")
+
+
+def _run_pipeline(steps: List[BuildStep], max_parallel_steps: int) -> argparse.Namespace:
+    pipeline = ConcurrentBuildStepsFilteringPipeline(steps, "test")
+    config = init_config_for_step(pipeline)
+    config.max_parallel_steps = max_parallel_steps
+    pipeline.pre_run(config)
+    pipeline.run(config, {})
+    return config
+
+
+@pytest.mark.parametrize(
+    "first,second,expected",
+    [
+        ("chart:", "chart:Chart.yaml", True),
+        ("chart:charts", "chart:charts/dep.tgz", True),
+        ("chart:Chart.yaml", "chart:Chart.yaml.back", False),
+        ("chart:values.yaml", "chart:Chart.yaml", False),
+        ("context:chart_yaml", "context:chart_yaml", True),
+        ("context:chart_yaml", "chart:", False),
+    ],
+)
+def test_resources_conflicts(first: str, second: str, expected: bool) -> None:
+    writer = StepResources(writes=frozenset({first}))
+    reader = StepResources(reads=frozenset({second}))
+    assert writer.conflicts_with(reader) == expected
+    assert reader.conflicts_with(writer) == expected
+    # readers never conflict with each other
+    assert not StepResources(reads=frozenset({first})).conflicts_with(reader)
+
+
+def test_independent_steps_run_concurrently() -> None:
+    log: List[str] = []
+    barrier = threading.Barrier(3)
+    steps: List[BuildStep] = [RecordingStep(f"s{i}", log, READ_CHART, barrier=barrier) for i in range(3)]
+
+    _run_pipeline(steps, 3)
+
+    assert sorted(log[:3]) == ["start s0", "start s1", "start s2"]
+
+
+def test_concurrent_steps_run_in_the_pipelines_context() -> None:
+    log: List[str] = []
+    steps: List[BuildStep] = [ContextRecordingStep(f"s{i}", log, READ_CHART) for i in range(2)]
+
+    token = _build_name.set("chart-a")
+    try:
+        _run_pipeline(steps, 2)
+    finally:
+        _build_name.reset(token)
+
+    assert sorted(log) == ["s0 in chart-a", "s1 in chart-a"]
+
+
+def test_conflicting_steps_keep_pipeline_order() -> None:
+    log: List[str] = []
+    key = context_resource("chart_yaml")
+    steps: List[BuildStep] = [
+        RecordingStep("writer", log, StepResources(writes=frozenset({key})), delay=0.05),
+        RecordingStep("reader", log, StepResources(reads=frozenset({key}))),
+        RecordingStep("other", log, READ_CHART),
+    ]
+
+    _run_pipeline(steps, 3)
+
+    assert log.index("end writer") < log.index("start reader")
+    # 'other' doesn't wait for the slow 'writer'
+    assert log.index("start other") < log.index("end writer")
+
+
+def test_steps_without_resources_are_barriers() -> None:
+    log: List[str] = []
+    steps: List[BuildStep] = [
+        RecordingStep("first", log, READ_CHART, delay=0.05),
+        RecordingStep("barrier", log, None),
+        RecordingStep("last", log, READ_CHART),
+    ]
+
+    _run_pipeline(steps, 3)
+
+    assert log == ["start first", "end first", "start barrier", "end barrier", "start last", "end last"]
+
+
+def test_first_error_in_pipeline_order_is_raised() -> None:
+    log: List[str] = []
+    barrier = threading.Barrier(2)
+    steps: List[BuildStep] = [
+        RecordingStep("slow", log, READ_CHART, barrier=barrier, delay=0.05, fail=True),
+        RecordingStep("fast", log, READ_CHART, barrier=barrier, fail=True),
+        RecordingStep("dependent", log, None),
+    ]
+
+    with pytest.raises(BuildError) as exc:
+        _run_pipeline(steps, 2)
+
+    assert exc.value.source == "slow"
+    assert "start dependent" not in log
+
+
+def test_filtered_out_steps_are_skipped() -> None:
+    log: List[str] = []
+    steps: List[BuildStep] = [
+        RecordingStep("build", log, READ_CHART, step_type=STEP_BUILD),
+        RecordingStep("validate", log, READ_CHART),
+    ]
+    pipeline = ConcurrentBuildStepsFilteringPipeline(steps, "test")
+    config = init_config_for_step(pipeline)
+    config.max_parallel_steps = 2
+    config.skip_steps = [STEP_BUILD]
+
+    pipeline.run(config, {})
+
+    assert log == ["start validate", "end validate"]
+
+
+@pytest.mark.parametrize(
+    "steps,skip_steps",
+    [
+        ([STEP_ALL], []),
+        ([STEP_VALIDATE], []),
+        ([STEP_BUILD, STEP_VALIDATE], []),
+        ([STEP_ALL], [STEP_BUILD]),
+        ([STEP_VALIDATE], [STEP_VALIDATE]),
+        (["unknown"], []),
+    ],
+)
+def test_step_filter_agrees_with_step_exec_lib(steps: List[str], skip_steps: List[str]) -> None:
+    """The concurrent pipeline copies the filtering of the library's pipeline, which it can't call."""
+    log: List[str] = []
+    pipeline_steps: List[BuildStep] = [
+        RecordingStep("build", log, None, step_type=STEP_BUILD),
+        RecordingStep("validate", log, None, step_type=STEP_VALIDATE),
+        RecordingStep("validate2", log, None, step_type=STEP_VALIDATE),
+    ]
+    pipeline = ConcurrentBuildStepsFilteringPipeline(pipeline_steps, "test")
+    config = argparse.Namespace(steps=steps, skip_steps=skip_steps)
+
+    enabled_by_library: List[BuildStep] = []
+    BuildStepsFilteringPipeline._iterate_steps(pipeline, config, "build", enabled_by_library.append)
+
+    assert [s for s in pipeline_steps if pipeline._is_step_enabled(config, s)] == enabled_by_library
+
+
+def test_invalid_max_parallel_steps() -> None:
+    pipeline = ConcurrentBuildStepsFilteringPipeline([], "test")
+    config = init_config_for_step(pipeline)
+    config.max_parallel_steps = 0
+    with pytest.raises(ConfigError):
+        pipeline.pre_run(config)
+
+
+def test_helm_pipeline_runs_linters_in_parallel(tmp_path: Path) -> None:
+    from app_build_suite.build_steps.helm import HelmBuildFilteringPipeline
+
+    pipeline = HelmBuildFilteringPipeline()
+    steps = pipeline._pipeline
+    config = init_config_for_step(pipeline)
+    config.chart_dir = str(tmp_path)
+    names = [s.name for s in steps]
+    ct, kube_linter, template_validator = (
+        names.index("HelmChartToolLinter"),
+        names.index("KubeLinter"),
+        names.index("HelmTemplateValidator"),
+    )
+    # 'ct lint' rebuilds chart dependencies, if there are any
+    (tmp_path / "Chart.yaml").write_text("name: app\ndependencies:\n- name: dep\n")
+    assert ct in pipeline._get_dependencies(steps, config)[template_validator]
+
+    (tmp_path / "Chart.yaml").write_text("name: app\n")
+    deps = pipeline._get_dependencies(steps, config)
+    assert ct not in deps[kube_linter] | deps[template_validator]
+    # kube-linter lints the manifests rendered by the template validator
+    assert template_validator in deps[kube_linter]
+    # everything reading the chart waits for the dependency update
+    assert names.index("HelmRequirementsUpdater") in deps[ct] & deps[kube_linter] & deps[template_validator]
+
+
+def test_profiled_pipeline_measures_all_stages(tmp_path: Path) -> None:
+    log: List[str] = []
+    steps: List[BuildStep] = [RecordingStep(f"s{i}", log, READ_CHART) for i in range(2)]
+    pipeline = ConcurrentBuildStepsFilteringPipeline(steps, "test")
+    config = init_config_for_step(pipeline)
+    config.max_parallel_steps = 2
+    config.profile_output = str(tmp_path / "profile.json")
+
+    pipeline.pre_run(config)
+    pipeline.run(config, {})
+    pipeline.cleanup(config, {}, False)
+
+    profiler = get_profiler(config)
+    assert profiler is not None
+    measured = sorted((p.step, p.stage) for p in profiler.profiles)
+    assert measured == sorted((f"s{i}", stage) for i in range(2) for stage in ["pre-run", "build", "cleanup"])
+    assert all(p.chart == "res_test_helm" for p in profiler.profiles)
@@ -0,0 +1,56 @@
+import io
+import pathlib
+import subprocess  # nosec: runs helm to compare its archive with the native one
+import tarfile
+from typing import Dict
+
+from app_build_suite.utils.chart_packager import package_chart
+
+
+def _archive_files(path: str) -> Dict[str, bytes]:
+    with tarfile.open(path, "r:gz") as tar:
+        return {m.name: tar.extractfile(m).read() for m in tar if m.isfile()}  # type: ignore[union-attr]
+
+
+def _write_subchart_archive(path: pathlib.Path) -> None:
+    with tarfile.open(path, "w:gz") as tar:
+        for name, content in {
+            "dep/Chart.yaml": b"apiVersion: v2\nname: dep\nversion: 1.0.0\n",
+            "dep/values.yaml": b"{}\n",
+            "dep/templates/cm.yaml": b"kind: ConfigMap\n",
+        }.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+
+def test_native_packager_matches_helm(tmp_path: pathlib.Path) -> None:
+    chart_dir = tmp_path / "app"
+    for name, content in {
+        ".helmignore": "ci/\n*.bak\n",
+        "Chart.yaml": "apiVersion: v2\nname: app\nversion: 1.0.0\n"
+        "dependencies:\n- name: dep\n  version: 1.0.0\n  repository: https://example.com/charts\n",
+        # like the README copied from the repository's root by HelmArtifactHubMetadataSetter
+        "README.md": "# App\n",
+        "ci/ci-values.yaml": "a: b\n",
+        "templates/_helpers.tpl": "",
+        "templates/deployment.yaml": "kind: Deployment\n",
+        "templates/old.bak": "",
+        "values.schema.json": "{}",
+        "values.yaml": "replicas: 1\n",
+    }.items():
+        (chart_dir / name).parent.mkdir(parents=True, exist_ok=True)
+        (chart_dir / name).write_text(content)
+    (chart_dir / "charts").mkdir()
+    _write_subchart_archive(chart_dir / "charts" / "dep-1.0.0.tgz")
+
+    native = package_chart(str(chart_dir), str(tmp_path / "native"))
+    subprocess.run(["helm", "package", str(chart_dir), "--destination", str(tmp_path / "helm")], check=True)  # nosec
+
+    native_files = _archive_files(native.path)
+    helm_files = _archive_files(str(tmp_path / "helm" / "app-1.0.0.tgz"))
+    assert list(native_files) == list(helm_files)
+    # helm serializes 'Chart.yaml' again, all the other files are the same
+    assert {n: c for n, c in native_files.items() if not n.endswith("/Chart.yaml")} == {
+        n: c for n, c in helm_files.items() if not n.endswith("/Chart.yaml")
+    }
@@ -0,0 +1,76 @@
+import os
+import subprocess  # nosec
+from pathlib import Path
+
+import pytest
+
+from app_build_suite.utils.yaml_strict import SourceIndex, load_all_strict
+from benchmarks.harness import (
+    Benchmark,
+    BenchmarkResult,
+    compare_runs,
+    find_run,
+    load_run,
+    new_run,
+    run_benchmark,
+    save_run,
+)
+from benchmarks.synthetic import CHART_NAME, ChartSpec, generate_chart, render_chart, write_stub_tools
+
+_SPEC = ChartSpec(
+    templates=3, documents_per_template=4, values_depth=3, values_width=2, annotations=5, document_annotations=2
+)
+
+
+def test_generated_chart_matches_rendered_output(tmp_path: Path) -> None:
+    generate_chart(_SPEC, str(tmp_path / "chart"))
+    rendered = render_chart(_SPEC)
+
+    assert sorted(os.listdir(tmp_path / "chart" / "templates")) == [
+        "_helpers.tpl",
+        "template-0.yaml",
+        "template-1.yaml",
+        "template-2.yaml",
+    ]
+    assert load_all_strict(rendered) == _SPEC.rendered_documents
+    assert SourceIndex.from_text(rendered).source_at(rendered.count("\n")) == f"{CHART_NAME}/templates/template-2.yaml"
+
+
+def test_stub_helm(tmp_path: Path) -> None:
+    rendered_path = tmp_path / "rendered.yaml"
+    rendered_path.write_text(render_chart(_SPEC))
+    generate_chart(_SPEC, str(tmp_path / "chart"))
+    write_stub_tools(str(tmp_path / "bin"), str(rendered_path))
+    helm = str(tmp_path / "bin" / "helm")
+
+    version = subprocess.run([helm, "version"], capture_output=True, text=True, check=True)  # nosec
+    assert version.stdout.startswith('version.BuildInfo{Version:"v3.')
+    template = subprocess.run([helm, "template", "x", "chart"], capture_output=True, text=True, check=True)  # nosec
+    assert template.stdout == rendered_path.read_text()
+    package = subprocess.run(  # nosec
+        [helm, "package", str(tmp_path / "chart"), "--destination", str(tmp_path / "out")],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert package.stdout.startswith("Successfully packaged chart and saved it to: ")
+    assert (tmp_path / "out" / f"{CHART_NAME}-1.0.0.tgz").is_file()
+
+
+def test_results_are_stored_and_compared(tmp_path: Path) -> None:
+    calls = []
+    result = run_benchmark(Benchmark("noop", lambda arg: calls.append(arg), lambda: "prepared"), repeat=3, warmup=2)
+    assert len(result.times) == 3
+    assert calls == ["prepared"] * 5
+
+    baseline = new_run({"templates": 1})
+    baseline.results["noop"] = BenchmarkResult("noop", [1.0, 2.0, 3.0])
+    path = save_run(baseline, str(tmp_path))
+    assert find_run(str(tmp_path), baseline.commit) == path
+
+    current = load_run(path)
+    current.results["noop"] = BenchmarkResult("noop", [3.0])
+    current.results["new"] = BenchmarkResult("new", [1.0])
+    comparisons = compare_runs(load_run(path), current)
+    assert [c.name for c in comparisons] == ["noop"]
+    assert comparisons[0].change == pytest.approx(0.5)
@@ -0,0 +1,32 @@
+import os
+import subprocess  # nosec
+import sys
+from typing import Dict
+
+import app_build_suite
+
+# libraries needed only by some steps or options; loading them on start-up slows down every run
+HEAVY_MODULES = {"PIL", "cairosvg", "git", "validators", "multiprocessing"}
+
+
+def _import_times(code: str) -> Dict[str, int]:
+    """Runs the code in a new interpreter and returns the cumulative import time of each module, in µs."""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(app_build_suite.__file__)))
+    res = subprocess.run(  # nosec
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=repo_root, check=True
+    )
+    times: Dict[str, int] = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_heavy_dependencies_are_imported_lazily() -> None:
+    """Checks which modules are imported when the pipeline is created, not how long the imports take."""
+    times = _import_times("from app_build_suite.__main__ import get_pipeline; get_pipeline()")
+
+    heavy = sorted(name for name in times if name.split(".")[0] in HEAVY_MODULES)
+    assert heavy == [], f"imported on start-up instead of when a step needs them: {', '.join(heavy)}"
@@ -0,0 +1,108 @@
+import argparse
+import io
+import logging
+from pathlib import Path
+from typing import List, Set
+
+import configargparse
+import pytest
+from step_exec_lib.steps import BuildStep
+from step_exec_lib.types import Context, StepType
+
+from app_build_suite import __main__ as abs_main
+from app_build_suite.build_steps.steps import STEP_BUILD
+from app_build_suite.errors import BuildError
+from app_build_suite.utils.charts import discover_charts
+
+
+class FakeBuildStep(BuildStep):
+    built: List[str] = []
+
+    @property
+    def steps_provided(self) -> Set[StepType]:
+        return {STEP_BUILD}
+
+    def initialize_config(self, config_parser: configargparse.ArgParser) -> None:
+        config_parser.add_argument("-c", "--chart-dir", required=False, default=".")
+        config_parser.add_argument("--fail", required=False, default=False, action="store_true")
+
+    def run(self, config: argparse.Namespace, context: Context) -> None:
+        logging.getLogger(__name__).info("building")
+        if config.fail:
+            raise BuildError(self.name, "failed on request")
+        self.built.append(config.chart_dir)
+
+
+def _make_chart(path: Path, abs_config: str = "") -> None:
+    path.mkdir(parents=True)
+    (path / "Chart.yaml").write_text(f"name: {path.name}\n")
+    if abs_config:
+        (path / ".abs").mkdir()
+        (path / ".abs" / "main.yaml").write_text(abs_config)
+
+
+def test_discover_charts(tmp_path: Path) -> None:
+    _make_chart(tmp_path / "b-chart")
+    _make_chart(tmp_path / "a-chart")
+    # subcharts of found charts and hidden directories are not reported
+    _make_chart(tmp_path / "a-chart" / "charts" / "subchart")
+    _make_chart(tmp_path / ".git" / "hidden")
+    _make_chart(tmp_path / "nested" / "deeper" / "c-chart")
+    (tmp_path / "not-a-chart").mkdir()
+
+    assert discover_charts(str(tmp_path)) == [
+        str(tmp_path / "a-chart"),
+        str(tmp_path / "b-chart"),
+        str(tmp_path / "nested" / "deeper" / "c-chart"),
+    ]
+
+
+@pytest.mark.parametrize("max_parallel_charts", [1, 3])
+def test_build_charts_reports_each_chart(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+    max_parallel_charts: int,
+) -> None:
+    _make_chart(tmp_path / "good-1")
+    _make_chart(tmp_path / "bad", abs_config="fail: true\n")
+    _make_chart(tmp_path / "good-2")
+    built: List[str] = []
+    monkeypatch.setattr(FakeBuildStep, "built", built)
+    monkeypatch.setattr(abs_main, "get_pipeline", lambda: [FakeBuildStep()])
+    caplog.set_level(logging.INFO)
+
+    result = abs_main.build_charts(str(tmp_path), max_parallel_charts, ["--charts-root", str(tmp_path)])
+
+    assert not result
+    assert sorted(built) == [str(tmp_path / "good-1"), str(tmp_path / "good-2")]
+    assert "Build summary: 2 succeeded, 1 failed." in caplog.messages
+    assert any(m.startswith(f"  FAILED {tmp_path / 'bad'} (") for m in caplog.messages)
+
+
+def test_chart_name_prefixes_logs_once_per_handler(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    _make_chart(tmp_path / "a")
+    monkeypatch.setattr(FakeBuildStep, "built", [])
+    monkeypatch.setattr(abs_main, "get_pipeline", lambda: [FakeBuildStep()])
+    outputs = [io.StringIO(), io.StringIO()]
+    handlers = [logging.StreamHandler(output) for output in outputs]
+    root_logger = logging.getLogger()
+    for handler in handlers:
+        handler.setFormatter(abs_main.ChartLogFormatter("%(message)s"))
+        root_logger.addHandler(handler)
+    monkeypatch.setattr(root_logger, "level", logging.INFO)
+    try:
+        assert abs_main.build_charts(str(tmp_path), 1, ["--charts-root", str(tmp_path)])
+    finally:
+        for handler in handlers:
+            root_logger.removeHandler(handler)
+
+    for output in outputs:
+        lines = output.getvalue().splitlines()
+        assert f"[{tmp_path / 'a'}] building" in lines
+        # messages logged outside of a chart's build aren't prefixed
+        assert "Build summary: 1 succeeded, 0 failed." in lines
+
+
+def test_build_charts_fails_without_charts(tmp_path: Path) -> None:
+    assert not abs_main.build_charts(str(tmp_path), 1, [])
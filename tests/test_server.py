@@ -0,0 +1,136 @@
+import io
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import pytest
+from pytest_mock import MockerFixture
+from step_exec_lib.steps import BuildStepsFilteringPipeline
+
+from app_build_suite import __main__ as abs_main
+from app_build_suite.client import request_build
+from app_build_suite.server import BuildServer, _build_environment
+from tests.test_main import FakeBuildStep, _make_chart
+
+
+def _no_new_pipeline() -> List[BuildStepsFilteringPipeline]:
+    raise AssertionError("the server's pipeline has to be reused")
+
+
+@pytest.fixture
+def server(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[BuildServer]:
+    monkeypatch.setattr(abs_main, "get_pipeline", _no_new_pipeline)
+    pipeline = BuildStepsFilteringPipeline([FakeBuildStep()], "test")
+    build_server = BuildServer(str(tmp_path / "abs.sock"), [pipeline])
+    thread = threading.Thread(target=build_server.serve_forever, daemon=True)
+    thread.start()
+    yield build_server
+    build_server.shutdown()
+    build_server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def built(monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    charts: List[str] = []
+    monkeypatch.setattr(FakeBuildStep, "built", charts)
+    return charts
+
+
+def test_build_logs_are_streamed_to_client(tmp_path: Path, server: BuildServer, built: List[str]) -> None:
+    _make_chart(tmp_path / "chart")
+    stdout, stderr = io.StringIO(), io.StringIO()
+
+    assert request_build(server.socket_path, ["--chart-dir", "chart"], stdout, stderr, cwd=str(tmp_path), env={})
+    assert request_build(server.socket_path, ["--chart-dir", "chart"], stdout, stderr, cwd=str(tmp_path), env={})
+
+    # the builds run in the client's directory, with the server's pipeline
+    assert built == ["chart", "chart"]
+    assert "Starting build with the following options" in stderr.getvalue()
+    assert stdout.getvalue() == ""
+
+
+def test_failed_build_and_client_environment(tmp_path: Path, server: BuildServer, built: List[str]) -> None:
+    _make_chart(tmp_path / "chart")
+    args = ["--chart-dir", "chart"]
+
+    assert not request_build(server.socket_path, args + ["--fail"], io.StringIO(), io.StringIO(), str(tmp_path), {})
+    assert not request_build(
+        server.socket_path, args, io.StringIO(), io.StringIO(), str(tmp_path), {"ABS_FAIL": "true"}
+    )
+    # the environment of one build doesn't leak into the next one
+    assert request_build(server.socket_path, args, io.StringIO(), io.StringIO(), str(tmp_path), {})
+    assert built == ["chart"]
+
+
+def test_client_path_is_used(
+    tmp_path: Path, server: BuildServer, monkeypatch: pytest.MonkeyPatch, mocker: MockerFixture
+) -> None:
+    _make_chart(tmp_path / "chart")
+    paths: List[Optional[str]] = []
+    mocker.patch.object(FakeBuildStep, "run", side_effect=lambda config, context: paths.append(os.environ.get("PATH")))
+    monkeypatch.setenv("PATH", "/server/bin")
+    args = ["--chart-dir", "chart"]
+    stderr = io.StringIO()
+
+    assert request_build(server.socket_path, args, io.StringIO(), stderr, str(tmp_path), {"PATH": "/client/bin"})
+    # without the client's PATH, the server's one is used
+    assert request_build(server.socket_path, args, io.StringIO(), io.StringIO(), str(tmp_path), {})
+
+    assert paths == ["/client/bin", "/server/bin"]
+    assert "Tools are looked up in the client's PATH" in stderr.getvalue()
+    assert os.environ["PATH"] == "/server/bin"
+
+
+def test_build_environment_is_restored_when_the_build_fails(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ABS_DEBUG", "server")
+    monkeypatch.setenv("PATH", "/server/bin")
+    monkeypatch.delenv("ABS_FAIL", raising=False)
+    build_dir = tmp_path / "build"
+    build_dir.mkdir()
+
+    with pytest.raises(RuntimeError):
+        with _build_environment(str(build_dir), {"ABS_FAIL": "true", "PATH": "/client/bin", "HOME": "/client"}):
+            assert os.getcwd() == str(build_dir)
+            assert "ABS_DEBUG" not in os.environ
+            assert (os.environ["ABS_FAIL"], os.environ["PATH"]) == ("true", "/client/bin")
+            # only build options and PATH are taken from the client
+            assert os.environ.get("HOME") != "/client"
+            raise RuntimeError("build failed")
+
+    assert os.getcwd() == str(tmp_path)
+    assert (os.environ["ABS_DEBUG"], os.environ["PATH"]) == ("server", "/server/bin")
+    assert "ABS_FAIL" not in os.environ
+
+
+def test_help_is_printed_by_client(tmp_path: Path, server: BuildServer) -> None:
+    stdout = io.StringIO()
+
+    assert request_build(server.socket_path, ["--help"], stdout, io.StringIO(), str(tmp_path), {})
+    assert "--chart-dir" in stdout.getvalue()
+
+
+def test_invalid_request_is_rejected(server: BuildServer) -> None:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(server.socket_path)
+        sock.sendall(b'{"args": "--fail"}\n')
+        response = sock.makefile("rb").read().decode()
+    assert "Invalid build request: 'args' must be a list of strings." in response
+    assert '"success": false' in response
+
+
+def test_server_socket_handling(tmp_path: Path, server: BuildServer) -> None:
+    # a running server is never replaced
+    with pytest.raises(OSError):
+        BuildServer(server.socket_path)
+    # a socket file left behind by a killed server is
+    stale_path = str(tmp_path / "stale.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(stale_path)
+    BuildServer(stale_path).server_close()
+    assert not Path(stale_path).exists()
+    with pytest.raises(OSError):
+        request_build(stale_path, [], io.StringIO(), io.StringIO())
@@ -0,0 +1,196 @@
+import argparse
+import contextvars
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app_build_suite.errors import BuildError
+from app_build_suite.utils import build_cache
+from app_build_suite.utils.build_cache import BuildCache, run_cached
+from app_build_suite.utils.chart_inventory import ChartInventory
+
+test_logger = logging.getLogger("tests.build_cache")
+
+
+@pytest.fixture
+def chart_dir(tmp_path: Path) -> Path:
+    chart = tmp_path / "chart"
+    (chart / "templates").mkdir(parents=True)
+    (chart / "Chart.yaml").write_text("name: test\nversion: 1.0.0\n")
+    (chart / "templates" / "cm.yaml").write_text("kind: ConfigMap\n")
+    return chart
+
+
+def _config(tmp_path: Path, chart_dir: Path, enabled: bool = True) -> argparse.Namespace:
+    return argparse.Namespace(
+        build_cache=enabled,
+        build_cache_max_size=16,
+        cache_dir=str(tmp_path / "cache"),
+        chart_dir=str(chart_dir),
+    )
+
+
+@pytest.mark.parametrize("hash_chart", [True, False], ids=["inventory", "tree"])
+def test_chart_hash_depends_only_on_content(tmp_path: Path, chart_dir: Path, hash_chart: bool) -> None:
+    cache = BuildCache(str(tmp_path / "cache"), 1024)
+
+    def get_hash() -> str:
+        if hash_chart:
+            return cache.hash_chart(ChartInventory.scan(str(chart_dir)))
+        return cache.hash_tree(str(chart_dir))
+
+    initial = get_hash()
+
+    # files created by the build itself are ignored, and so are timestamps
+    (chart_dir / "Chart.yaml.back").write_text("old")
+    (chart_dir / "test-1.0.0.tgz").write_text("archive")
+    (chart_dir / "test-1.0.0.tgz-meta").mkdir()
+    (chart_dir / "test-1.0.0.tgz-meta" / "main.json").write_text("{}")
+    os.utime(chart_dir / "Chart.yaml", (1, 1))
+    assert get_hash() == initial
+
+    (chart_dir / "templates" / "cm.yaml").write_text("kind: Secret\n")
+    assert get_hash() != initial
+
+
+def test_chart_is_hashed_once_per_inventory(tmp_path: Path, chart_dir: Path, mocker: MockerFixture) -> None:
+    cache = BuildCache(str(tmp_path / "cache"), 1024)
+    inventory = ChartInventory.scan(str(chart_dir))
+    hash_file = mocker.spy(build_cache, "hash_file")
+
+    first = cache.hash_chart(inventory)
+    assert cache.get_key("Step", str(chart_dir), {}) != cache.get_key("Other", str(chart_dir), {})
+    assert cache.hash_chart(inventory) == first
+    # unchanged files aren't read again for a new inventory either
+    assert cache.hash_chart(ChartInventory.scan(str(chart_dir))) == first
+    assert hash_file.call_count == 2
+
+
+def test_cache_hit_skips_action_and_replays_logs(
+    tmp_path: Path, chart_dir: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    config = _config(tmp_path, chart_dir)
+    calls: List[str] = []
+
+    def action() -> None:
+        calls.append("run")
+        test_logger.info("linting output")
+
+    caplog.set_level(logging.INFO)
+    run_cached(config, "Step", test_logger, lambda: {"version": "1"}, action)
+    caplog.clear()
+    run_cached(config, "Step", test_logger, lambda: {"version": "1"}, action)
+
+    assert calls == ["run"]
+    assert "linting output" in caplog.messages
+    # different inputs miss the cache
+    run_cached(config, "Step", test_logger, lambda: {"version": "2"}, action)
+    assert calls == ["run", "run"]
+
+
+def test_cache_hit_replays_logs_of_all_loggers(
+    tmp_path: Path, chart_dir: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Output of tools is logged by 'run_and_log' with its own logger, not the step's one."""
+    config = _config(tmp_path, chart_dir)
+    tool_logger = logging.getLogger("tests.build_cache.tool")
+    other_chart_logger = logging.getLogger("tests.build_cache.other")
+
+    def action() -> None:
+        test_logger.info("linting chart")
+        tool_logger.info("tool output")
+        tool_logger.warning("tool warning")
+        # logged by another chart's build in the meantime
+        other_chart = threading.Thread(target=other_chart_logger.info, args=("other chart",))
+        # logged by a pool started by the step
+        pool = threading.Thread(target=contextvars.copy_context().run, args=(tool_logger.info, "in a pool"))
+        for thread in (other_chart, pool):
+            thread.start()
+            thread.join()
+
+    caplog.set_level(logging.INFO)
+    run_cached(config, "Step", test_logger, lambda: {}, action)
+    original = [(r.levelno, r.getMessage()) for r in caplog.records if r.name != "app_build_suite.utils.build_cache"]
+    caplog.clear()
+    run_cached(config, "Step", test_logger, lambda: {}, action)
+    replayed = [(r.levelno, r.getMessage()) for r in caplog.records if r.name == test_logger.name]
+
+    assert replayed == [r for r in original if r[1] != "other chart"]
+    assert (logging.WARNING, "tool warning") in replayed
+
+
+def test_cached_failure_is_raised_again(tmp_path: Path, chart_dir: Path) -> None:
+    config = _config(tmp_path, chart_dir)
+    calls: List[str] = []
+
+    def action() -> None:
+        calls.append("run")
+        raise BuildError("Step", "Linting failed")
+
+    for _ in range(2):
+        with pytest.raises(BuildError) as exc:
+            run_cached(config, "Step", test_logger, lambda: {}, action)
+        assert exc.value.source == "Step"
+        assert exc.value.msg == "Linting failed"
+    assert calls == ["run"]
+
+
+def test_artifacts_are_restored(tmp_path: Path, chart_dir: Path) -> None:
+    config = _config(tmp_path, chart_dir)
+    output = tmp_path / "out"
+    output.mkdir()
+    restored: Dict[str, str] = {}
+
+    def action() -> Dict[str, str]:
+        (output / "test-1.0.0.tgz").write_bytes(b"archive")
+        return {"test-1.0.0.tgz": str(output / "test-1.0.0.tgz")}
+
+    run_cached(config, "Builder", test_logger, lambda: {}, action, restored.update)
+    (output / "test-1.0.0.tgz").unlink()
+    run_cached(config, "Builder", test_logger, lambda: {}, action, restored.update)
+
+    assert Path(restored["test-1.0.0.tgz"]).read_bytes() == b"archive"
+    assert not (output / "test-1.0.0.tgz").exists()
+
+
+def test_outputs_are_restored(tmp_path: Path, chart_dir: Path) -> None:
+    config = _config(tmp_path, chart_dir)
+    restored: Dict[str, Any] = {}
+
+    run_cached(config, "Builder", test_logger, lambda: {}, dict, get_outputs=lambda: {"digest": "abc", "size": 1})
+    run_cached(config, "Builder", test_logger, lambda: {}, dict, restore_outputs=restored.update)
+
+    assert restored == {"digest": "abc", "size": 1}
+
+
+def test_disabled_cache_always_runs_action(tmp_path: Path, chart_dir: Path) -> None:
+    config = _config(tmp_path, chart_dir, enabled=False)
+    calls: List[str] = []
+    for _ in range(2):
+        run_cached(config, "Step", test_logger, lambda: {}, lambda: calls.append("run"))  # type: ignore[func-returns-value]
+    assert calls == ["run", "run"]
+    assert not (tmp_path / "cache").exists()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    cache = BuildCache(str(tmp_path / "cache"), max_size_bytes=2500)
+    artifact = tmp_path / "artifact"
+    artifact.write_bytes(b"x" * 1000)
+
+    cache.put("first", True, "", [], {"a": str(artifact)})
+    cache.put("second", True, "", [], {"a": str(artifact)})
+    # make sure the entries have distinct last-used times
+    first_result = tmp_path / "cache" / "builds" / "first" / "result.json"
+    os.utime(first_result, (1, 1))
+    assert cache.get("first") is not None
+    os.utime(tmp_path / "cache" / "builds" / "second" / "result.json", (2, 2))
+    cache.put("third", True, "", [], {"a": str(artifact)})
+
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
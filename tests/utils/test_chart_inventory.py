@@ -0,0 +1,111 @@
+import os
+import pathlib
+from typing import Dict
+
+import pytest
+
+from app_build_suite.utils.chart_inventory import ChartInventory, ChartInventoryStore
+from app_build_suite.utils.chart_packager import package_chart
+from app_build_suite.utils.helmignore import HelmIgnoreError
+
+
+def _write_files(root: pathlib.Path, files: Dict[str, str]) -> None:
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def test_chart_tree_is_listed_in_order(tmp_path: pathlib.Path) -> None:
+    _write_files(
+        tmp_path,
+        {
+            ".helmignore": "ci/\n*.bak\n",
+            "Chart.yaml": "name: app\n",
+            "ci/values.yaml": "a: b\n",
+            "templates/deployment.yaml": "kind: Deployment\n",
+            "templates/old.bak": "",
+            "values.yaml": "replicas: 1\n",
+        },
+    )
+
+    inventory = ChartInventory.scan(str(tmp_path))
+
+    assert [e.path for e in inventory] == [
+        ".helmignore",
+        "Chart.yaml",
+        "ci",
+        "ci/values.yaml",
+        "templates",
+        "templates/deployment.yaml",
+        "templates/old.bak",
+        "values.yaml",
+    ]
+    assert [e.path for e in inventory if e.ignored] == ["ci", "ci/values.yaml", "templates/old.bak"]
+    chart_yaml = inventory.get("./Chart.yaml")
+    assert chart_yaml is not None and chart_yaml.is_file and chart_yaml.size == len("name: app\n")
+    templates = inventory.get("templates")
+    assert templates is not None and templates.is_dir
+    assert inventory.helmignore_error is None
+
+
+def test_files_are_looked_up(tmp_path: pathlib.Path) -> None:
+    _write_files(tmp_path / "chart", {"Chart.yaml": "", "templates/_helpers.tpl": "", "templates/NOTES.txt": ""})
+    _write_files(tmp_path, {"README.md": ""})
+
+    inventory = ChartInventory.scan(str(tmp_path / "chart"))
+
+    assert inventory.is_file("./Chart.yaml")
+    assert not inventory.is_file("templates")
+    assert not inventory.is_file("values.schema.json")
+    # paths outside of the chart are checked on disk
+    assert inventory.is_file("../README.md")
+    assert not inventory.is_file("../LICENSE")
+    assert [e.path for e in inventory.files((".tpl", ".yaml"))] == ["Chart.yaml", "templates/_helpers.tpl"]
+
+
+def test_missing_chart_dir_is_empty(tmp_path: pathlib.Path) -> None:
+    inventory = ChartInventory.scan(str(tmp_path / "missing"))
+
+    assert len(inventory) == 0
+    assert inventory.get("Chart.yaml") is None
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="symbolic links not supported")
+def test_symbolic_links_are_followed(tmp_path: pathlib.Path) -> None:
+    _write_files(tmp_path, {"Chart.yaml": "", "files/config.yaml": ""})
+    (tmp_path / "linked").symlink_to(tmp_path / "files")
+    (tmp_path / "files" / "loop").symlink_to(tmp_path)
+    (tmp_path / "broken").symlink_to(tmp_path / "missing")
+
+    inventory = ChartInventory.scan(str(tmp_path))
+
+    assert inventory.is_file("linked/config.yaml")
+    assert inventory.get("broken") is None
+    # the loop is listed, but not entered again
+    assert inventory.get("files/loop") is not None
+    assert inventory.get("files/loop/Chart.yaml") is None
+
+
+def test_invalid_helmignore_fails_packaging_only(tmp_path: pathlib.Path) -> None:
+    _write_files(tmp_path, {".helmignore": "templates/**\n", "Chart.yaml": "name: app\nversion: 1.0.0\n"})
+
+    inventory = ChartInventory.scan(str(tmp_path))
+
+    assert isinstance(inventory.helmignore_error, HelmIgnoreError)
+    assert inventory.is_file("Chart.yaml")
+    with pytest.raises(HelmIgnoreError):
+        package_chart(str(tmp_path), str(tmp_path / "out"), inventory=inventory)
+
+
+def test_store_scans_once_until_invalidated(tmp_path: pathlib.Path) -> None:
+    store = ChartInventoryStore()
+    _write_files(tmp_path, {"Chart.yaml": ""})
+
+    inventory = store.get(str(tmp_path))
+    (tmp_path / "Chart.lock").write_text("")
+    assert store.get(str(tmp_path)) is inventory
+    assert not store.get(str(tmp_path)).is_file("Chart.lock")
+
+    store.invalidate(str(tmp_path))
+    assert store.get(str(tmp_path)).is_file("Chart.lock")
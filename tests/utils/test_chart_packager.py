@@ -0,0 +1,185 @@
+import gzip
+import hashlib
+import io
+import pathlib
+import random
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import pytest
+
+from app_build_suite.utils.chart_packager import (
+    HELM_GZIP_COMMENT,
+    HELM_GZIP_EXTRA,
+    ChartPackagingError,
+    HelmGzipWriter,
+    ParallelGzipWriter,
+    package_chart,
+)
+
+CHART_YAML = "apiVersion: v2\nname: app\nversion: 1.2.3\n"
+
+
+def _write_files(root: pathlib.Path, files: Dict[str, str]) -> None:
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def _make_archive(files: Dict[str, str]) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content.encode())
+            tar.addfile(info, io.BytesIO(content.encode()))
+    return buffer.getvalue()
+
+
+def _archive_files(path: str) -> Dict[str, bytes]:
+    with tarfile.open(path, "r:gz") as tar:
+        return {m.name: tar.extractfile(m).read() for m in tar if m.isfile()}  # type: ignore[union-attr]
+
+
+def test_chart_is_packaged_like_helm(tmp_path: pathlib.Path) -> None:
+    chart_dir = tmp_path / "chart"
+    _write_files(
+        chart_dir,
+        {
+            ".helmignore": "# build output\n*.tgz\nci/\n",
+            "Chart.yaml": CHART_YAML,
+            "Chart.lock": "dependencies: []\n",
+            "README.md": "﻿# App\n",
+            "ci/ci-values.yaml": "a: b\n",
+            "templates/.backup.yaml": "",
+            "templates/deployment.yaml": "kind: Deployment\n",
+            "templates/_helpers.tpl": "",
+            "values.schema.json": "{}",
+            "values.yaml": "replicas: 1\n",
+            "old-1.0.0.tgz": "",
+        },
+    )
+
+    packaged = package_chart(str(chart_dir), str(tmp_path / "out"))
+
+    assert packaged.path == str(tmp_path / "out" / "app-1.2.3.tgz")
+    with tarfile.open(packaged.path, "r:gz") as tar:
+        members = tar.getmembers()
+    assert [m.name for m in members] == [
+        "app/Chart.yaml",
+        "app/Chart.lock",
+        "app/values.yaml",
+        "app/values.schema.json",
+        "app/templates/_helpers.tpl",
+        "app/templates/deployment.yaml",
+        "app/.helmignore",
+        "app/README.md",
+    ]
+    assert all(m.isfile() and m.mode == 0o644 for m in members)
+    # the byte order mark is removed
+    assert _archive_files(packaged.path)["app/README.md"] == b"# App\n"
+    assert packaged.files == tuple(m.name for m in members)
+    assert packaged.size == pathlib.Path(packaged.path).stat().st_size
+    assert packaged.digest == hashlib.sha256(pathlib.Path(packaged.path).read_bytes()).hexdigest()
+
+    header_size = 12 + len(HELM_GZIP_EXTRA) + len(HELM_GZIP_COMMENT) + 1
+    header = pathlib.Path(packaged.path).read_bytes()[:header_size]
+    # FEXTRA | FCOMMENT, no mtime, unknown OS, then helm's extra field and comment
+    assert header[3:8] == b"\x14\x00\x00\x00\x00" and header[9] == 255
+    assert header[12:] == HELM_GZIP_EXTRA + HELM_GZIP_COMMENT + b"\x00"
+    with gzip.open(packaged.path) as f:
+        assert len(f.read()) == packaged.content_size
+
+
+def test_subcharts_are_expanded(tmp_path: pathlib.Path) -> None:
+    chart_dir = tmp_path / "chart"
+    _write_files(
+        chart_dir,
+        {
+            "Chart.yaml": CHART_YAML + "dependencies:\n- name: packaged\n- name: local\n",
+            "charts/local-dir/Chart.yaml": "name: local\nversion: 0.1.0\n",
+            "charts/local-dir/values.yaml": "{}\n",
+        },
+    )
+    (chart_dir / "charts" / "packaged-2.0.0.tgz").write_bytes(
+        _make_archive(
+            {
+                "packaged/templates/cm.yaml": "kind: ConfigMap\n",
+                "packaged/Chart.yaml": "name: packaged\nversion: 2.0.0\n",
+            }
+        )
+    )
+
+    packaged = package_chart(str(chart_dir), str(tmp_path))
+
+    assert list(_archive_files(packaged.path)) == [
+        "app/Chart.yaml",
+        "app/charts/local/Chart.yaml",
+        "app/charts/local/values.yaml",
+        "app/charts/packaged/Chart.yaml",
+        "app/charts/packaged/templates/cm.yaml",
+    ]
+
+
+@pytest.mark.parametrize(
+    "files,error",
+    [
+        ({"values.yaml": "{}"}, "'Chart.yaml' file is missing in 'chart'"),
+        ({"Chart.yaml": "name: app\n"}, "'Chart.yaml' in 'chart' must set 'name' and 'version'"),
+        (
+            {"Chart.yaml": CHART_YAML + "dependencies:\n- name: dep\n"},
+            "found in Chart.yaml, but missing in charts/ directory: dep",
+        ),
+    ],
+    ids=["no Chart.yaml", "no version", "missing dependency"],
+)
+def test_invalid_charts_are_rejected(tmp_path: pathlib.Path, files: Dict[str, str], error: str) -> None:
+    _write_files(tmp_path / "chart", files)
+
+    with pytest.raises(ChartPackagingError) as exc:
+        package_chart(str(tmp_path / "chart"), str(tmp_path / "out"))
+    assert str(exc.value) == error
+    assert not (tmp_path / "out").exists() or list((tmp_path / "out").iterdir()) == []
+
+
+def _compress(data: bytes, threads: Optional[int], parallel: bool = True) -> bytes:
+    output = io.BytesIO()
+    with ThreadPoolExecutor(threads or 1) as executor:
+        if parallel:
+            writer: HelmGzipWriter = ParallelGzipWriter(output, 6, executor if threads else None, 2, chunk_size=1000)
+        else:
+            writer = HelmGzipWriter(output, 6)
+        # written in pieces not aligned with the chunks
+        for start in range(0, len(data), 777):
+            writer.write(data[start : start + 777])
+        writer.close()
+    return output.getvalue()
+
+
+def test_parallel_compression_is_a_single_gzip_stream() -> None:
+    words = [b"kind", b"Deployment", b"metadata", b"name", b"app", b"\n", b"  ", b"spec"]
+    rng = random.Random(42)
+    data = b"".join(rng.choice(words) for _ in range(20000))
+
+    compressed = _compress(data, None)
+
+    assert gzip.decompress(compressed) == data
+    # the threads only change how fast the chunks are compressed
+    assert _compress(data, 1) == _compress(data, 4) == compressed
+
+
+def test_parallel_compression_of_a_single_chunk_is_the_same_as_serial() -> None:
+    assert _compress(b"x" * 500, 2) == _compress(b"x" * 500, None, parallel=False)
+    assert gzip.decompress(_compress(b"", 2)) == b""
+
+
+def test_archive_doesnt_depend_on_compression_threads(tmp_path: pathlib.Path) -> None:
+    _write_files(tmp_path / "chart", {"Chart.yaml": CHART_YAML, "values.yaml": "a: b\n" * 100000})
+
+    digests = {
+        package_chart(str(tmp_path / "chart"), str(tmp_path / str(threads)), mtime=0, threads=threads).digest
+        for threads in (1, 3)
+    }
+    assert len(digests) == 1
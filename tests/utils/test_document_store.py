@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+from app_build_suite.utils.document_store import ParsedDocumentStore
+
+
+def test_document_is_parsed_once(tmp_path: Path) -> None:
+    chart_yaml = tmp_path / "Chart.yaml"
+    chart_yaml.write_text("name: test\nversion: 1.0.0\n")
+    store = ParsedDocumentStore()
+
+    with patch("app_build_suite.utils.document_store.yaml.safe_load", wraps=yaml.safe_load) as safe_load:
+        first = store.get(str(chart_yaml))
+        second = store.get(str(tmp_path / "." / "Chart.yaml"))
+
+    assert first == {"name": "test", "version": "1.0.0"}
+    assert first is second
+    assert safe_load.call_count == 1
+
+
+def test_changed_file_is_parsed_again(tmp_path: Path) -> None:
+    chart_yaml = tmp_path / "Chart.yaml"
+    chart_yaml.write_text("name: test\n")
+    store = ParsedDocumentStore()
+    assert store.get(str(chart_yaml)) == {"name": "test"}
+
+    chart_yaml.write_text("name: changed\n")
+    # make sure the change is visible even on file systems with coarse mtime resolution
+    st = chart_yaml.stat()
+    os.utime(chart_yaml, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert store.get(str(chart_yaml)) == {"name": "changed"}
+
+
+def test_invalidate_forces_parsing(tmp_path: Path) -> None:
+    chart_yaml = tmp_path / "Chart.yaml"
+    chart_yaml.write_text("name: test\n")
+    store = ParsedDocumentStore()
+    first = store.get(str(chart_yaml))
+
+    store.invalidate(str(chart_yaml))
+
+    second = store.get(str(chart_yaml))
+    assert first == second
+    assert first is not second
+
+
+def test_errors_are_not_cached(tmp_path: Path) -> None:
+    chart_yaml = tmp_path / "Chart.yaml"
+    store = ParsedDocumentStore()
+    with pytest.raises(OSError):
+        store.get(str(chart_yaml))
+
+    chart_yaml.write_text("name: [unclosed\n")
+    with pytest.raises(yaml.YAMLError):
+        store.get(str(chart_yaml))
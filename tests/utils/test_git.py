@@ -45,3 +45,19 @@ def test_get_remote_url_not_a_repo(mocker: MockFixture) -> None:
     git_info = GitRepoVersionInfo(path)
     assert git_info.is_git_repo is False
     assert git_info.get_remote_url("origin") is None
+
+
+def test_get_last_commit_timestamp(mocker: MockFixture) -> None:
+    """Test that get_last_commit_timestamp returns the commit time of HEAD."""
+    repo_mock = mocker.MagicMock()
+    repo_mock.head.commit.committed_date = 1700000000
+    mocker.patch("git.Repo", return_value=repo_mock)
+
+    assert GitRepoVersionInfo("bogus/path").get_last_commit_timestamp() == 1700000000
+
+
+def test_get_last_commit_timestamp_not_a_repo(mocker: MockFixture) -> None:
+    """Test that get_last_commit_timestamp returns None when not a git repo."""
+    mocker.patch("git.Repo", side_effect=git.exc.InvalidGitRepositoryError())
+
+    assert GitRepoVersionInfo("bogus/path").get_last_commit_timestamp() is None
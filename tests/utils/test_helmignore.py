@@ -0,0 +1,50 @@
+import pytest
+
+from app_build_suite.utils.helmignore import HelmIgnoreError, HelmIgnoreRules
+
+
+def _rules(*lines: str) -> HelmIgnoreRules:
+    rules = HelmIgnoreRules()
+    for line in lines:
+        rules.add(line)
+    return rules
+
+
+@pytest.mark.parametrize(
+    "rule,path,is_dir,ignored",
+    [
+        ("*.tgz", "charts/dep-1.0.0.tgz", False, True),
+        ("*.tgz", "dep.tgz.txt", False, False),
+        ("ci/*", "ci/values.yaml", False, True),
+        ("ci/*", "templates/ci/values.yaml", False, False),
+        ("/ci", "ci", True, True),
+        ("tests/", "tests", True, True),
+        ("tests/", "tests", False, False),
+        ("[a-c]?.txt", "b1.txt", False, True),
+        ("[^a-c]?.txt", "b1.txt", False, False),
+        ("\\#notes", "#notes", False, True),
+        ("# comment", "# comment", False, False),
+    ],
+)
+def test_rules_match_like_helm(rule: str, path: str, is_dir: bool, ignored: bool) -> None:
+    assert _rules(rule).is_ignored(path, is_dir) == ignored
+
+
+def test_negated_rule_ignores_everything_else() -> None:
+    rules = _rules("!*.yaml")
+
+    assert not rules.is_ignored("values.yaml", False)
+    assert rules.is_ignored("README.md", False)
+
+
+def test_hidden_templates_are_ignored_by_default(tmp_path: pytest.TempPathFactory) -> None:
+    rules = HelmIgnoreRules.load(str(tmp_path))
+
+    assert rules.is_ignored("templates/.swp", False)
+    assert not rules.is_ignored(".helmignore", False)
+
+
+@pytest.mark.parametrize("rule", ["**/*.yaml", "[abc"])
+def test_invalid_rules_are_rejected(rule: str) -> None:
+    with pytest.raises(HelmIgnoreError):
+        _rules(rule)
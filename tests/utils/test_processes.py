@@ -0,0 +1,28 @@
+import sys
+from typing import List
+
+import pytest
+
+from app_build_suite.utils.processes import stream_and_log
+
+
+def test_stdout_is_passed_line_by_line_and_stderr_is_collected() -> None:
+    lines: List[str] = []
+    script = "import sys; print('a'); print('b'); print('oops', file=sys.stderr); sys.exit(3)"
+
+    result = stream_and_log([sys.executable, "-c", script], lines.append)
+
+    assert lines == ["a\n", "b\n"]
+    assert result.returncode == 3
+    assert result.stdout is None
+    assert result.stderr == "oops\n"
+
+
+def test_error_in_callback_kills_the_process() -> None:
+    script = "import time\nwhile True:\n    print('line', flush=True)\n    time.sleep(0.01)\n"
+
+    def fail(_: str) -> None:
+        raise ValueError("stop")
+
+    with pytest.raises(ValueError):
+        stream_and_log([sys.executable, "-c", script], fail)
@@ -0,0 +1,52 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app_build_suite.utils.processes import run_and_log, stream_and_log
+from app_build_suite.utils.profiling import BuildProfiler, get_profiler
+
+
+def test_step_profile_records_subprocesses_and_io(tmp_path: Path) -> None:
+    profiler = BuildProfiler()
+    with profiler.measure("my-chart", "Step", "build"):
+        run_and_log([sys.executable, "-c", "pass"])
+        stream_and_log([sys.executable, "-c", "print('x')"], lambda _: None)
+        (tmp_path / "file").write_bytes(b"x" * 10000)
+    # processes run outside of any step are not recorded
+    run_and_log([sys.executable, "-c", "pass"])
+
+    [profile] = profiler.profiles
+    assert (profile.chart, profile.step, profile.stage) == ("my-chart", "Step", "build")
+    assert profile.subprocess_count == 2
+    assert 0 < profile.subprocess_time <= profile.wall_time
+    assert profile.cpu_time >= 0
+    assert profile.peak_rss_delta >= 0
+    if profile.write_bytes is not None:
+        assert profile.write_bytes >= 10000
+
+
+def test_profile_is_written_as_json_and_chrome_trace(tmp_path: Path) -> None:
+    output = tmp_path / "profile.json"
+    config = argparse.Namespace(profile_output=str(output))
+    profiler = get_profiler(config)
+    assert profiler is not None
+    assert get_profiler(argparse.Namespace(profile_output=str(output))) is profiler
+    with profiler.measure("my-chart", "Step", "pre-run"):
+        run_and_log([sys.executable, "-c", "pass"])
+
+    profiler.write(str(output))
+
+    steps = json.loads(output.read_text())["steps"]
+    assert [(s["step"], s["stage"], s["subprocess_count"]) for s in steps] == [("Step", "pre-run", 1)]
+    events = json.loads((tmp_path / "profile.trace.json").read_text())["traceEvents"]
+    assert [(e["name"], e["cat"], e["ph"]) for e in events] == [
+        ("Step", "pre-run", "X"),
+        (Path(sys.executable).name, "subprocess", "X"),
+    ]
+    assert events[1]["ts"] >= events[0]["ts"]
+
+
+def test_profiling_is_disabled_by_default() -> None:
+    assert get_profiler(argparse.Namespace()) is None
+    assert get_profiler(argparse.Namespace(profile_output=None)) is None
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from app_build_suite.utils.rendered_manifests import UNKNOWN_SOURCE_FILE, RenderedManifestsWriter
+from app_build_suite.utils.yaml_strict import RenderedDocument
+
+
+def test_documents_are_written_per_template(tmp_path: Path) -> None:
+    writer = RenderedManifestsWriter(str(tmp_path))
+    writer.write(
+        RenderedDocument("---\n# Source: app/templates/cm.yaml\nkind: ConfigMap\n", 1, "app/templates/cm.yaml")
+    )
+    writer.write(RenderedDocument("---\n# Source: app/templates/cm.yaml\nkind: Secret", 4, "app/templates/cm.yaml"))
+    writer.write(RenderedDocument("kind: Service\n", 8, None))
+
+    assert (tmp_path / "app" / "templates" / "cm.yaml").read_text() == (
+        "---\n# Source: app/templates/cm.yaml\nkind: ConfigMap\n---\n# Source: app/templates/cm.yaml\nkind: Secret\n"
+    )
+    assert (tmp_path / UNKNOWN_SOURCE_FILE).read_text() == "kind: Service\n"
+
+
+def test_sources_outside_of_the_output_dir_are_not_followed(tmp_path: Path) -> None:
+    output_dir = tmp_path / "out"
+    writer = RenderedManifestsWriter(str(output_dir))
+    writer.write(RenderedDocument("kind: ConfigMap\n", 1, "../../escape.yaml"))
+    assert not (tmp_path / "escape.yaml").exists()
+    assert (output_dir / UNKNOWN_SOURCE_FILE).is_file()
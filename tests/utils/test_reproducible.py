@@ -0,0 +1,53 @@
+import argparse
+from typing import Optional
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app_build_suite.utils.reproducible import get_source_date_epoch, is_reproducible
+
+
+def _config(reproducible: Optional[bool]) -> argparse.Namespace:
+    return argparse.Namespace(chart_dir="bogus/path", reproducible=reproducible)
+
+
+def test_source_date_epoch_is_honored(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+
+    assert is_reproducible(_config(None))
+    assert get_source_date_epoch(_config(None)) == 1700000000
+    assert get_source_date_epoch(_config(True)) == 1700000000
+
+
+def test_no_reproducible_wins_over_source_date_epoch(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+
+    assert not is_reproducible(_config(False))
+    assert get_source_date_epoch(_config(False)) is None
+
+
+def test_builds_arent_reproducible_by_default(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+
+    assert not is_reproducible(argparse.Namespace())
+    assert get_source_date_epoch(_config(None)) is None
+
+
+@pytest.mark.parametrize("commit_time,expected", [(1600000000, 1600000000), (None, 0)], ids=["git", "no git"])
+def test_reproducible_builds_use_last_commit_time(
+    monkeypatch: pytest.MonkeyPatch, mocker: MockerFixture, commit_time: Optional[int], expected: int
+) -> None:
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    repo_info = mocker.patch("app_build_suite.utils.reproducible.GitRepoVersionInfo")
+    repo_info.return_value.get_last_commit_timestamp.return_value = commit_time
+
+    assert get_source_date_epoch(_config(True)) == expected
+    repo_info.assert_called_once_with("bogus/path")
+
+
+@pytest.mark.parametrize("value", ["-1", "1.5", "yesterday"])
+def test_invalid_source_date_epoch_is_rejected(monkeypatch: pytest.MonkeyPatch, value: str) -> None:
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", value)
+
+    with pytest.raises(ValueError):
+        get_source_date_epoch(_config(True))
@@ -0,0 +1,126 @@
+import os
+import stat
+from pathlib import Path
+
+import pytest
+from step_exec_lib.errors import ValidationError
+
+from app_build_suite.utils.tools import (
+    ToolRegistry,
+    parse_ct_version,
+    parse_first_line_version,
+    parse_helm_version,
+)
+
+HELM_VERSION_OUTPUT = (
+    'version.BuildInfo{Version:"v3.21.2", GitCommit:"1234", GitTreeState:"clean", GoVersion:"go1.24.6"}\n'
+)
+
+
+def _make_fake_tool(bin_dir: Path, name: str, output: str) -> Path:
+    """Creates a fake binary that prints 'output' and counts its invocations in '<name>.calls'."""
+    bin_dir.mkdir(exist_ok=True)
+    tool = bin_dir / name
+    calls = bin_dir / f"{name}.calls"
+    tool.write_text(f"#!/bin/sh\necho x >> '{calls}'\ncat <<'EOF'\n{output}EOF\n")
+    tool.chmod(tool.stat().st_mode | stat.S_IEXEC)
+    return tool
+
+
+def _calls(bin_dir: Path, name: str) -> int:
+    calls = bin_dir / f"{name}.calls"
+    return len(calls.read_text().splitlines()) if calls.exists() else 0
+
+
+@pytest.fixture
+def bin_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "bin"
+    monkeypatch.setenv("PATH", f"{path}{os.pathsep}{os.environ.get('PATH', '')}")
+    return path
+
+
+def test_parse_helm_version() -> None:
+    assert parse_helm_version(HELM_VERSION_OUTPUT) == "v3.21.2"
+
+
+def test_parse_ct_version() -> None:
+    assert parse_ct_version("Version:\t v3.14.0\nGit commit: abc\n") == "v3.14.0"
+
+
+def test_parse_first_line_version() -> None:
+    assert parse_first_line_version("0.8.3\n") == "0.8.3"
+
+
+@pytest.mark.parametrize(
+    "parser,output",
+    [(parse_helm_version, "garbage\n"), (parse_ct_version, "garbage\n"), (parse_first_line_version, "")],
+    ids=["helm", "ct", "first-line"],
+)
+def test_parsers_reject_unexpected_output(parser, output: str) -> None:  # type: ignore[no-untyped-def]
+    with pytest.raises(ValueError):
+        parser(output)
+
+
+def test_version_is_probed_once_per_process(bin_dir: Path) -> None:
+    _make_fake_tool(bin_dir, "helm", HELM_VERSION_OUTPUT)
+    registry = ToolRegistry()
+
+    first = registry.get("test", "helm", parse_helm_version)
+    second = registry.get("test", "helm", parse_helm_version)
+
+    assert first.version == "v3.21.2"
+    assert first == second
+    assert first.path == os.path.realpath(bin_dir / "helm")
+    assert _calls(bin_dir, "helm") == 1
+
+
+def test_version_is_persisted_in_cache_dir(bin_dir: Path, tmp_path: Path) -> None:
+    _make_fake_tool(bin_dir, "helm", HELM_VERSION_OUTPUT)
+    cache_dir = str(tmp_path / "cache")
+
+    assert ToolRegistry().get("test", "helm", parse_helm_version, cache_dir).version == "v3.21.2"
+    # a fresh registry simulates the next run: the version must come from the disk cache
+    assert ToolRegistry().get("test", "helm", parse_helm_version, cache_dir).version == "v3.21.2"
+    assert _calls(bin_dir, "helm") == 1
+
+
+def test_replaced_binary_is_probed_again(bin_dir: Path, tmp_path: Path) -> None:
+    cache_dir = str(tmp_path / "cache")
+    tool = _make_fake_tool(bin_dir, "helm", HELM_VERSION_OUTPUT)
+    ToolRegistry().get("test", "helm", parse_helm_version, cache_dir)
+
+    # replacing the binary changes its inode and mtime
+    tool.unlink()
+    _make_fake_tool(bin_dir, "helm", HELM_VERSION_OUTPUT.replace("v3.21.2", "v3.22.0"))
+
+    assert ToolRegistry().get("test", "helm", parse_helm_version, cache_dir).version == "v3.22.0"
+    assert _calls(bin_dir, "helm") == 2
+
+
+def test_upgraded_binary_is_probed_again_by_the_same_registry(bin_dir: Path) -> None:
+    tool = _make_fake_tool(bin_dir, "helm", HELM_VERSION_OUTPUT)
+    registry = ToolRegistry()
+    assert registry.get("test", "helm", parse_helm_version).version == "v3.21.2"
+
+    # like a long-running build server seeing 'helm' upgraded between two builds
+    tool.unlink()
+    _make_fake_tool(bin_dir, "helm", HELM_VERSION_OUTPUT.replace("v3.21.2", "v3.22.0"))
+
+    assert registry.get("test", "helm", parse_helm_version).version == "v3.22.0"
+    assert _calls(bin_dir, "helm") == 2
+
+
+def test_missing_binary_raises_validation_error(bin_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("PATH", str(bin_dir))
+    with pytest.raises(ValidationError) as excinfo:
+        ToolRegistry().get("test", "helm", parse_helm_version)
+    assert "Can't find helm executable" in excinfo.value.msg
+
+
+def test_unparsable_version_raises_validation_error(bin_dir: Path, tmp_path: Path) -> None:
+    _make_fake_tool(bin_dir, "helm", "not a version\n")
+    cache_dir = tmp_path / "cache"
+    with pytest.raises(ValidationError) as excinfo:
+        ToolRegistry().get("test", "helm", parse_helm_version, str(cache_dir))
+    assert "Can't parse 'helm' version number" in excinfo.value.msg
+    assert not (cache_dir / "tool-versions.json").exists()
@@ -1,9 +1,18 @@
-from typing import List, Optional
+from typing import List, Optional, Type
 
 import pytest
 import yaml
 
-from app_build_suite.utils.yaml_strict import DuplicateKeyError, UniqueKeyLoader, find_nearest_source
+from app_build_suite.utils.yaml_strict import (
+    DuplicateKeyError,
+    PyUniqueKeyLoader,
+    RenderedDocument,
+    RenderedDocumentSplitter,
+    SourceIndex,
+    UniqueKeyLoader,
+    find_nearest_source,
+    load_all_strict,
+)
 
 VALID_MULTI_DOC = """---
 # Source: my-app/templates/deployment.yaml
@@ -82,12 +91,24 @@ kind: Secret
 """
 
 
-def _load_all(document: str) -> List[object]:
-    return list(yaml.load_all(document, Loader=UniqueKeyLoader))
+LOADERS: List[type] = [PyUniqueKeyLoader]
+if yaml.__with_libyaml__:
+    from app_build_suite.utils.yaml_strict import CUniqueKeyLoader
+
+    LOADERS.append(CUniqueKeyLoader)
+
+
+@pytest.fixture(params=LOADERS, ids=lambda cls: cls.__name__)
+def loader_cls(request: pytest.FixtureRequest) -> Type[yaml.SafeLoader]:
+    return request.param
+
 
+def _load_all(document: str, loader_cls: Type[yaml.SafeLoader]) -> List[object]:
+    return list(yaml.load_all(document, Loader=loader_cls))
 
-def test_valid_multi_doc_loads() -> None:
-    docs = _load_all(VALID_MULTI_DOC)
+
+def test_valid_multi_doc_loads(loader_cls: Type[yaml.SafeLoader]) -> None:
+    docs = _load_all(VALID_MULTI_DOC, loader_cls)
     assert len(docs) == 2
     assert docs[0]["kind"] == "Deployment"  # type: ignore[index]
 
@@ -101,29 +122,33 @@ def test_valid_multi_doc_loads() -> None:
     ],
     ids=["top-level", "nested", "in-list-item"],
 )
-def test_duplicate_keys_raise(document: str, duplicate_key: str, dup_line: int, first_line: int) -> None:
+def test_duplicate_keys_raise(
+    document: str, duplicate_key: str, dup_line: int, first_line: int, loader_cls: Type[yaml.SafeLoader]
+) -> None:
     with pytest.raises(DuplicateKeyError) as excinfo:
-        _load_all(document)
+        _load_all(document, loader_cls)
     assert f"duplicate key '{duplicate_key}'" in str(excinfo.value)
     assert f"line {dup_line}" in str(excinfo.value)
     assert f"first defined at line {first_line}" in str(excinfo.value)
     assert excinfo.value.line == dup_line
 
 
-def test_same_key_in_different_documents_is_fine() -> None:
-    assert len(_load_all(SAME_KEY_DIFFERENT_DOCS)) == 2
+def test_same_key_in_different_documents_is_fine(loader_cls: Type[yaml.SafeLoader]) -> None:
+    assert len(_load_all(SAME_KEY_DIFFERENT_DOCS, loader_cls)) == 2
 
 
 @pytest.mark.parametrize(
     "document,expected_docs", [(EMPTY_DOCS, [None, None]), ("", [])], ids=["empty-docs", "empty-stream"]
 )
-def test_empty_documents_are_fine(document: str, expected_docs: List[object]) -> None:
-    assert _load_all(document) == expected_docs
+def test_empty_documents_are_fine(
+    document: str, expected_docs: List[object], loader_cls: Type[yaml.SafeLoader]
+) -> None:
+    assert _load_all(document, loader_cls) == expected_docs
 
 
-def test_syntax_error_raises_marked_yaml_error() -> None:
+def test_syntax_error_raises_marked_yaml_error(loader_cls: Type[yaml.SafeLoader]) -> None:
     with pytest.raises(yaml.MarkedYAMLError):
-        _load_all(SYNTAX_ERROR)
+        _load_all(SYNTAX_ERROR, loader_cls)
 
 
 @pytest.mark.parametrize(
@@ -135,15 +160,17 @@ def test_syntax_error_raises_marked_yaml_error() -> None:
     ],
     ids=["value-tag-enum", "merge-key", "merge-tag-in-list"],
 )
-def test_yaml_11_tags_load_without_error(document: str, expected_docs: List[object]) -> None:
+def test_yaml_11_tags_load_without_error(
+    document: str, expected_docs: List[object], loader_cls: Type[yaml.SafeLoader]
+) -> None:
     """PyYAML resolves the YAML 1.1 'value' ('=') and 'merge' ('<<') tags but SafeConstructor
     registers no constructor for either, so these used to raise ConstructorError."""
-    assert _load_all(document) == expected_docs
+    assert _load_all(document, loader_cls) == expected_docs
 
 
-def test_duplicate_detection_still_works_alongside_value_tag() -> None:
+def test_duplicate_detection_still_works_alongside_value_tag(loader_cls: Type[yaml.SafeLoader]) -> None:
     with pytest.raises(DuplicateKeyError) as excinfo:
-        _load_all(DUPLICATE_WITH_VALUE_TAG)
+        _load_all(DUPLICATE_WITH_VALUE_TAG, loader_cls)
     assert "duplicate key 'kind'" in str(excinfo.value)
 
 
@@ -158,3 +185,83 @@ def test_duplicate_detection_still_works_alongside_value_tag() -> None:
 )
 def test_find_nearest_source(line_no: int, expected_source: Optional[str]) -> None:
     assert find_nearest_source(VALID_MULTI_DOC, line_no) == expected_source
+
+
+def _split(stream: str) -> List[RenderedDocument]:
+    splitter = RenderedDocumentSplitter()
+    documents = [d for d in map(splitter.feed, stream.splitlines(keepends=True)) if d is not None]
+    last = splitter.close()
+    return documents + ([last] if last is not None else [])
+
+
+def test_splitter_tracks_document_lines_and_sources() -> None:
+    documents = _split(VALID_MULTI_DOC)
+
+    assert [(d.first_line, d.source) for d in documents] == [
+        (1, "my-app/templates/deployment.yaml"),
+        (7, "my-app/templates/service.yaml"),
+    ]
+    assert "".join(d.text for d in documents) == VALID_MULTI_DOC
+
+
+def test_splitter_keeps_text_before_the_first_marker() -> None:
+    documents = _split("kind: ConfigMap\n--- # comment\nkind: Secret\n----not-a-marker: 1\n")
+    assert [d.first_line for d in documents] == [1, 2]
+    assert [d.source for d in documents] == [None, None]
+    assert _split("") == []
+
+
+def test_load_all_strict_reports_lines_of_the_whole_stream() -> None:
+    assert load_all_strict(VALID_MULTI_DOC) == 2
+    with pytest.raises(DuplicateKeyError) as excinfo:
+        load_all_strict(DUPLICATE_NESTED, first_line=11)
+    assert excinfo.value.line == 16
+    assert "first defined at line 14" in str(excinfo.value)
+
+
+def test_duplicate_merge_keys_raise(loader_cls: Type[yaml.SafeLoader]) -> None:
+    with pytest.raises(DuplicateKeyError) as excinfo:
+        _load_all("a: &a {x: 1}\nb: &b {y: 1}\nc:\n  <<: *a\n  <<: *b\n", loader_cls)
+    assert "duplicate key '<<' at line 5" in str(excinfo.value)
+
+
+def test_merged_keys_can_be_overridden(loader_cls: Type[yaml.SafeLoader]) -> None:
+    assert _load_all(MERGE_KEY + "  a: 3\n", loader_cls) == [{"base": {"a": 1}, "child": {"a": 3, "c": 2}}]
+
+
+def test_unhashable_key_raises_constructor_error(loader_cls: Type[yaml.SafeLoader]) -> None:
+    with pytest.raises(yaml.constructor.ConstructorError, match="found unhashable key"):
+        _load_all("? [a, b]\n: value\n", loader_cls)
+
+
+def test_c_loader_is_used_when_available() -> None:
+    assert UniqueKeyLoader is LOADERS[-1]
+
+
+def test_load_all_strict_shifts_syntax_error_lines() -> None:
+    with pytest.raises(yaml.MarkedYAMLError) as excinfo:
+        load_all_strict(SYNTAX_ERROR, first_line=101)
+    assert excinfo.value.problem_mark is not None
+    assert excinfo.value.problem_mark.line >= 100
+
+
+def test_source_index_matches_find_nearest_source() -> None:
+    index = SourceIndex.from_text(VALID_MULTI_DOC)
+    assert len(index) == 2
+    for line_no in range(0, len(VALID_MULTI_DOC.splitlines()) + 3):
+        assert index.source_at(line_no) == find_nearest_source(VALID_MULTI_DOC, line_no)
+
+
+def test_source_index_is_built_while_splitting() -> None:
+    splitter = RenderedDocumentSplitter()
+    for line in VALID_MULTI_DOC.splitlines(keepends=True):
+        splitter.feed(line)
+    assert splitter.source_index.source_at(2) == "my-app/templates/deployment.yaml"
+    assert splitter.source_index.source_at(8) == "my-app/templates/service.yaml"
+
+
+def test_source_index_rejects_lines_out_of_order() -> None:
+    index = SourceIndex()
+    index.add(5, "a.yaml")
+    with pytest.raises(ValueError):
+        index.add(5, "b.yaml")